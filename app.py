@@ -1,24 +1,31 @@
-from flask import Flask, render_template, Response, request, session, redirect, url_for
+from flask import Flask, render_template, Response, request, session, redirect, url_for, abort
 import os
 import cv2
 import json
 import bcrypt
-import pymongo
 from datetime import timedelta, datetime, time
 from email_oauth.email_using_oauth import Send_Email
 
 # custom package imports
-from data_ingestion.data_import_and_preprocessing import DataImport, Preprocessing
+from data_ingestion.data_import_and_preprocessing import DataImport, Preprocessing, can_fork
+from data_ingestion.encoding_store import EncodingStore
 from database_api_functions.db_api_functions import DatabaseAPI
-
-#dashboard app
-from dashboard.dashboard import dashboard_app
+from database_api_functions.mongo_client import get_mongo_client, mongo_health, close_mongo_clients
+from video_pipeline.camera_worker import CameraWorker
+from video_pipeline.recognition_results import RecognitionResults
+from video_pipeline.pipeline_metrics import PipelineMetrics, render_metrics
+from recognition.face_index import make_face_index
+from recognition.face_detectors import make_face_detector
+from recognition.face_encoder import FaceEncoder
+from recognition.face_matcher import FaceMatcher
+from recognition.face_recognizer import FaceRecognizer
+from monitoring.session_tracker import SessionTracker, format_seconds
+from monitoring.live_times import LiveTimes
+from monitoring.activity_state import ActivityTracker, LocalActivityStore, MongoActivityStore
 
 # instantiate flask app
 app = Flask(__name__, template_folder="templates")
 
-#registering the dashboard app
-app.register_blueprint(dashboard_app)
 #secret key
 app.secret_key = "secret!"
 # app.config["SESSION_PERMANENT"] = True
@@ -27,7 +34,6 @@ app.secret_key = "secret!"
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=12)
 
 # making objects
-camera = cv2.VideoCapture(0)  # change this if camera not working
 data_import = DataImport()
 preprocessing = Preprocessing()
 
@@ -40,24 +46,89 @@ data_import.make_folders(config_file["saved_image_folder"],
                          config_file["attendance_folder_path"],
                          config_file["image_path"])
 
-# calling important functions
-images, known_face_names = data_import.read_images(
-    image_path=config_file["image_path"])
-known_face_encodings = preprocessing.faceEncodings(images)
+# calling important functions (only new or changed images are encoded)
+encoding_store = EncodingStore(config_file["encoding_store_path"])
+# (without fork the workers would re-run this file, build the store with
+# `python -m data_ingestion.encoding_store` there instead)
+encoding_workers = config_file["encoding_workers"] if can_fork() else 1
+known_face_names, known_face_encodings = encoding_store.sync(
+    config_file["image_path"], encoding_workers,
+    config_file["encoding_chunk_size"])
+
+
+def make_recognizer(fps):
+    """Recognizer of a camera worker, built inside the worker every time its
+    capture loop starts, from the encodings saved by the latest sync so the
+    faces changed by /upload survive a restart."""
+    names, encodings = EncodingStore(
+        config_file["encoding_store_path"]).known_faces()
+    return FaceRecognizer(
+        FaceMatcher(names,
+                    encodings,
+                    index=make_face_index(**config_file["face_index"])),
+        make_face_detector(**config_file["face_detector"]),
+        FaceEncoder(**config_file["face_encoder"]),
+        config_file["recognition_scale"], config_file["motion_gate"],
+        config_file["face_tracking"], config_file["max_detection_interval"],
+        fps)
+
+
+# one worker process per camera captures and recognizes it (without fork the
+# workers are threads of this process)
+cameras = {}
+for camera_config in config_file["cameras"]:
+    cameras[camera_config["id"]] = CameraWorker(
+        camera_config["id"], camera_config["source"], make_recognizer,
+        RecognitionResults(
+            max_age=config_file.get("recognition_result_max_age", 1.0)),
+        camera_config.get("width", 640), camera_config.get("height", 480),
+        can_fork(), config_file["metrics"]).start()
+
+# the encoding pool and the camera workers are forked above, before the
+# dashboard creates the MongoClient: its pool and monitor threads must not be
+# inherited by a fork (the workers restart themselves from their own process)
+from dashboard.dashboard import dashboard_app
 
-# creating database object
-database = DatabaseAPI(camera, known_face_names, known_face_encodings,
-                       config_file["mongo_db_connection_url"],
-                       config_file["attendance_database_name"],
-                       config_file["employee_database_name"],
-                       config_file["saved_image_folder"])
+#registering the dashboard app
+app.register_blueprint(dashboard_app)
 
-# creating collection
+# the first camera is the one employees check in at
+camera = cameras[config_file["cameras"][0]["id"]]
+# latest recognition result shared by the video feed, /confirm and /idle_time
+recognition_results = camera.results
+# recognitions run by this process when the camera result is stale
+app_metrics = PipelineMetrics() if config_file["metrics"] else None
+
+# creating database object
+database = DatabaseAPI(
+    camera,
+    known_face_names,
+    known_face_encodings,
+    config_file["mongo_db_connection_url"],
+    config_file["attendance_database_name"],
+    config_file["employee_database_name"],
+    config_file["saved_image_folder"],
+    results=recognition_results,
+    face_index=make_face_index(**config_file["face_index"]),
+    face_tracking=config_file["face_tracking"],
+    max_detection_interval=config_file["max_detection_interval"],
+    motion_gate=config_file["motion_gate"],
+    face_detector=make_face_detector(**config_file["face_detector"]),
+    face_encoder=FaceEncoder(**config_file["face_encoder"]),
+    scale=config_file["recognition_scale"],
+    recognition_timeout=config_file["recognition_timeout"],
+    metrics=app_metrics,
+    attendance_storage=config_file["attendance_storage"],
+    daily_activity=config_file["daily_activity"],
+    mongo_client_options=config_file["mongo_client"],
+    attendance_catalogue_ttl=config_file["attendance_catalogue_ttl"])
+
+# creating the indexes of the attendance collection
 database.make_database_collection()
 
-#mongodb connection
+#mongodb connection, the pooled client shared with DatabaseAPI and the dashboard
 mongodb_url = config_file["mongo_db_connection_url"]
-client = pymongo.MongoClient(mongodb_url)
+client = get_mongo_client(mongodb_url, **config_file["mongo_client"])
 
 
 #* login database
@@ -70,9 +141,24 @@ login_collection = login_database[login_collection_name]
 employee_database = client[config_file["employee_database_name"]]
 
 #* Monitoring
-total_time = datetime(100, 1, 1, hour=0, minute=0, second=0)
-idle_time = datetime(100, 1, 1, hour=0, minute=0, second=0)
-temp_idle_time = datetime(100, 1, 1, hour=0, minute=0, second=0)
+# working time of every checked in employee, computed from the check-in and
+# saved in batches
+with open("monitoring_settings.json") as f:
+    monitoring_config = json.load(f)
+session_tracker = SessionTracker(
+    database.attendance_session, database.save_session_times,
+    float(monitoring_config["time_for_saving"])).start()
+# active/away/idle state of every watched employee, shared by the worker
+# processes of the app through MongoDB, or kept in this process
+if config_file["activity_store"] == "mongo":
+    activity_store = MongoActivityStore(
+        client[config_file["monitoring_database_name"]]["Activity"])
+else:
+    activity_store = LocalActivityStore()
+activity_tracker = ActivityTracker(activity_store,
+                                   float(monitoring_config["idle_time"]),
+                                   session_tracker.idle_seconds)
+employee_names = {}  #email -> name of the employees watching their times
 
 #email object
 mail = Send_Email()
@@ -166,16 +252,47 @@ def home():
 
 @app.route("/video_feed")
 def video_feed():
-    return Response(database.gen_frames(),
+    return Response(camera.subscribe(),
                     mimetype="multipart/x-mixed-replace; boundary=frame")
 
 
+@app.route("/video_feed/<string:camera_id>")
+def camera_video_feed(camera_id):
+    if camera_id not in cameras:
+        abort(404)
+    return Response(cameras[camera_id].subscribe(),
+                    mimetype="multipart/x-mixed-replace; boundary=frame")
+
+
+@app.route("/metrics")
+def metrics_route():
+    pipelines = [({
+        "camera": camera_id,
+        "process": "worker"
+    }, worker.metrics) for camera_id, worker in cameras.items()
+                 if worker.metrics is not None]
+    if app_metrics is not None:
+        pipelines.append(({
+            "camera": camera.camera_id,
+            "process": "app"
+        }, app_metrics))
+    return Response(render_metrics(pipelines),
+                    mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/health")
+def health():
+    health = mongo_health(client)
+    return health, 200 if health["ok"] else 503
+
+
 @app.route("/checkin", methods=["POST"])
 def checkin():
     if "username" in session:
         name = session["username"]
         email = session["email"]
         check, status = database.check_in(name, email, save_image=True)
+        session_tracker.refresh(email)
         if check:
             return render_template(
                 "attendance-templates//after_check_in.html",
@@ -194,6 +311,8 @@ def checkout():
         name = session["username"]
         email = session["email"]
         status = database.check_out(email, save_image=True)
+        session_tracker.refresh(email)
+        activity_tracker.forget(email)
         return render_template("attendance-templates//result.html",
                                status="Checked Out Status {} : {} ".format(
                                    name, status))
@@ -219,64 +338,49 @@ def confirm():
 
 
 # calculation of employee time spent
+def update_idle_times(emails):
+    "Ticks the activity state of the watched employees, once per second for all of them."
+    present_names = set(database.gen_names())
+    for email in emails:
+        activity_tracker.observe(email,
+                                 employee_names.get(email) in present_names)
+        session_tracker.set_idle_seconds(email,
+                                         activity_tracker.idle_seconds(email))
+
+
+# one ticker for all the employees, pushing their times when they change
+live_times = LiveTimes(session_tracker, update_idle_times).start()
+
+
+@app.route('/monitoring_stream')
+def monitoring_stream():
+    if "email" not in session:
+        return redirect(url_for('index'))
+    employee_names[session["email"]] = session["username"]
+    return Response(live_times.subscribe(session["email"]),
+                    mimetype="text/event-stream",
+                    headers={
+                        "Cache-Control": "no-cache",
+                        "X-Accel-Buffering": "no"
+                    })
+
+
 @app.route('/total_time/<string:email>')
 def total_time_route(email):
-    def generate():
-        global total_time, idle_time
-        date = datetime.now().strftime("%d/%m/%Y")
-        correct_email = email.replace("%40", "@")
-        current_data = employee_database[correct_email].find_one(
-            {"Date": date})
-        database_total_time = datetime.strptime(current_data["Total_Time"],
-                                                "%H:%M:%S")
-        database_idle_time = datetime.strptime(current_data["Idle_Time"],
-                                               "%H:%M:%S")
-        if total_time <= database_total_time:
-            total_time = database_total_time
-        if idle_time <= database_idle_time:
-            idle_time = database_idle_time
-        total_time += timedelta(seconds=1)
-        with open("monitoring_settings.json") as f:
-            monitoring_config = json.load(f)
-
-        if ((total_time.second) + (total_time.minute * 60) +
-            (total_time.hour * 3600)) % int(
-                monitoring_config["time_for_saving"]) == 0:
-            new_data = {
-                "$set": {
-                    "Total_Time": total_time.strftime("%H:%M:%S"),
-                    "Idle_Time": idle_time.strftime("%H:%M:%S")
-                }
-            }
-            employee_database[correct_email].update_one(current_data, new_data)
-        yield total_time.strftime("%H:%M:%S")
-
-    return Response(generate(), mimetype="text")
+    correct_email = email.replace("%40", "@")
+    # computed from the check-in, the tracker saves it to the database
+    return Response(format_seconds(
+        session_tracker.total_seconds(correct_email)),
+                    mimetype="text")
 
 
 @app.route('/idle_time')
 def idle_time_route():
-    def generate():
-        global temp_idle_time, idle_time
-        name = database.gen_name()
-        if name != "Unknown":
-            temp_idle_time = datetime(100, 1, 1, hour=0, minute=0, second=0)
-        else:
-            temp_idle_time += timedelta(seconds=1)
-            
-            #loading monitoring_settings.json
-            with open("monitoring_settings.json") as f:
-                monitoring_config = json.load(f)
-
-            temp_idle_time_seconds = ((temp_idle_time.second) +
-                                      (temp_idle_time.minute * 60) +
-                                      (temp_idle_time.hour * 3600))
-            if temp_idle_time_seconds >= int(monitoring_config["idle_time"]):
-                idle_time += timedelta(seconds=1)
-
-        yield idle_time.strftime("%H:%M:%S")
-
-    return Response(generate(), mimetype="text")
+    email = session.get("email")
+    # ticked by update_idle_times while the employee watches the stream
+    return Response(format_seconds(
+        session_tracker.idle_seconds(email) if email else 0),
+                    mimetype="text")
 
 #end of calculation
 
@@ -295,7 +399,6 @@ def update():
 def upload():
     if "username" in session:
         try:
-            global database, images, known_face_names, known_face_encodings
             if request.files:
                 if "image" in request.files["image"].content_type:
                     image = request.files["image"]
@@ -342,16 +445,23 @@ def upload():
                                    "{}.jpg".format(session["username"]))
                 os.rename(src, path)
 
-            #re-reading the images and re-creating the new encodings
-            images, known_face_names = data_import.read_images(
-                config_file["image_path"])
-            known_face_encodings = preprocessing.faceEncodings(images)
-            database = DatabaseAPI(camera, known_face_names,
-                                   known_face_encodings,
-                                   config_file["mongo_db_connection_url"],
-                                   config_file["attendance_database_name"],
-                                   config_file["employee_database_name"],
-                                   config_file["saved_image_folder"])
+            #encoding only the new image, the others are reused from the store
+            global known_face_names, known_face_encodings
+            known_face_names, known_face_encodings = encoding_store.sync(
+                config_file["image_path"], workers=1)
+            encoding = encoding_store.encoding_of(os.path.basename(path))
+            #updating the employee in place, the video feeds keep running
+            if encoding is not None:
+                database.matcher.replace_employee(session["username"],
+                                                  encoding)
+                for worker in cameras.values():
+                    worker.replace_employee(session["username"], encoding)
+            else:
+                database.matcher.remove_employee(session["username"])
+                for worker in cameras.values():
+                    worker.remove_employee(session["username"])
+            if database.motion_gate is not None:
+                database.motion_gate.reset()  #match the faces again
             return render_template("attendance-templates//update.html",
                                    alert=True)
 
@@ -412,5 +522,10 @@ if __name__ == "__main__":
         print("Stopping the Program!!!!")
 
     finally:
-        camera.release()
+        live_times.stop()
+        session_tracker.stop()
+        database.executor.shutdown()
+        for worker in cameras.values():
+            worker.release()
+        close_mongo_clients()
         cv2.destroyAllWindows()
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""Latency and duplicate records of check-in and check-out under concurrent clicks.
+
+Every employee is checked in, then checked out, `--clicks` times at once
+from a pool of threads, like an impatient double click on every kiosk. The
+attendance store is built on a scratch database of the MongoDB server in
+config.json, which is dropped afterwards. Every employee must be checked in
+and out exactly once, whatever the concurrency.
+
+    python -m benchmarks.bench_attendance --employees 200 --clicks 4 --threads 32
+"""
+import json
+import time
+import argparse
+import concurrent.futures
+from datetime import datetime
+import numpy as np
+
+from database_api_functions.attendance_store import make_attendance_store
+from database_api_functions.mongo_client import get_mongo_client
+
+
+def timed(function, *args):
+    "Result and latency in seconds of a call."
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def report(name: str, latencies, wall: float) -> None:
+    latencies = np.array(latencies) * 1000
+    print(f"{name:>9} {len(latencies):>6} {len(latencies) / wall:>8.0f} "
+          f"{latencies.mean():>8.2f} {np.percentile(latencies, 50):>8.2f} "
+          f"{np.percentile(latencies, 95):>8.2f} "
+          f"{np.percentile(latencies, 99):>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--database", default="bench_attendance")
+    parser.add_argument("--storage",
+                        default="single_collection",
+                        choices=["single_collection", "daily_collections"])
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--clicks",
+                        type=int,
+                        default=4,
+                        help="concurrent calls per employee")
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    client = get_mongo_client(config["mongo_db_connection_url"],
+                          **config["mongo_client"])
+    client.drop_database(args.database)
+    store = make_attendance_store(client[args.database], args.storage)
+    store.prepare(datetime.now().date())
+    emails = [f"employee{i}@bench.com" for i in range(args.employees)]
+    calls = [email for email in emails for _ in range(args.clicks)]
+
+    try:
+        print(f"{'call':>9} {'calls':>6} {'per s':>8} {'mean ms':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        with concurrent.futures.ThreadPoolExecutor(args.threads) as pool:
+            start = time.perf_counter()
+            check_ins = list(
+                pool.map(
+                    lambda email: timed(store.check_in, email.split("@")[0],
+                                        email, datetime.now()), calls))
+            report("check-in", [latency for _, latency in check_ins],
+                   time.perf_counter() - start)
+            start = time.perf_counter()
+            check_outs = list(
+                pool.map(
+                    lambda email: timed(store.check_out, email, datetime.now(
+                    )), calls))
+            report("check-out", [latency for _, latency in check_outs],
+                   time.perf_counter() - start)
+
+        checked_in = sum(created for (_, created), _ in check_ins)
+        checked_out = sum(record is not None and not record["Check Out"]
+                          for record, _ in check_outs)
+        records = sum(
+            len(store.records_of_day(day)) for day in store.dates())
+        print(f"employees: {args.employees}, records: {records}, "
+              f"check-ins: {checked_in}, check-outs: {checked_out}")
+        if not records == checked_in == checked_out == args.employees:
+            print("Duplicate or lost check-ins/check-outs!")
+    finally:
+        client.drop_database(args.database)
+
+
+if __name__ == "__main__":
+    main()
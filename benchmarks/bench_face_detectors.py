@@ -0,0 +1,109 @@
+"""Accuracy and latency of the face detector backends over a folder of labelled frames.
+
+The labels are a JSON file mapping the file name of every frame to its faces
+as [top, right, bottom, left] in full resolution pixels, e.g.
+{"frame_0001.jpg": [[120, 380, 260, 240]], "frame_0002.jpg": []}.
+Frames are detected at the scale DatabaseAPI uses and a detection counts as
+correct when it overlaps a labelled face with an IoU of at least 0.5.
+
+    python -m benchmarks.bench_face_detectors frames/ --backends hog hog_fast haar \\
+        --options '{"yunet": {"model_path": "face_detection_yunet_2023mar.onnx"}}'
+"""
+import os
+import json
+import time
+import argparse
+import cv2
+import numpy as np
+
+from recognition.face_detectors import make_face_detector
+
+
+def iou(a, b) -> float:
+    "Intersection over union of two (top, right, bottom, left) boxes."
+    height = min(a[2], b[2]) - max(a[0], b[0])
+    width = min(a[1], b[1]) - max(a[3], b[3])
+    if height <= 0 or width <= 0:
+        return 0.0
+    intersection = height * width
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return intersection / (area_a + area_b - intersection)
+
+
+def count_matches(detections, labels, threshold: float = 0.5) -> int:
+    "Greedy one to one matching of the detections with the labelled faces."
+    pairs = sorted(((iou(d, l), i, j) for i, d in enumerate(detections)
+                    for j, l in enumerate(labels)),
+                   reverse=True)
+    used_detections, used_labels = set(), set()
+    for overlap, i, j in pairs:
+        if overlap < threshold:
+            break
+        if i not in used_detections and j not in used_labels:
+            used_detections.add(i)
+            used_labels.add(j)
+    return len(used_labels)
+
+
+def run(detector, frames, scale: float) -> dict:
+    latencies, correct, detected, labelled = [], 0, 0, 0
+    for rgb_small_frame, labels in frames:
+        start = time.perf_counter()
+        boxes = detector.detect(rgb_small_frame)
+        latencies.append(time.perf_counter() - start)
+        boxes = [tuple(int(round(v / scale)) for v in box) for box in boxes]
+        correct += count_matches(boxes, labels)
+        detected += len(boxes)
+        labelled += len(labels)
+    latencies = np.array(latencies) * 1000
+    return {
+        "mean_ms": latencies.mean(),
+        "p95_ms": np.percentile(latencies, 95),
+        "precision": correct / detected if detected else 1.0,
+        "recall": correct / labelled if labelled else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("frames", help="folder of labelled frames")
+    parser.add_argument("--labels",
+                        help="labels file, defaults to <frames>/labels.json")
+    parser.add_argument("--backends",
+                        nargs="+",
+                        default=["hog", "hog_fast", "haar"])
+    parser.add_argument("--options",
+                        default="{}",
+                        help="JSON of keyword arguments per backend")
+    parser.add_argument("--scale", type=float, default=0.25)
+    args = parser.parse_args()
+
+    labels_path = args.labels or os.path.join(args.frames, "labels.json")
+    with open(labels_path) as f:
+        labels = json.load(f)
+    options = json.loads(args.options)
+
+    frames = []  #decoded and resized once, only the detection is timed
+    for file, boxes in sorted(labels.items()):
+        img = cv2.imread(os.path.join(args.frames, file))
+        if img is None:
+            print(f"Skipping unreadable frame {file}")
+            continue
+        small_frame = cv2.resize(img, (0, 0), fx=args.scale, fy=args.scale)
+        frames.append((cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB),
+                       [tuple(box) for box in boxes]))
+    print(f"{len(frames)} frames, {sum(len(b) for _, b in frames)} faces")
+
+    print(f"{'backend':>10} {'mean ms':>8} {'p95 ms':>8} {'precision':>10} "
+          f"{'recall':>7}")
+    for backend in args.backends:
+        detector = make_face_detector(backend, **options.get(backend, {}))
+        detector.detect(frames[0][0])  #warm up, e.g. the DNN allocations
+        result = run(detector, frames, args.scale)
+        print(f"{backend:>10} {result['mean_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+              f"{result['precision']:>10.3f} {result['recall']:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Recall and latency of the face index backends against the exact matcher.
+
+The gallery is random unit length encodings (the scale of dlib encodings)
+and every probe is a noisy copy of an enrolled encoding.
+
+    python -m benchmarks.bench_face_index --gallery 50000
+"""
+import time
+import argparse
+import numpy as np
+
+from recognition.face_index import BruteForceIndex, make_face_index
+
+
+def make_gallery(size: int, rng: np.random.Generator) -> np.ndarray:
+    "Unit length encodings, the scale of dlib encodings."
+    gallery = rng.normal(0, 1, (size, 128)).astype(np.float32)
+    gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+    return gallery
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--gallery", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(15)
+    gallery = make_gallery(args.gallery, rng)
+    labels = np.arange(args.gallery)
+    queries = gallery[rng.integers(0, args.gallery, args.queries)]
+    queries = queries + rng.normal(0, 0.03, queries.shape).astype(np.float32)
+
+    exact = BruteForceIndex()
+    exact.build(labels, gallery)
+    truth, _ = exact.query(queries, args.k)
+
+    configurations = [("brute_force", {})]
+    for nprobe in (1, 4, 16):
+        configurations.append(("ivf", {"nprobe": nprobe}))
+    for ef in (16, 64):
+        configurations.append(("hnsw", {"ef": ef}))
+
+    print(f"{'backend':<24} {'build s':>8} {'query ms':>9} {'recall':>7}")
+    for backend, options in configurations:
+        try:
+            index = make_face_index(backend, **options)
+        except ImportError as e:
+            print(f"{backend:<24} skipped: {e}")
+            continue
+        start = time.perf_counter()
+        index.build(labels, gallery)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = np.vstack([index.query(query, args.k)[0] for query in queries])
+        query_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        recall = np.mean([
+            len(set(a) & set(b)) / args.k for a, b in zip(found, truth)
+        ])
+        name = backend + "".join(f" {k}={v}" for k, v in options.items())
+        print(f"{name:<24} {build_time:>8.2f} {query_ms:>9.3f} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
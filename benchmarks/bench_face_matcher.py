@@ -0,0 +1,88 @@
+"""Matching latency for 10, 1k and 50k enrolled employees.
+
+Compares the per-face `compare_faces` + `face_distance` loop that
+`DatabaseAPI` used with the batched `FaceMatcher.match`.
+
+    python -m benchmarks.bench_face_matcher
+"""
+import time
+import argparse
+import numpy as np
+
+from recognition.face_matcher import FaceMatcher
+
+try:
+    import face_recognition
+    compare_faces = face_recognition.compare_faces
+    face_distance = face_recognition.face_distance
+except ImportError:  # same computation as face_recognition.api
+    def face_distance(face_encodings, face_to_compare):
+        if len(face_encodings) == 0:
+            return np.empty((0))
+        return np.linalg.norm(face_encodings - face_to_compare, axis=1)
+
+    def compare_faces(known_face_encodings, face_encoding_to_check,
+                      tolerance=0.6):
+        return list(
+            face_distance(known_face_encodings, face_encoding_to_check) <=
+            tolerance)
+
+
+def loop_match(known_face_names, known_face_encodings, face_encodings):
+    "The old matching loop of DatabaseAPI.gen_frames."
+    face_names = []
+    for face_encoding in face_encodings:
+        name = "Unknown"
+        matches = compare_faces(known_face_encodings, face_encoding)
+        face_distances = face_distance(known_face_encodings, face_encoding)
+        best_match_index = np.argmin(face_distances)
+        if matches[best_match_index]:
+            name = known_face_names[best_match_index]
+        face_names.append(name)
+    return face_names
+
+
+def timeit(function, repeat: int) -> float:
+    "Median milliseconds of `repeat` calls."
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--gallery", type=int, nargs="+",
+                        default=[10, 1000, 50000])
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(15)
+    print(f"{'gallery':>8} {'faces':>6} {'loop ms':>9} {'batched ms':>11} "
+          f"{'speedup':>8}")
+    for size in args.gallery:
+        known_face_encodings = list(rng.normal(0, 0.1, (size, 128)))
+        known_face_names = [f"employee_{i}" for i in range(size)]
+        matcher = FaceMatcher(known_face_names, known_face_encodings)
+        for faces in args.faces:
+            picked = rng.integers(0, size, faces)
+            face_encodings = [
+                known_face_encodings[i] + rng.normal(0, 0.01, 128)
+                for i in picked
+            ]
+            assert matcher.match(face_encodings)[0] == loop_match(
+                known_face_names, known_face_encodings, face_encodings)
+            loop_ms = timeit(
+                lambda: loop_match(known_face_names, known_face_encodings,
+                                   face_encodings), args.repeat)
+            batched_ms = timeit(lambda: matcher.match(face_encodings),
+                                args.repeat)
+            print(f"{size:>8} {faces:>6} {loop_ms:>9.3f} {batched_ms:>11.3f} "
+                  f"{loop_ms / batched_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Peak RSS of reading the enrolment gallery, all at once vs streamed.
+
+"list" is the old `read_images` behaviour (every full resolution image held
+in memory), "stream" is `DataImport.iter_images` decoding one downscaled image
+at a time. Each mode runs in its own process. Linux only (ru_maxrss in KB).
+
+    python -m benchmarks.bench_read_images --count 2000
+"""
+import os
+import sys
+import time
+import resource
+import argparse
+import tempfile
+import subprocess
+import cv2
+import numpy as np
+
+
+def make_gallery(folder: str, count: int, width: int, height: int) -> None:
+    "Writes `count` JPEG photos named like the images folder of the app."
+    rng = np.random.default_rng(15)
+    base = np.tile(
+        np.linspace(0, 255, width, dtype=np.uint8)[None, :, None],
+        (height, 1, 3))
+    for i in range(count):
+        img = base.copy()
+        cv2.circle(img, (width // 2, height // 2), height // 4,
+                   tuple(int(c) for c in rng.integers(0, 256, 3)), -1)
+        cv2.imwrite(os.path.join(folder, f"Employee{i}_employee{i}.jpg"), img)
+
+
+def run_mode(mode: str, folder: str) -> None:
+    "Reads the folder in this process and prints images, seconds and peak RSS in MB."
+    from data_ingestion.data_import_and_preprocessing import DataImport
+    start = time.perf_counter()
+    if mode == "list":
+        images = [
+            cv2.imread(os.path.join(folder, img))
+            for img in os.listdir(folder)
+        ]
+        count = len(images)
+    else:
+        count = sum(1 for _ in DataImport().iter_images(folder))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(count, seconds, peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--folder", help="existing image folder to read")
+    parser.add_argument("--mode", choices=["list", "stream"],
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.folder)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.folder
+        if not folder:
+            folder = tmp
+            make_gallery(folder, args.count, args.width, args.height)
+        print(f"{'mode':>7} {'images':>7} {'seconds':>8} {'peak RSS MB':>12}")
+        for mode in ("list", "stream"):
+            result = subprocess.run([
+                sys.executable, "-m", "benchmarks.bench_read_images",
+                "--mode", mode, "--folder", folder
+            ],
+                                    capture_output=True,
+                                    text=True)
+            if result.returncode:
+                # the "list" mode is killed by the OOM killer on large galleries
+                print(f"{mode:>7} failed with exit code {result.returncode}")
+                continue
+            count, seconds, peak = result.stdout.split()[-3:]
+            print(f"{mode:>7} {count:>7} {float(seconds):>8.2f} "
+                  f"{float(peak):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
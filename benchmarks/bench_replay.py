@@ -0,0 +1,186 @@
+"""Throughput, per-stage latency and accuracy of the recognition pipeline on a recording.
+
+Replays a video file or a directory of images through the recognizer built
+from config.json (known faces from the encoding store) and renders every
+frame like the video feed. The optional labels are a JSON file mapping frame
+names (image file names, or the zero padded frame index of a video) to the
+names of the employees in the frame, e.g. {"000042": ["Alice", "Bob"]}.
+`--metrics compare` replays the source as fast as possible, alternately
+without instrumentation and with the `PipelineMetrics` of the camera
+workers, and prints the per-frame overhead of the metrics from the fastest
+of `--repeat` replays of each, with the estimate of the recording calls per
+frame times their cost, which is not affected by the noise of the replays.
+
+    python -m benchmarks.bench_replay recordings/entrance.mp4 --labels labels.json
+    python -m benchmarks.bench_replay recordings/entrance.mp4 --metrics compare
+"""
+import json
+import time
+import timeit
+import typing
+import argparse
+import collections
+import numpy as np
+
+from data_ingestion.encoding_store import EncodingStore
+from recognition.face_index import make_face_index
+from recognition.face_detectors import make_face_detector
+from recognition.face_encoder import FaceEncoder
+from recognition.face_matcher import FaceMatcher
+from recognition.face_recognizer import FaceRecognizer
+from video_pipeline.frame_source import ReplaySource
+from video_pipeline.pipeline_metrics import PipelineMetrics, STAGES as METRIC_STAGES
+
+STAGES = ("resize", "detect", "encode", "match", "draw", "jpeg")
+
+
+def make_recognizer(config: dict, known_face_names, known_face_encodings,
+                    source: ReplaySource, observe=None) -> FaceRecognizer:
+    "Recognizer built like the one of a camera worker."
+    return FaceRecognizer(
+        FaceMatcher(known_face_names,
+                    known_face_encodings,
+                    index=make_face_index(**config["face_index"])),
+        make_face_detector(**config["face_detector"]),
+        FaceEncoder(**config["face_encoder"]), config["recognition_scale"],
+        config["motion_gate"], config["face_tracking"],
+        config["max_detection_interval"], lambda: source.fps, observe)
+
+
+def frame_time(config: dict, known_face_names, known_face_encodings,
+               path: str, fps: float,
+               metrics: bool) -> typing.Tuple[float, float]:
+    "Seconds per frame of a replay as fast as possible, with or without `PipelineMetrics`, and the stages recorded per frame."
+    source = ReplaySource(path, fps, realtime=False)
+    pipeline_metrics = PipelineMetrics() if metrics else None
+    recognizer = make_recognizer(
+        config, known_face_names, known_face_encodings, source,
+        pipeline_metrics.observe if metrics else None)
+    frames = 0
+    start = time.perf_counter()
+    while True:
+        success, frame = source.read()
+        if not success:
+            break
+        face_locations, face_names = recognizer.process(frame)
+        recognizer.render(frame, face_locations, face_names)
+        if pipeline_metrics is not None:
+            pipeline_metrics.count_frames()
+        frames += 1
+    wall = time.perf_counter() - start
+    source.release()
+    observed = 0.0
+    if pipeline_metrics is not None:
+        observed = sum(
+            pipeline_metrics.histogram(stage)[0][-1]
+            for stage in METRIC_STAGES)
+    return wall / max(frames, 1), observed / max(frames, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="video file or directory of images")
+    parser.add_argument("--labels", help="JSON of the names in every frame")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--realtime",
+                        action="store_true",
+                        help="pace the frames at the native frame rate")
+    parser.add_argument("--fps", type=float, help="frame rate of the replay")
+    parser.add_argument(
+        "--metrics",
+        choices=["on", "off", "compare"],
+        default="on",
+        help="time the stages, replay without instrumentation, or measure "
+        "the overhead of PipelineMetrics")
+    parser.add_argument("--repeat",
+                        type=int,
+                        default=5,
+                        help="replays of each mode with --metrics compare")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    labels = {}
+    if args.labels:
+        with open(args.labels) as f:
+            labels = json.load(f)
+
+    known_face_names, known_face_encodings = EncodingStore(
+        config["encoding_store_path"]).sync(config["image_path"])
+    if args.metrics == "compare":
+        times = {False: [], True: []}
+        frame_time(config, known_face_names, known_face_encodings,
+                   args.source, args.fps, False)  #warm up the caches
+        for _ in range(args.repeat):
+            for metrics in (False, True):
+                times[metrics].append(
+                    frame_time(config, known_face_names,
+                               known_face_encodings, args.source, args.fps,
+                               metrics))
+        off = min(seconds for seconds, _ in times[False])
+        on = min(seconds for seconds, _ in times[True])
+        observed = times[True][0][1]
+        metrics = PipelineMetrics()
+        calls = 100000
+        observe = timeit.timeit(lambda: metrics.observe("detect", 0.001),
+                                number=calls) / calls
+        print(f"metrics off: {off * 1000:.3f} ms per frame")
+        print(f"metrics on:  {on * 1000:.3f} ms per frame")
+        print(f"overhead:    {(on - off) * 1000:+.3f} ms per frame "
+              f"({(on - off) / off * 100:+.2f} %)")
+        # the difference of two replays is noisy, the cost of the calls is not
+        print(f"estimated:   {observed:.1f} observe calls per frame of "
+              f"{observe * 1e6:.2f} us each, "
+              f"{observed * observe * 1000:.4f} ms "
+              f"({observed * observe / off * 100:.3f} %)")
+        return
+
+    stage_times = collections.defaultdict(list)
+    source = ReplaySource(args.source, args.fps, realtime=args.realtime)
+    recognizer = make_recognizer(
+        config, known_face_names, known_face_encodings, source,
+        (lambda stage, seconds: stage_times[stage].append(seconds))
+        if args.metrics == "on" else None)
+
+    frames, labelled_frames, exact = 0, 0, 0
+    correct, recognized, labelled = 0, 0, 0
+    start = time.perf_counter()
+    while True:
+        success, frame = source.read()
+        if not success:
+            break
+        face_locations, face_names = recognizer.process(frame)
+        recognizer.render(frame, face_locations, face_names)
+        frames += 1
+        if source.name in labels:
+            expected = collections.Counter(labels[source.name])
+            found = collections.Counter(
+                name for name in face_names if name != "Unknown")
+            correct += sum((expected & found).values())
+            recognized += sum(found.values())
+            labelled += sum(expected.values())
+            labelled_frames += 1
+            exact += expected == found
+    wall = time.perf_counter() - start
+    source.release()
+
+    print(f"{frames} frames in {wall:.1f} s: {frames / wall:.1f} FPS")
+    if args.metrics == "on":
+        print(f"{'stage':>8} {'calls':>6} {'mean ms':>8} {'p50 ms':>8} "
+              f"{'p95 ms':>8}")
+        for stage in STAGES:
+            times = np.array(stage_times[stage]) * 1000
+            if not len(times):
+                continue
+            print(f"{stage:>8} {len(times):>6} {times.mean():>8.2f} "
+                  f"{np.percentile(times, 50):>8.2f} "
+                  f"{np.percentile(times, 95):>8.2f}")
+    if labels:
+        print(f"labelled frames: {labelled_frames}, "
+              f"exact: {exact}, "
+              f"precision: {correct / recognized if recognized else 1.0:.3f}, "
+              f"recall: {correct / labelled if labelled else 1.0:.3f}")
+
+
+if __name__ == "__main__":
+    main()
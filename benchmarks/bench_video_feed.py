@@ -0,0 +1,119 @@
+"""CPU cost of the /video_feed stream for 1 to 20 viewers.
+
+A `CameraWorker` renders and JPEG encodes every frame once into its
+`SharedFrame`. Every viewer of `CameraWorker.subscribe` waits for the latest
+image with `SharedFrame.wait_for_jpeg`, so a slow viewer skips to the newest
+frame instead of queueing old ones. This is compared with one render per
+viewer (the old `DatabaseAPI.gen_frames` route). The worker runs as a thread
+so its CPU time is counted, and detection is replaced with a blur of the
+1/4 sized frame so the benchmark runs without dlib.
+
+    python -m benchmarks.bench_video_feed
+"""
+import os
+import time
+import typing
+import argparse
+import tempfile
+import threading
+import cv2
+import numpy as np
+
+from benchmarks.synthetic_camera import SyntheticCamera
+from video_pipeline.camera_worker import CameraWorker
+
+
+def render(frame: np.ndarray) -> bytes:
+    "Stand-in for FaceRecognizer.render."
+    frame = frame.copy()
+    cv2.rectangle(frame, (100, 100), (300, 300), (0, 0, 255), 2)
+    ret, buffer = cv2.imencode(".jpg", frame)
+    return buffer.tobytes()
+
+
+class BlurRecognizer:
+    "Stand-in for FaceRecognizer, `process` costs about one small detection."
+    motion_gate = None
+    observe = None
+    matcher = None
+
+    def process(self, frame: np.ndarray) -> typing.Tuple[list, list]:
+        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
+        cv2.GaussianBlur(small_frame, (15, 15), 0)
+        return [], []
+
+    def render(self, frame: np.ndarray, face_locations: list,
+               face_names: list) -> bytes:
+        return render(frame)
+
+
+def per_viewer_stream(worker: CameraWorker) -> typing.Iterator[bytes]:
+    "Old behaviour: every viewer renders every frame itself."
+    seq = 0
+    while True:
+        seq, frame = worker.wait_for_frame(seq)
+        if frame is not None:
+            BlurRecognizer().process(frame)
+            yield (b"--frame\r\n"
+                   b"Content-Type: image/jpeg\r\n\r\n" + render(frame) +
+                   b"\r\n")
+
+
+def measure(make_stream, viewers: int, duration: float) -> tuple:
+    "Returns CPU seconds per wall second and frames received per viewer per second."
+    stop = threading.Event()
+    received = [0] * viewers
+
+    def viewer(index):
+        stream = make_stream()
+        for _ in stream:
+            received[index] += 1
+            if stop.is_set():
+                break
+        stream.close()
+
+    threads = [
+        threading.Thread(target=viewer, args=(i, ), daemon=True)
+        for i in range(viewers)
+    ]
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    for thread in threads:
+        thread.join(2.0)
+    return cpu / wall, sum(received) / viewers / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--viewers", type=int, nargs="+",
+                        default=[1, 2, 5, 10, 20])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as frames_path:
+        # a replayed directory of frames, paced at 30 fps like a camera
+        camera = SyntheticCamera()
+        for i in range(30):
+            _, frame = camera.read()
+            cv2.imwrite(os.path.join(frames_path, f"{i:06d}.png"), frame)
+        worker = CameraWorker("bench", frames_path,
+                              lambda fps: BlurRecognizer(),
+                              use_process=False).start()
+        print(f"{'viewers':>8} {'per-viewer cpu':>15} {'shared cpu':>11} "
+              f"{'shared fps':>11}")
+        for viewers in args.viewers:
+            old_cpu, _ = measure(lambda: per_viewer_stream(worker), viewers,
+                                 args.duration)
+            new_cpu, fps = measure(worker.subscribe, viewers, args.duration)
+            print(f"{viewers:>8} {old_cpu:>15.2f} {new_cpu:>11.2f} "
+                  f"{fps:>11.1f}")
+        worker.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import time
+import typing
+import cv2
+import numpy as np
+
+
+class SyntheticCamera:
+    "Stand-in for cv2.VideoCapture producing scrolling noise frames at a fixed frame rate"
+
+    def __init__(self,
+                 width: int = 640,
+                 height: int = 480,
+                 fps: float = 30.0,
+                 seed: int = 15,
+                 speed: int = 8,
+                 sensor_noise: float = 0.0):
+        """`speed` is the scroll in pixels per frame (0 is a static scene) and
+        `sensor_noise` the standard deviation of the noise added to every frame."""
+        rng = np.random.default_rng(seed)
+        self.speed = speed
+        # a few precomputed noise frames, split in a positive and a negative
+        # part so they can be applied with saturating cv2.add/cv2.subtract
+        self._noise = []
+        for _ in range(8 if sensor_noise else 0):
+            noise = rng.normal(0, sensor_noise, (height, width, 3))
+            self._noise.append((np.clip(noise, 0, 255).astype(np.uint8),
+                                np.clip(-noise, 0, 255).astype(np.uint8)))
+        self.frame_time = 1.0 / fps
+        # a wider texture that is scrolled to fake camera motion, large blobs
+        # (like people) with fine detail on top
+        blobs = cv2.resize(rng.integers(0, 256, (height // 32, width // 16, 3),
+                                        dtype=np.uint8), (width * 2, height),
+                           interpolation=cv2.INTER_CUBIC)
+        detail = rng.integers(0, 64, (height, width * 2, 3), dtype=np.uint8)
+        self._texture = cv2.add((blobs * 0.75).astype(np.uint8), detail)
+        self.width = width
+        self._index = 0
+        self._next = time.perf_counter()
+
+    def read(
+        self,
+        image: typing.Optional[np.ndarray] = None
+    ) -> typing.Tuple[bool, np.ndarray]:
+        "Same interface as cv2.VideoCapture.read, paced at the frame rate."
+        self._next += self.frame_time
+        delay = self._next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self._next = time.perf_counter()
+        offset = (self._index * self.speed) % self.width
+        self._index += 1
+        frame = self._texture[:, offset:offset + self.width]
+        if self._noise:
+            positive, negative = self._noise[self._index % len(self._noise)]
+            frame = cv2.subtract(cv2.add(frame, positive), negative)
+        if image is None or image.shape != frame.shape:
+            return True, frame.copy()
+        np.copyto(image, frame)
+        return True, image
+
+    def release(self) -> None:
+        pass
@@ -1,13 +1,14 @@
-from flask import render_template, request, session, redirect, url_for, Blueprint, jsonify
+from flask import render_template, request, session, redirect, url_for, Blueprint, jsonify, abort
 import json
 import bcrypt
-import pymongo
 import calendar
 # from datetime import timedelta
-from itertools import groupby
 
 #custom package import
 from dashboard.generate_reports.reports import Graph_Plotly
+from database_api_functions.attendance_store import make_attendance_store, parse_daily_collection_name
+from database_api_functions.daily_activity import make_daily_activity_store
+from database_api_functions.mongo_client import get_mongo_client
 from email_oauth.email_using_oauth import Send_Email
 
 #instantiating the app
@@ -22,12 +23,15 @@ dashboard_app.secret_key = "secret!"  #secret key
 with open('dashboard\config.json') as f:
     config = json.load(f)
 
-#* mongodb connection
+#* mongodb connection, the pooled client shared with the app
 mongodb_url = config["mongodb_url"]
-client = pymongo.MongoClient(mongodb_url)
+client = get_mongo_client(mongodb_url, **config["mongo_client"])
 
 #* attendance database
 attendance_database = client[config["attendance_database_name"]]
+attendance = make_attendance_store(attendance_database,
+                                   config["attendance_storage"],
+                                   config["attendance_catalogue_ttl"])
 
 #* login database
 login_database = client[config["login_database_name"]]
@@ -37,6 +41,8 @@ login_collection = login_database[login_collection_name]
 
 #* employee database
 employee_database = client[config["employee_database_name"]]
+daily_activity = make_daily_activity_store(employee_database,
+                                           **config["daily_activity"])
 
 #email object
 mail = Send_Email()
@@ -141,14 +147,20 @@ def dashboard_logout():
 def dashboard(months_name=None):
     if 'dash_username' in session:
         global data, dates, month_name, month_data
-        data = sorted(attendance_database.list_collection_names(),
-                      reverse=True)
-        dates = [file.split('_')[1] for file in data]
+        # days grouped by month name over every year, from the catalogue
+        # without a database query
         month_name, month_data = [], []
+        month_years = {}  #month name -> years it has attendance in
         #making two list
-        for month, date in groupby(dates, key=lambda x: x.split('-')[1]):
-            month_name.append(calendar.month_name[int(month)])
-            month_data.append([calendar.month_name[int(month)], list(date)])
+        for year, month, days in attendance.catalogue.months():  #latest first
+            name = calendar.month_name[month]
+            if name not in month_years:
+                month_name.append(name)
+                month_data.append([name, []])
+                month_years[name] = []
+            month_years[name].append(year)
+            month_data[month_name.index(name)][1].extend(
+                day.strftime('%Y-%m-%d') for day in days)
 
         # for specific urls
         if "dashboard" in request.url_rule.rule:
@@ -167,8 +179,11 @@ def dashboard(months_name=None):
         # for reports
         else:
             if months_name:
-                graph = Graph_Plotly(database=attendance_database)
-                graph.create_graph(months_name)
+                if months_name not in month_years:
+                    abort(404)
+                graph = Graph_Plotly(database=attendance_database,
+                                     attendance=attendance)
+                graph.create_graph(months_name, month_years[months_name])
                 return render_template("dashboard/report.html")
 
             return render_template('dashboard/monthly_reports.html',
@@ -181,8 +196,10 @@ def dashboard(months_name=None):
 @dashboard_app.route('/employee/<string:collection_name>')
 def employee(collection_name):
     if 'dash_username' in session:
-        collection = attendance_database[collection_name]
-        content = collection.find()
+        day = parse_daily_collection_name(collection_name)
+        if day is None:
+            abort(404)
+        content = attendance.records_of_day(day)
         return render_template('dashboard/employee.html',
                                content=enumerate(content))
     else:
@@ -373,27 +390,23 @@ def emp_reports(emp_email=None, month_name=None):
                                emp_reports=True)
     else:
         correct_email = emp_email.replace("%40", "@")
-        emp_data = employee_database[correct_email]
-        dates = [i["Date"] for i in emp_data.find({})]
-        month_names_list = []
+        month_years = {}  #month name -> years with records, oldest first
+        for day in daily_activity.days(correct_email):
+            years = month_years.setdefault(calendar.month_name[day.month], [])
+            if day.year not in years:
+                years.append(day.year)
         if emp_email and not month_name:
-            for month, data in groupby(
-                    dates,
-                    key=lambda x: calendar.month_name[int(x.split("/")[1])]):
-                month_names_list.append(month)
             return render_template('dashboard/monthly_reports.html',
-                                   dates=enumerate(month_names_list),
+                                   dates=enumerate(month_years),
                                    emp_reports=True,
                                    emp_email=correct_email)
         else:
-            graph = Graph_Plotly(database=employee_database)
-            for month, data in groupby(
-                    dates,
-                    key=lambda x: calendar.month_name[int(x.split("/")[1])]):
-                if month == month_name:
-                    month_data = list(data)
-                    # print(month_data)
-            graph.create_employee_graph(correct_email, month_name, month_data)
+            if month_name not in month_years:
+                abort(404)
+            graph = Graph_Plotly(database=employee_database,
+                                 daily_activity=daily_activity)
+            graph.create_employee_graph(correct_email, month_name,
+                                        month_years[month_name])
             return render_template("dashboard/report.html")
 
 
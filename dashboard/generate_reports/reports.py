@@ -1,24 +1,27 @@
 import plotly.graph_objects as go
 import calendar
-from datetime import datetime
 
 
 class Graph_Plotly:
     "Class to Create Graphs using the MongoDB Database"
 
-    def __init__(self, database):
+    def __init__(self, database, attendance=None, daily_activity=None):
         self.database = database  #MongoDB Database object
+        self.attendance = attendance  #attendance store, for create_graph
+        self.daily_activity = daily_activity  #daily activity store, for create_employee_graph
 
-    def create_graph(self, month_name):
-        "Function to create a HTML report Document using Plotly"
+    def create_graph(self, month_name, years):
+        "Function to create a HTML report Document using Plotly, for the month in every year of `years`"
 
-        data = self.database.list_collection_names()
-        dates = [file.split('_')[1] for file in data]
-        d = dict()
-        for i in range(len(dates)):
-            if calendar.month_name[int(dates[i].split('-')[1])] == month_name:
-                #calculating total number of employees present
-                d[dates[i]] = self.database[data[i]].estimated_document_count()
+        month = list(calendar.month_name).index(month_name)
+        #total number of employees present on every day of the month
+        counts = {}
+        for year in years:
+            counts.update(self.attendance.count_per_day(year, month))
+        d = {
+            day.strftime('%Y-%m-%d'): count
+            for day, count in sorted(counts.items())
+        }
 
         x = list(d.keys())
         y = list(d.values())
@@ -42,23 +45,20 @@ class Graph_Plotly:
         fig.write_html(
             "dashboard\\dashboard_templates\\dashboard\\report.html")
 
-    def create_employee_graph(self, emp_email, month_name, month_data):
-        "Function to create a HTML report Document using Plotly for each employee"
+    def create_employee_graph(self, emp_email, month_name, years):
+        "Function to create a HTML report Document using Plotly for each employee, for the month in every year of `years`"
 
-        data = self.database[emp_email]
-        total_time = []
-        idle_time = []
-
-        for i in month_data:
-            emp_data = data.find_one({"Date": i})
-
-            if emp_data["Total_Time"]:
-                t_time = datetime.strptime(emp_data["Total_Time"], "%H:%M:%S")
-                i_time = datetime.strptime(emp_data["Idle_Time"], "%H:%M:%S")
-                total_time.append(t_time.hour + (t_time.minute / 60) +
-                                  (t_time.second / 3600))
-                idle_time.append(i_time.hour + (i_time.minute / 60) +
-                                 (i_time.second / 3600))
+        month = list(calendar.month_name).index(month_name)
+        #all the days of the month with one query per year
+        records = sorted((record for year in years
+                          for record in self.daily_activity.month(
+                              year, month, email=emp_email)),
+                         key=lambda record: record["Date"])
+        month_data = [
+            record["Date"].strftime("%d/%m/%Y") for record in records
+        ]
+        total_time = [record["Total_Seconds"] / 3600 for record in records]
+        idle_time = [record["Idle_Seconds"] / 3600 for record in records]
 
         fig = go.Figure()
         fig.add_trace(
@@ -72,7 +72,7 @@ class Graph_Plotly:
                    name="Total Time",
                    marker_color="rgb(11, 137, 43)"))
 
-        fig.update_layout(title=emp_data["Name"] +
+        fig.update_layout(title=records[-1]["Name"] +
                           f"'s {month_name} Month Report",
                           title_x=0.5,
                           barmode='group',
@@ -3,9 +3,26 @@ import os
 import cv2
 import numpy
 import typing
+import struct
 import pandas as pd
 import face_recognition
+import multiprocessing
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".jpe", ".png", ".bmp", ".webp", ".tif",
+                    ".tiff")
+MAX_IMAGE_SIDE = 1024  #longest side of the images given to the encoder
+#cv2 flags decoding a JPEG at 1/2, 1/4 or 1/8 of its size
+REDUCED_READ_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                      (4, cv2.IMREAD_REDUCED_COLOR_4),
+                      (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+#status of an encoded image
+ENCODING_OK = "ok"
+NO_FACE = "no face"
+MULTIPLE_FACES = "multiple faces"  #the largest face is encoded
+UNREADABLE = "unreadable"
 
 
 class DataImport:
@@ -90,12 +107,42 @@ class DataImport:
                 raise Exception(e)  #raise Exception if any
         return attendance_file_path
 
+    def iter_images(
+        self,
+        image_path: typing.Union[str, bytes, os.PathLike] = None,
+        max_side: typing.Optional[int] = MAX_IMAGE_SIDE
+    ) -> typing.Iterator[typing.Tuple[str, str, numpy.ndarray]]:
+        """Function to lazily read the images of the given image path, one at a time
+
+        Parameters
+        -----------
+            - `image_path` (str, bytes, os.PathLike, optional): Path of the image folder. Defaults to None.
+            - `max_side` (int, optional): Longest side of the returned images, larger images are decoded at a reduced size. None keeps the full size. Defaults to `MAX_IMAGE_SIDE`.
+
+        Returns
+        --------
+            `Iterator[Tuple[str, str, numpy.ndarray]]`: Known Face Name, path and image of every readable image file
+        """
+        if not image_path:
+            image_path = "images"
+        for img in sorted(os.listdir(image_path)):  #Get all the images from the image path
+            path = os.path.join(image_path, img)
+            if not is_image_file(path):
+                continue
+            current_Img = read_image(path, max_side)  #reading the image
+            if current_Img is None:
+                print(f"Could not read {path}, skipping it")
+                continue
+            yield os.path.splitext(img)[0].split("_")[0], path, current_Img
+
     def read_images(
         self,
         image_path: typing.Union[str, bytes, os.PathLike] = None
     ) -> typing.Tuple[typing.List[numpy.ndarray], typing.List[numpy.ndarray]]:
         """Function to read images from the given image path
 
+        All the images are held in memory, prefer `iter_images` for large folders.
+
         Parameters
         -----------
             - `image_path` (str, bytes, os.PathLike, optional): Path of the image folder. Defaults to None.
@@ -104,20 +151,10 @@ class DataImport:
         --------
             `Tuple[List[numpy.ndarray], List[numpy.ndarray]]`: Images and Known Face Names
         """
-
-        if not image_path:
-            image_path = "images"
         images = []  #list to store images
         known_face_names = []  #list to store face names
-        image_list = os.listdir(
-            image_path)  #Get all the images from the image path
-        print(f"Images Present in {image_path} are: {image_list}")
-        for img in image_list:
-            current_Img = cv2.imread(os.path.join(image_path,
-                                                  img))  #reading the images
+        for img_name, path, current_Img in self.iter_images(image_path):
             images.append(current_Img)
-
-            img_name = os.path.splitext(img)[0].split("_")[0]
             known_face_names.append(img_name)
         print(f"Names Extracted from Images: {known_face_names}")
 
@@ -147,3 +184,165 @@ class Preprocessing:
             encode = face_recognition.face_encodings(img)[0]
             encodeList.append(encode)
         return encodeList
+
+    def faceEncodingsBatch(
+        self,
+        paths: typing.Iterable[typing.Union[str, bytes, os.PathLike]],
+        workers: typing.Optional[int] = None,
+        chunk_size: int = 4
+    ) -> typing.Iterator[typing.Tuple[typing.Union[str, bytes, os.PathLike],
+                                      str, typing.Optional[numpy.ndarray]]]:
+        """Function to get face encodings of image files using a pool of processes
+
+        Every worker reads and decodes its own images, so only the images being
+        encoded are held in memory.
+
+        Parameters
+        -----------
+            - `paths` (Iterable[str, bytes, os.PathLike]): Paths of the images.
+            - `workers` (int, optional): Number of worker processes, 1 encodes in this process. Defaults to (0 or None) one per CPU.
+            - `chunk_size` (int, optional): Number of images sent to a worker at once. Defaults to 4.
+
+        Returns
+        --------
+            `Iterator[Tuple[str, str, numpy.ndarray]]`: Path, status (`ENCODING_OK`, `NO_FACE`, `MULTIPLE_FACES` or `UNREADABLE`) and encoding (None unless a face was found) of every image, in order.
+        """
+        paths = list(paths)
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+        if workers <= 1:
+            for path in paths:
+                status, encoding = encode_image_file(path)
+                yield path, status, encoding
+            return
+
+        # forked workers do not re-import the main module
+        context = multiprocessing.get_context("fork") if can_fork() else None
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=context) as pool:
+            for path, (status, encoding) in zip(
+                    paths,
+                    pool.map(encode_image_file, paths,
+                             chunksize=max(1, chunk_size))):
+                yield path, status, encoding
+
+
+def encode_image_file(
+    path: typing.Union[str, bytes, os.PathLike]
+) -> typing.Tuple[str, typing.Optional[numpy.ndarray]]:
+    """Function to read an image file and get its face encoding (runs in the worker processes)
+
+    Parameters
+    -----------
+        - `path` (str, bytes, os.PathLike): Path of the image.
+
+    Returns
+    --------
+        `Tuple[str, numpy.ndarray]`: Status of the image and the encoding of its (largest) face, None if no face was found.
+    """
+    img = read_image(path)
+    if img is None:
+        return UNREADABLE, None
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)  #converting the image from BGR to RGB
+    face_locations = face_recognition.face_locations(img)
+    if not face_locations:
+        return NO_FACE, None
+
+    status = ENCODING_OK
+    if len(face_locations) > 1:
+        status = MULTIPLE_FACES
+        face_locations = [
+            max(face_locations,
+                key=lambda box: (box[2] - box[0]) * (box[1] - box[3]))
+        ]
+    encode = face_recognition.face_encodings(img, face_locations)[0]
+    return status, encode
+
+
+def is_image_file(path: typing.Union[str, bytes, os.PathLike]) -> bool:
+    "Function to check if a path is a file with an image extension"
+    return os.path.isfile(path) and os.path.splitext(
+        path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def image_size(
+    path: typing.Union[str, bytes, os.PathLike]
+) -> typing.Optional[typing.Tuple[int, int]]:
+    """Function to get the size of a JPEG or PNG image from its header, without decoding it
+
+    Parameters
+    -----------
+        - `path` (str, bytes, os.PathLike): Path of the image.
+
+    Returns
+    --------
+        `Tuple[int, int]`: Width and height, None for other formats or a damaged header.
+    """
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if head[:8] == b"\x89PNG\r\n\x1a\n" and len(head) == 24:
+            return struct.unpack(">II", head[16:24])
+        if head[:2] != b"\xff\xd8":
+            return None
+        # walk the JPEG segments up to the start of frame
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if 0xD0 <= marker[1] <= 0xD9 or marker[1] == 0x01:
+                continue  #markers without a length
+            length = f.read(2)
+            if len(length) < 2:
+                return None
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8,
+                                                               0xCC):
+                frame = f.read(5)
+                if len(frame) < 5:
+                    return None
+                height, width = struct.unpack(">HH", frame[1:5])
+                return width, height
+            f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def read_image(
+    path: typing.Union[str, bytes, os.PathLike],
+    max_side: typing.Optional[int] = MAX_IMAGE_SIDE
+) -> typing.Optional[numpy.ndarray]:
+    """Function to read an image, decoding large JPEGs directly at 1/2, 1/4 or 1/8 of their size
+
+    Parameters
+    -----------
+        - `path` (str, bytes, os.PathLike): Path of the image.
+        - `max_side` (int, optional): Longest side of the returned image, None keeps the full size. Defaults to `MAX_IMAGE_SIDE`.
+
+    Returns
+    --------
+        `numpy.ndarray`: BGR image, None if it could not be read.
+    """
+    flags = cv2.IMREAD_COLOR
+    if max_side:
+        size = image_size(path)
+        if size:
+            for factor, reduced_flags in REDUCED_READ_FLAGS:
+                if max(size) // factor >= max_side:
+                    flags = reduced_flags
+                    break
+    img = cv2.imread(path, flags)
+    if img is None or not max_side or max(img.shape[:2]) <= max_side:
+        return img
+    scale = max_side / max(img.shape[:2])
+    # after a reduced decode the scale is above 1/2, where linear is enough
+    return cv2.resize(img, (0, 0),
+                      fx=scale,
+                      fy=scale,
+                      interpolation=cv2.INTER_LINEAR
+                      if scale > 0.5 else cv2.INTER_AREA)
+
+
+def can_fork() -> bool:
+    """Function to check if worker processes can be forked
+
+    Without fork (Windows) the workers re-import the main module, which is only
+    safe when it is guarded by `if __name__ == "__main__"`.
+    """
+    return "fork" in multiprocessing.get_all_start_methods()
@@ -0,0 +1,197 @@
+# library imports
+import os
+import json
+import numpy
+import typing
+import hashlib
+import argparse
+import threading
+
+from data_ingestion.data_import_and_preprocessing import (
+    Preprocessing, ENCODING_OK, MULTIPLE_FACES, is_image_file)
+
+ENCODINGS_FILE = "encodings.npy"  #(N, 128) float32 matrix
+INDEX_FILE = "index.json"  #name, file, hash, size, mtime and status of every row
+NO_FACE_ROW = numpy.full(128, numpy.nan, dtype=numpy.float32)  #row of an image without a face
+
+
+class EncodingStore:
+    "Class to keep the face encodings of the image folder on disk and only re-encode new or changed images"
+
+    def __init__(self, store_path: typing.Union[str, bytes, os.PathLike]):
+        """Instantiate the EncodingStore object
+
+        Parameters
+        -----------
+           - `store_path` (str, bytes, os.PathLike): Folder holding `encodings.npy` and `index.json`, created if missing.
+        """
+        self.store_path = store_path
+        os.makedirs(store_path, exist_ok=True)
+        self._lock = threading.Lock()  #one sync at a time
+        self.entries, self.encodings = self._load()
+
+    def _load(self) -> typing.Tuple[typing.List[dict], numpy.ndarray]:
+        "Reads the index and the matrix, an unreadable or mismatched store is treated as empty."
+        empty = [], numpy.empty((0, 128), dtype=numpy.float32)
+        try:
+            with open(os.path.join(self.store_path, INDEX_FILE)) as f:
+                entries = json.load(f)
+            encodings = numpy.load(
+                os.path.join(self.store_path, ENCODINGS_FILE))
+        except (OSError, ValueError):
+            return empty
+        if len(entries) != len(encodings):
+            print("Encoding store is inconsistent, re-encoding all images")
+            return empty
+        return entries, encodings.astype(numpy.float32, copy=False)
+
+    def _save(self) -> None:
+        "Writes the matrix and the index, replacing the old files atomically."
+        matrix_path = os.path.join(self.store_path, ENCODINGS_FILE)
+        index_path = os.path.join(self.store_path, INDEX_FILE)
+        with open(matrix_path + ".tmp", "wb") as f:
+            numpy.save(f, self.encodings)
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(matrix_path + ".tmp", matrix_path)
+        os.replace(index_path + ".tmp", index_path)
+
+    def encoding_of(self, file: str) -> typing.Optional[numpy.ndarray]:
+        """Function to get the stored encoding of an image of the folder
+
+        Parameters
+        -----------
+            - `file` (str): File name of the image, as of the last `sync`.
+
+        Returns
+        --------
+            `numpy.ndarray`: Encoding of the image, None if it is unknown or has no face.
+        """
+        with self._lock:
+            for entry, encoding in zip(self.entries, self.encodings):
+                if entry["file"] == file:
+                    return None if numpy.isnan(encoding[0]) else encoding
+        return None
+
+    @staticmethod
+    def file_hash(path: typing.Union[str, bytes, os.PathLike]) -> str:
+        "SHA-1 of the content of a file."
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def sync(
+        self,
+        image_path: typing.Union[str, bytes, os.PathLike] = None,
+        workers: typing.Optional[int] = None,
+        chunk_size: int = 4
+    ) -> typing.Tuple[typing.List[str], numpy.ndarray]:
+        """Function to bring the store up to date with the image folder
+
+        Unchanged files (same size and mtime) are not read at all, files with a
+        known content hash reuse their encoding and only the others are encoded.
+
+        Parameters
+        -----------
+            - `image_path` (str, bytes, os.PathLike, optional): Path of the image folder. Defaults to None.
+            - `workers` (int, optional): Worker processes encoding the new images, see `Preprocessing.faceEncodingsBatch`. Defaults to the number of CPUs.
+            - `chunk_size` (int, optional): Number of images sent to a worker at once. Defaults to 4.
+
+        Returns
+        --------
+            `Tuple[List[str], numpy.ndarray]`: Known Face Names and their encodings as a (N, 128) matrix, images without a face are left out
+        """
+        if not image_path:
+            image_path = "images"
+        with self._lock:
+            return self._sync(image_path, workers, chunk_size)
+
+    def _sync(
+        self, image_path: typing.Union[str, bytes, os.PathLike],
+        workers: typing.Optional[int], chunk_size: int
+    ) -> typing.Tuple[typing.List[str], numpy.ndarray]:
+        by_file = {entry["file"]: i for i, entry in enumerate(self.entries)}
+        by_hash = {entry["hash"]: i for i, entry in enumerate(self.entries)}
+        entries, rows, pending = [], [], []
+
+        for img in sorted(os.listdir(image_path)):
+            path = os.path.join(image_path, img)
+            if not is_image_file(path):
+                continue
+            stat = os.stat(path)
+            entry = {
+                "name": os.path.splitext(img)[0].split("_")[0],
+                "file": img,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime
+            }
+            old = by_file.get(img)
+            if old is None or self.entries[old]["size"] != stat.st_size \
+                    or self.entries[old]["mtime"] != stat.st_mtime:
+                entry["hash"] = self.file_hash(path)
+                old = by_hash.get(entry["hash"])
+            else:
+                entry["hash"] = self.entries[old]["hash"]
+
+            if old is not None:
+                entry["status"] = self.entries[old].get("status", ENCODING_OK)
+                rows.append(self.encodings[old])
+            else:
+                pending.append((len(rows), path))
+                rows.append(NO_FACE_ROW)
+            entries.append(entry)
+
+        # only the new or changed images are encoded
+        encoded = Preprocessing().faceEncodingsBatch(
+            [path for _, path in pending], workers, chunk_size)
+        for (row, _), (path, status, encoding) in zip(pending, encoded):
+            entries[row]["status"] = status
+            if encoding is not None:
+                rows[row] = encoding
+            # the status is remembered so a bad image is not encoded again
+            if status == MULTIPLE_FACES:
+                print(f"Multiple faces found in {path}, using the largest one")
+            elif status != ENCODING_OK:
+                print(f"Skipping {path}: {status}")
+
+        self.entries = entries
+        self.encodings = numpy.asarray(rows, dtype=numpy.float32).reshape(
+            -1, 128)
+        self._save()
+        print(
+            f"Encoding store: {len(entries)} images, {len(pending)} encoded")
+        return self._known_faces()
+
+    def _known_faces(self) -> typing.Tuple[typing.List[str], numpy.ndarray]:
+        has_face = ~numpy.isnan(self.encodings[:, 0])
+        known_face_names = [
+            entry["name"]
+            for entry, face in zip(self.entries, has_face) if face
+        ]
+        return known_face_names, self.encodings[has_face]
+
+    def known_faces(self) -> typing.Tuple[typing.List[str], numpy.ndarray]:
+        """Function to get the known faces as of the last `sync`, without reading the image folder
+
+        Returns
+        --------
+            `Tuple[List[str], numpy.ndarray]`: Known Face Names and their encodings as a (N, 128) matrix, images without a face are left out
+        """
+        with self._lock:
+            return self._known_faces()
+
+
+if __name__ == "__main__":
+    # building the store outside the app, e.g. for a large gallery on Windows:
+    # python -m data_ingestion.encoding_store images encodings --workers 8
+    parser = argparse.ArgumentParser(
+        description="Encode the new or changed images of the image folder")
+    parser.add_argument("image_path")
+    parser.add_argument("store_path")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=4)
+    args = parser.parse_args()
+    EncodingStore(args.store_path).sync(args.image_path, args.workers,
+                                        args.chunk_size)
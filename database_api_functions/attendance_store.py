@@ -0,0 +1,551 @@
+"""Storage of the daily attendance records.
+
+Attendance used to be stored in one `Attendance_<YYYY-MM-DD>` collection per
+day. `AttendanceCollectionStore` keeps every day in one `attendance`
+collection with datetime fields and compound indexes, so the records of a
+day or a month are one indexed range scan. Both stores return the records in
+the historical shape read by the templates ("Name", "Email", "Time", "Date",
+"Check Out", "Check Out Time"), with the "Check Out Date" of the check-out
+since it can be the day after the check-in.
+
+Fold the per-day collections into the single collection with
+
+    python -m database_api_functions.attendance_store [--drop]
+"""
+import re
+import json
+import time
+import typing
+import threading
+import argparse
+import calendar
+from datetime import date, datetime, timedelta
+import pymongo
+from database_api_functions.mongo_client import get_mongo_client
+
+DAILY_COLLECTION_PATTERN = re.compile(r"^Attendance_(\d{4})-(\d{2})-(\d{2})$")
+OVERNIGHT_CHECK_OUT_HOURS = 16  #longest session a check-out after midnight closes
+
+
+def daily_collection_name(day: date) -> str:
+    "Name of the historical collection of a day, also used in the dashboard URLs."
+    return f"Attendance_{day.strftime('%Y-%m-%d')}"
+
+
+def parse_daily_collection_name(name: str) -> typing.Optional[date]:
+    "Day of a historical collection name, None for other collections."
+    match = DAILY_COLLECTION_PATTERN.match(name)
+    return date(*map(int, match.groups())) if match else None
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def _month_range(year: int, month: int) -> typing.Tuple[datetime, datetime]:
+    "First instant of a month and of the next one."
+    start = datetime(year, month, 1)
+    days = calendar.monthrange(year, month)[1]
+    return start, _midnight(date.fromordinal(start.toordinal() + days))
+
+
+class AttendanceCatalogue:
+    """Cache of the days with attendance records, so pages listing them do not query the database.
+
+    The days are scanned again at most every `ttl` seconds, and a check-in
+    creating a new day adds it right away.
+    """
+
+    def __init__(self,
+                 scan: typing.Callable[[], typing.Iterable[date]],
+                 ttl: float = 300.0):
+        """Instantiate the AttendanceCatalogue object
+
+        Parameters
+        -----------
+           - `scan` (Callable[[], Iterable[date]]): Reads the days with records from the database.
+           - `ttl` (float, optional): Seconds after which the days are scanned again, e.g. for the check-ins of other processes. Defaults to 300.0.
+        """
+        self.scan = scan
+        self.ttl = ttl
+        self._dates = None  #latest first
+        self._months = None
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    def _set(self, days: typing.Iterable[date]) -> None:
+        self._dates = sorted(set(days), reverse=True)
+        self._months = []
+        for day in self._dates:
+            if not self._months or self._months[-1][:2] != (day.year,
+                                                            day.month):
+                self._months.append((day.year, day.month, []))
+            self._months[-1][2].append(day)
+
+    def _load(self) -> None:
+        "Scans the days when they are missing or older than the TTL, the caller holds the lock."
+        if self._dates is None or time.monotonic(
+        ) - self._scanned_at >= self.ttl:
+            self._set(self.scan())
+            self._scanned_at = time.monotonic()
+
+    def dates(self) -> typing.List[date]:
+        "Function to get the days with attendance records, the latest first."
+        with self._lock:
+            self._load()
+            return list(self._dates)
+
+    def months(self) -> typing.List[typing.Tuple[int, int, typing.List[date]]]:
+        "Function to get the year, month and days of every month with attendance records, the latest first."
+        with self._lock:
+            self._load()
+            return [(year, month, list(days))
+                    for year, month, days in self._months]
+
+    def add(self, day: date) -> None:
+        "Function to add the day of a check-in, without a scan."
+        with self._lock:
+            if self._dates is not None and day not in self._dates:
+                self._set(self._dates + [day])
+
+    def invalidate(self) -> None:
+        "Function to scan the days again on the next read."
+        with self._lock:
+            self._dates = None
+
+
+def _upsert_once(collection: pymongo.collection.Collection, query: dict,
+                 document: dict) -> typing.Optional[dict]:
+    "Inserts `document` unless a document matches `query`, returns the existing document or None when inserted."
+    try:
+        return collection.find_one_and_update(
+            query, {"$setOnInsert": document},
+            upsert=True,
+            return_document=pymongo.ReturnDocument.BEFORE)
+    except pymongo.errors.DuplicateKeyError:
+        # a concurrent check-in inserted first, the unique index kept a single record
+        return collection.find_one(query)
+
+
+class DailyCollectionsStore:
+    "Attendance stored the historical way, in one 'Attendance_<YYYY-MM-DD>' collection per day"
+
+    def __init__(self,
+                 database: pymongo.database.Database,
+                 catalogue_ttl: float = 300.0):
+        """Instantiate the DailyCollectionsStore object
+
+        Parameters
+        -----------
+           - `database` (pymongo.database.Database): Attendance database.
+           - `catalogue_ttl` (float, optional): Seconds the days of the collections are cached for. Defaults to 300.0.
+        """
+        self.database = database
+        self.catalogue = AttendanceCatalogue(self._scan_dates, catalogue_ttl)
+        self._indexed_day = None
+
+    def _collection(self, day: date) -> pymongo.collection.Collection:
+        "Collection of a day, with a unique index on the email created once per day."
+        collection = self.database[daily_collection_name(day)]
+        if self._indexed_day != day:
+            collection.create_index("Email", unique=True)
+            self._indexed_day = day
+        return collection
+
+    def prepare(self, day: date) -> None:
+        "Function to report whether the collection of a day exists yet."
+        collection_name = daily_collection_name(day)
+        if day in self.catalogue.dates():
+            print(f"Collection:'{collection_name}' exists in Database")
+        else:
+            print(
+                f"Collection:'{collection_name}' does not exist in Database OR no documents are present in the collection"
+            )
+
+    def find(self, day: date, email: str) -> typing.Optional[dict]:
+        "Function to get the record of an employee on a day, None if absent."
+        return self.database[daily_collection_name(day)].find_one(
+            {"Email": email})
+
+    def check_in(self, name: str, email: str,
+                 when: datetime) -> typing.Tuple[dict, bool]:
+        "Function to check-in an employee unless already checked in that day, see `AttendanceCollectionStore.check_in`."
+        record = {
+            "Name": name,
+            "Email": email,
+            "Time": when.strftime("%H:%M:%S"),
+            "Date": when.strftime("%d/%m/%Y"),
+            "Check In": 1,
+            "Check Out": None,
+            "Check Out Time": None,
+            "Check Out Date": None
+        }
+        existing = _upsert_once(self._collection(when.date()),
+                                {"Email": email}, record)
+        if existing:
+            return existing, False
+        self.catalogue.add(when.date())
+        return record, True
+
+    def check_out(self, email: str, when: datetime) -> typing.Optional[dict]:
+        "Function to check-out an employee unless already checked out, see `AttendanceCollectionStore.check_out`."
+        # no collection nor index is created for a check-out without a check-in
+        record = self.database[daily_collection_name(
+            when.date())].find_one_and_update(
+                {"Email": email}, [{
+                    "$set": {
+                        "Check Out": {
+                            "$ifNull": ["$Check Out", 1]
+                        },
+                        "Check Out Time": {
+                            "$ifNull":
+                            ["$Check Out Time",
+                             when.strftime("%H:%M:%S")]
+                        },
+                        "Check Out Date": {
+                            "$ifNull":
+                            ["$Check Out Date",
+                             when.strftime("%d/%m/%Y")]
+                        }
+                    }
+                }],
+                return_document=pymongo.ReturnDocument.BEFORE)
+        earliest = when - timedelta(hours=OVERNIGHT_CHECK_OUT_HOURS)
+        if record is None and earliest.date() < when.date():
+            # checked in before midnight, close the open record of the day before
+            record = self.database[daily_collection_name(
+                earliest.date())].find_one_and_update(
+                    {
+                        "Email": email,
+                        "Check Out": None,
+                        "Time": {
+                            "$gte": earliest.strftime("%H:%M:%S")
+                        }
+                    }, {
+                        "$set": {
+                            "Check Out": 1,
+                            "Check Out Time": when.strftime("%H:%M:%S"),
+                            "Check Out Date": when.strftime("%d/%m/%Y")
+                        }
+                    },
+                    return_document=pymongo.ReturnDocument.BEFORE)
+        return record
+
+    def records_of_day(self, day: date) -> typing.List[dict]:
+        "Function to get the records of every employee present on a day."
+        return list(self.database[daily_collection_name(day)].find())
+
+    def _scan_dates(self) -> typing.List[date]:
+        days = (parse_daily_collection_name(name)
+                for name in self.database.list_collection_names())
+        return [day for day in days if day]
+
+    def dates(self) -> typing.List[date]:
+        "Function to get the days with attendance records, the latest first, from the catalogue."
+        return self.catalogue.dates()
+
+    def count_per_day(self, year: int, month: int) -> typing.Dict[date, int]:
+        "Function to count the employees present on every day of a month."
+        days = next((days for day_year, day_month, days in
+                     self.catalogue.months()
+                     if (day_year, day_month) == (year, month)), [])
+        return {
+            day: self.database[daily_collection_name(day)].
+            estimated_document_count()
+            for day in sorted(days)
+        }
+
+
+class AttendanceCollectionStore:
+    "Attendance stored in one collection, one document per employee and day with datetime fields"
+
+    def __init__(self,
+                 database: pymongo.database.Database,
+                 collection_name: str = "attendance",
+                 catalogue_ttl: float = 300.0):
+        """Instantiate the AttendanceCollectionStore object
+
+        Parameters
+        -----------
+           - `database` (pymongo.database.Database): Attendance database.
+           - `collection_name` (str, optional): Name of the collection. Defaults to "attendance".
+           - `catalogue_ttl` (float, optional): Seconds the days with records are cached for. Defaults to 300.0.
+        """
+        self.collection = database[collection_name]
+        self.catalogue = AttendanceCatalogue(self._scan_dates, catalogue_ttl)
+        self._indexed = False
+
+    def ensure_indexes(self) -> None:
+        "Function to create the indexes, a day and employee has a single record."
+        self.collection.create_index([("Date", pymongo.ASCENDING),
+                                      ("Email", pymongo.ASCENDING)],
+                                     unique=True)
+        self.collection.create_index([("Email", pymongo.ASCENDING),
+                                      ("Date", pymongo.ASCENDING)])
+        self._indexed = True
+
+    def prepare(self, day: date) -> None:
+        "Function to create the indexes once."
+        if not self._indexed:
+            self.ensure_indexes()
+
+    @staticmethod
+    def to_record(document: dict) -> dict:
+        "Function to convert a document to the historical shape of a record."
+        check_out = document.get("Check_Out")
+        return {
+            **document,
+            "Time": document["Check_In"].strftime("%H:%M:%S"),
+            "Date": document["Date"].strftime("%d/%m/%Y"),
+            "Check In": 1,
+            "Check Out": 1 if check_out else None,
+            "Check Out Time":
+            check_out.strftime("%H:%M:%S") if check_out else None,
+            "Check Out Date":
+            check_out.strftime("%d/%m/%Y") if check_out else None
+        }
+
+    @staticmethod
+    def to_document(record: dict, day: date) -> dict:
+        "Function to convert a historical record of a day to a document."
+        check_in = datetime.combine(
+            day,
+            datetime.strptime(record["Time"], "%H:%M:%S").time())
+        check_out = None
+        if record.get("Check Out Time"):
+            check_out_day = day
+            if record.get("Check Out Date"):  #a check-out after midnight
+                check_out_day = datetime.strptime(record["Check Out Date"],
+                                                  "%d/%m/%Y").date()
+            check_out = datetime.combine(
+                check_out_day,
+                datetime.strptime(record["Check Out Time"],
+                                  "%H:%M:%S").time())
+        return {
+            "Name": record["Name"],
+            "Email": record["Email"],
+            "Date": _midnight(day),
+            "Check_In": check_in,
+            "Check_Out": check_out
+        }
+
+    def find(self, day: date, email: str) -> typing.Optional[dict]:
+        "Function to get the record of an employee on a day, None if absent."
+        document = self.collection.find_one({
+            "Date": _midnight(day),
+            "Email": email
+        })
+        return self.to_record(document) if document else None
+
+    def check_in(self, name: str, email: str,
+                 when: datetime) -> typing.Tuple[dict, bool]:
+        """Function to check-in an employee unless already checked in that day, in one atomic round trip.
+
+        Parameters
+        -----------
+            - `name` (str): Name of the employee.
+            - `email` (str): Email of the employee.
+            - `when` (datetime): Time of the check-in.
+
+        Returns
+        --------
+            `Tuple[dict, bool]`: Record of the day and whether this call created it, False when the employee was already checked in.
+        """
+        document = {
+            "Name": name,
+            "Email": email,
+            "Date": _midnight(when.date()),
+            "Check_In": when,
+            "Check_Out": None
+        }
+        existing = _upsert_once(self.collection, {
+            "Date": document["Date"],
+            "Email": email
+        }, document)
+        if existing:
+            return self.to_record(existing), False
+        self.catalogue.add(when.date())
+        return self.to_record(document), True
+
+    def check_out(self, email: str, when: datetime) -> typing.Optional[dict]:
+        """Function to check-out an employee unless already checked out that day, in one atomic round trip.
+
+        Without a record that day, the record of the day before is checked
+        out if it is still open and checked in at most
+        `OVERNIGHT_CHECK_OUT_HOURS` before, e.g. a check-in before midnight.
+
+        Parameters
+        -----------
+            - `email` (str): Email of the employee.
+            - `when` (datetime): Time of the check-out.
+
+        Returns
+        --------
+            `dict`: Record before the check-out, its "Check Out" is set when the employee was already checked out. None when the employee did not check in that day nor has a recent open record of the day before.
+        """
+        document = self.collection.find_one_and_update(
+            {
+                "Date": _midnight(when.date()),
+                "Email": email
+            }, [{
+                "$set": {
+                    "Check_Out": {
+                        "$ifNull": ["$Check_Out", when]
+                    }
+                }
+            }],
+            return_document=pymongo.ReturnDocument.BEFORE)
+        earliest = when - timedelta(hours=OVERNIGHT_CHECK_OUT_HOURS)
+        if document is None and earliest.date() < when.date():
+            # checked in before midnight, close the open record of the day before
+            document = self.collection.find_one_and_update(
+                {
+                    "Date": _midnight(earliest.date()),
+                    "Email": email,
+                    "Check_In": {
+                        "$gte": earliest
+                    },
+                    "Check_Out": None
+                }, {"$set": {
+                    "Check_Out": when
+                }},
+                return_document=pymongo.ReturnDocument.BEFORE)
+        return self.to_record(document) if document else None
+
+    def records_of_day(self, day: date) -> typing.List[dict]:
+        "Function to get the records of every employee present on a day."
+        documents = self.collection.find({
+            "Date": _midnight(day)
+        }).sort("Check_In", pymongo.ASCENDING)
+        return [self.to_record(document) for document in documents]
+
+    def _scan_dates(self) -> typing.List[date]:
+        return [day.date() for day in self.collection.distinct("Date")]
+
+    def dates(self) -> typing.List[date]:
+        "Function to get the days with attendance records, the latest first, from the catalogue."
+        return self.catalogue.dates()
+
+    def count_per_day(self, year: int, month: int) -> typing.Dict[date, int]:
+        "Function to count the employees present on every day of a month, with one range scan."
+        start, end = _month_range(year, month)
+        counts = self.collection.aggregate([
+            {
+                "$match": {
+                    "Date": {
+                        "$gte": start,
+                        "$lt": end
+                    }
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$Date",
+                    "count": {
+                        "$sum": 1
+                    }
+                }
+            },
+            {
+                "$sort": {
+                    "_id": 1
+                }
+            },
+        ])
+        return {count["_id"].date(): count["count"] for count in counts}
+
+    def migrate(self,
+                database: pymongo.database.Database,
+                drop: bool = False) -> int:
+        """Function to fold the historical per-day collections of a database into this collection.
+
+        Records are upserted by day and email, so running it again is harmless.
+
+        Parameters
+        -----------
+            - `database` (pymongo.database.Database): Database of the per-day collections.
+            - `drop` (bool, optional): Whether the per-day collections are dropped once copied. Defaults to False.
+
+        Returns
+        --------
+            `int`: Number of records copied.
+        """
+        self.ensure_indexes()
+        copied = 0
+        for collection_name in sorted(database.list_collection_names()):
+            day = parse_daily_collection_name(collection_name)
+            if day is None:
+                continue
+            operations = []
+            for record in database[collection_name].find({}, {"_id": 0}):
+                document = self.to_document(record, day)
+                operations.append(
+                    pymongo.UpdateOne(
+                        {
+                            "Date": document["Date"],
+                            "Email": document["Email"]
+                        }, {"$set": document},
+                        upsert=True))
+            if operations:
+                self.collection.bulk_write(operations, ordered=False)
+            copied += len(operations)
+            print(f"{collection_name}: {len(operations)} records")
+            if drop:
+                database.drop_collection(collection_name)
+        self.catalogue.invalidate()
+        return copied
+
+
+ATTENDANCE_STORES = {
+    "daily_collections": DailyCollectionsStore,
+    "single_collection": AttendanceCollectionStore,
+}
+
+
+_stores = {}  #(database, storage) -> store shared by the modules of the process
+
+
+def make_attendance_store(
+    database: pymongo.database.Database,
+    storage: str = "single_collection",
+    catalogue_ttl: float = 300.0
+) -> typing.Union[DailyCollectionsStore, AttendanceCollectionStore]:
+    """Function to get the attendance store of a database from its name, as used in config.json.
+
+    The store of a database is created once, so DatabaseAPI and the dashboard
+    share its catalogue and the dashboard sees the days of new check-ins.
+
+    Parameters
+    -----------
+        - `database` (pymongo.database.Database): Attendance database.
+        - `storage` (str, optional): "single_collection" or "daily_collections" (one collection per day). Defaults to "single_collection".
+        - `catalogue_ttl` (float, optional): Seconds the days with records are cached for, used when the store is created. Defaults to 300.0.
+
+    Returns
+    --------
+        `DailyCollectionsStore` or `AttendanceCollectionStore`: The store.
+    """
+    if storage not in ATTENDANCE_STORES:
+        raise ValueError(f"Unknown attendance storage: '{storage}'")
+    if (database, storage) not in _stores:
+        _stores[database, storage] = ATTENDANCE_STORES[storage](
+            database, catalogue_ttl=catalogue_ttl)
+    return _stores[database, storage]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fold the per-day attendance collections into one collection")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--drop",
+                        action="store_true",
+                        help="drop the per-day collections once copied")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config_file = json.load(f)
+    client = get_mongo_client(config_file["mongo_db_connection_url"],
+                          **config_file["mongo_client"])
+    database = client[config_file["attendance_database_name"]]
+    copied = AttendanceCollectionStore(database).migrate(database, args.drop)
+    print(f"Copied {copied} attendance records")
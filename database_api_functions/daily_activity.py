@@ -0,0 +1,416 @@
+"""Storage of the total and idle time of every employee and day.
+
+The times used to be stored in one collection per employee, named after the
+email, with "Date", "Total_Time" and "Idle_Time" strings.
+`DailyActivityCollection` keeps every employee in one `daily_activity`
+collection keyed by email and day, with the seconds stored as integers, so
+the days of an employee in a month, or of every employee, are one indexed
+query. `DailyActivityTimeSeries` (storage "time_series") instead inserts one
+measurement per save into a time-series collection (MongoDB 5.0) and reads
+the latest measurement of every employee and day, so it never updates a
+time-series document.
+
+Fold the per-employee collections into the single collection with
+
+    python -m database_api_functions.daily_activity
+"""
+import json
+import typing
+import argparse
+import calendar
+from datetime import date, datetime, time
+import pymongo
+from monitoring.session_tracker import format_seconds
+from database_api_functions.mongo_client import get_mongo_client
+
+TIME_SERIES_SERVER_VERSION = (5, 0)  #first version with time-series collections
+
+
+def parse_seconds(hms: typing.Optional[str]) -> int:
+    "Seconds of a 'HH:MM:SS' string of `format_seconds`, 0 for None."
+    if not hms:
+        return 0
+    hours, minutes, seconds = map(int, hms.split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time())
+
+
+class EmployeeCollectionsActivity:
+    "Daily activity stored the historical way, in one collection per employee named after the email"
+
+    def __init__(self, database: pymongo.database.Database):
+        """Instantiate the EmployeeCollectionsActivity object
+
+        Parameters
+        -----------
+           - `database` (pymongo.database.Database): Employee database.
+        """
+        self.database = database
+
+    def start_day(self, name: str, email: str, day: date) -> None:
+        "Function to create the record of an employee for the day of a check-in."
+        self.database[email].insert_one({
+            'Name': name,
+            'Email': email,
+            'Date': day.strftime("%d/%m/%Y"),
+            'Total_Time': "00:00:00",
+            'Idle_Time': "00:00:00"
+        })
+
+    def save_times(self, email: str, day: date, total_seconds: float,
+                   idle_seconds: float) -> None:
+        "Function to save the total and idle time of an employee on a day."
+        self.database[email].update_one({"Date": day.strftime("%d/%m/%Y")}, {
+            "$set": {
+                "Total_Time": format_seconds(total_seconds),
+                "Idle_Time": format_seconds(idle_seconds)
+            }
+        })
+
+    def idle_seconds(self, email: str, day: date) -> int:
+        "Function to get the saved idle seconds of an employee on a day, 0 without a record."
+        record = self.database[email].find_one(
+            {"Date": day.strftime("%d/%m/%Y")})
+        return parse_seconds(record["Idle_Time"]) if record else 0
+
+    @staticmethod
+    def to_document(record: dict) -> dict:
+        "Function to convert a historical record to the shape of `DailyActivityCollection`."
+        return {
+            "Name": record["Name"],
+            "Email": record["Email"],
+            "Date": datetime.strptime(record["Date"], "%d/%m/%Y"),
+            "Total_Seconds": parse_seconds(record.get("Total_Time")),
+            "Idle_Seconds": parse_seconds(record.get("Idle_Time"))
+        }
+
+    def days(self, email: str) -> typing.List[date]:
+        "Function to get the days an employee has a record for, the oldest first."
+        return sorted(
+            datetime.strptime(record["Date"], "%d/%m/%Y").date()
+            for record in self.database[email].find({}, {"Date": 1}))
+
+    def month(self, year: int, month: int,
+              email: str) -> typing.List[dict]:
+        "Function to get the records of an employee in a month, the oldest first."
+        records = (self.to_document(record)
+                   for record in self.database[email].find())
+        return sorted((record for record in records
+                       if (record["Date"].year,
+                           record["Date"].month) == (year, month)),
+                      key=lambda record: record["Date"])
+
+
+class DailyActivityCollection:
+    "Daily activity stored in one collection, one document per employee and day with integer seconds"
+
+    def __init__(self,
+                 database: pymongo.database.Database,
+                 collection_name: str = "daily_activity"):
+        """Instantiate the DailyActivityCollection object, creating the indexes of the collection.
+
+        Parameters
+        -----------
+           - `database` (pymongo.database.Database): Employee database.
+           - `collection_name` (str, optional): Name of the collection. Defaults to "daily_activity".
+        """
+        self.collection = database[collection_name]
+        self.collection.create_index([("Email", pymongo.ASCENDING),
+                                      ("Date", pymongo.ASCENDING)],
+                                     unique=True)
+        self.collection.create_index([("Date", pymongo.ASCENDING)])
+
+    def start_day(self, name: str, email: str, day: date) -> None:
+        "Function to create the record of an employee for the day of a check-in."
+        try:
+            self.collection.insert_one({
+                "Name": name,
+                "Email": email,
+                "Date": _midnight(day),
+                "Total_Seconds": 0,
+                "Idle_Seconds": 0
+            })
+        except pymongo.errors.DuplicateKeyError:
+            pass  #the record of the day exists already
+
+    def save_times(self, email: str, day: date, total_seconds: float,
+                   idle_seconds: float) -> None:
+        "Function to save the total and idle time of an employee on a day."
+        self.collection.update_one({
+            "Email": email,
+            "Date": _midnight(day)
+        }, {
+            "$set": {
+                "Total_Seconds": int(total_seconds),
+                "Idle_Seconds": int(idle_seconds)
+            }
+        })
+
+    def idle_seconds(self, email: str, day: date) -> int:
+        "Function to get the saved idle seconds of an employee on a day, 0 without a record."
+        record = self.collection.find_one(
+            {
+                "Email": email,
+                "Date": _midnight(day)
+            }, {"Idle_Seconds": 1})
+        return record["Idle_Seconds"] if record else 0
+
+    def days(self, email: str) -> typing.List[date]:
+        "Function to get the days an employee has a record for, the oldest first."
+        records = self.collection.find({
+            "Email": email
+        }, {
+            "Date": 1
+        }).sort("Date", pymongo.ASCENDING)
+        return [record["Date"].date() for record in records]
+
+    def month(self,
+              year: int,
+              month: int,
+              email: str = None) -> typing.List[dict]:
+        """Function to get the records of a month with one indexed range query.
+
+        Parameters
+        -----------
+            - `year` (int): Year of the month.
+            - `month` (int): Month number, 1 to 12.
+            - `email` (str, optional): Email of the employee, every employee when None. Defaults to None.
+
+        Returns
+        --------
+            `List[dict]`: Records with "Name", "Email", "Date", "Total_Seconds" and "Idle_Seconds", the oldest first.
+        """
+        start = datetime(year, month, 1)
+        end = _midnight(
+            date.fromordinal(start.toordinal() +
+                             calendar.monthrange(year, month)[1]))
+        query = {"Date": {"$gte": start, "$lt": end}}
+        if email is not None:
+            query["Email"] = email
+        return list(
+            self.collection.find(query, {
+                "_id": 0
+            }).sort([("Date", pymongo.ASCENDING),
+                     ("Email", pymongo.ASCENDING)]))
+
+    def migrate(self, database: pymongo.database.Database) -> int:
+        """Function to fold the historical per-employee collections of a database into this collection.
+
+        Days already in this collection are skipped, so running it again is harmless.
+
+        Parameters
+        -----------
+            - `database` (pymongo.database.Database): Database of the per-employee collections.
+
+        Returns
+        --------
+            `int`: Number of records copied.
+        """
+        copied = 0
+        for collection_name in sorted(database.list_collection_names()):
+            if "@" not in collection_name:  #the collections are named after the email
+                continue
+            known_days = set(self.days(collection_name))
+            documents = [
+                EmployeeCollectionsActivity.to_document(record)
+                for record in database[collection_name].find({}, {"_id": 0})
+            ]
+            documents = [
+                document for document in documents
+                if document["Date"].date() not in known_days
+            ]
+            if documents:
+                self._insert_records(documents)
+            copied += len(documents)
+            print(f"{collection_name}: {len(documents)} records")
+        return copied
+
+    def _insert_records(self, records: typing.List[dict]) -> None:
+        self.collection.insert_many(records, ordered=False)
+
+
+class DailyActivityTimeSeries(DailyActivityCollection):
+    """Daily activity stored as measurements of a time-series collection, one per save
+
+    Every save inserts the "Total_Seconds" and "Idle_Seconds" of the moment
+    with the email and day as the meta field, and reads keep the latest
+    measurement of every employee and day, so the records have the shape of
+    `DailyActivityCollection`.
+    """
+
+    def __init__(self,
+                 database: pymongo.database.Database,
+                 collection_name: str = "daily_activity_series"):
+        """Instantiate the DailyActivityTimeSeries object, creating the time-series collection and its index.
+
+        Parameters
+        -----------
+           - `database` (pymongo.database.Database): Employee database.
+           - `collection_name` (str, optional): Name of the collection. Defaults to "daily_activity_series".
+        """
+        if collection_name not in database.list_collection_names():
+            database.create_collection(collection_name,
+                                       timeseries={
+                                           "timeField": "Time",
+                                           "metaField": "Employee",
+                                           "granularity": "seconds"
+                                       })
+        self.collection = database[collection_name]
+        self.collection.create_index([("Employee.Email", pymongo.ASCENDING),
+                                      ("Employee.Day", pymongo.ASCENDING),
+                                      ("Time", pymongo.DESCENDING)])
+
+    def _insert(self, email: str, day: date, total_seconds: float,
+                idle_seconds: float, name: str = None) -> None:
+        measurement = {
+            "Time": datetime.now(),
+            "Employee": {
+                "Email": email,
+                "Day": _midnight(day)
+            },
+            "Total_Seconds": int(total_seconds),
+            "Idle_Seconds": int(idle_seconds)
+        }
+        if name is not None:
+            measurement["Name"] = name
+        self.collection.insert_one(measurement)
+
+    def start_day(self, name: str, email: str, day: date) -> None:
+        "Function to record the name of an employee for the day of a check-in, with no time yet."
+        self._insert(email, day, 0, 0, name=name)
+
+    def save_times(self, email: str, day: date, total_seconds: float,
+                   idle_seconds: float) -> None:
+        "Function to save the total and idle time of an employee on a day."
+        self._insert(email, day, total_seconds, idle_seconds)
+
+    def idle_seconds(self, email: str, day: date) -> int:
+        "Function to get the latest idle seconds of an employee on a day, 0 without a measurement."
+        record = self.collection.find_one(
+            {
+                "Employee.Email": email,
+                "Employee.Day": _midnight(day)
+            }, {"Idle_Seconds": 1},
+            sort=[("Time", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+        return record["Idle_Seconds"] if record else 0
+
+    def days(self, email: str) -> typing.List[date]:
+        "Function to get the days an employee has a measurement for, the oldest first."
+        return [
+            day.date() for day in sorted(
+                self.collection.distinct("Employee.Day",
+                                         {"Employee.Email": email}))
+        ]
+
+    def month(self,
+              year: int,
+              month: int,
+              email: str = None) -> typing.List[dict]:
+        """Function to get the records of a month, the latest measurement of every employee and day.
+
+        Parameters
+        -----------
+            - `year` (int): Year of the month.
+            - `month` (int): Month number, 1 to 12.
+            - `email` (str, optional): Email of the employee, every employee when None. Defaults to None.
+
+        Returns
+        --------
+            `List[dict]`: Records with "Name", "Email", "Date", "Total_Seconds" and "Idle_Seconds", the oldest first.
+        """
+        start = datetime(year, month, 1)
+        end = _midnight(
+            date.fromordinal(start.toordinal() +
+                             calendar.monthrange(year, month)[1]))
+        match = {"Employee.Day": {"$gte": start, "$lt": end}}
+        if email is not None:
+            match["Employee.Email"] = email
+        return list(
+            self.collection.aggregate([
+                {"$match": match},
+                {"$sort": {"Time": pymongo.ASCENDING, "_id": pymongo.ASCENDING}},
+                {"$group": {
+                    "_id": "$Employee",
+                    "Name": {"$max": "$Name"},  #only the check-in measurement has it
+                    "Total_Seconds": {"$last": "$Total_Seconds"},
+                    "Idle_Seconds": {"$last": "$Idle_Seconds"}
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "Name": 1,
+                    "Email": "$_id.Email",
+                    "Date": "$_id.Day",
+                    "Total_Seconds": 1,
+                    "Idle_Seconds": 1
+                }},
+                {"$sort": {"Date": pymongo.ASCENDING, "Email": pymongo.ASCENDING}}
+            ]))
+
+    def _insert_records(self, records: typing.List[dict]) -> None:
+        self.collection.insert_many([{
+            "Time": record["Date"],
+            "Employee": {
+                "Email": record["Email"],
+                "Day": record["Date"]
+            },
+            "Name": record["Name"],
+            "Total_Seconds": record["Total_Seconds"],
+            "Idle_Seconds": record["Idle_Seconds"]
+        } for record in records],
+                                    ordered=False)
+
+
+DAILY_ACTIVITY_STORES = {
+    "employee_collections": EmployeeCollectionsActivity,
+    "single_collection": DailyActivityCollection,
+    "time_series": DailyActivityTimeSeries,
+}
+
+
+def make_daily_activity_store(
+    database: pymongo.database.Database,
+    storage: str = "single_collection",
+    **options
+) -> typing.Union[EmployeeCollectionsActivity, DailyActivityCollection,
+                  DailyActivityTimeSeries]:
+    """Function to create the daily activity store of a database from the `daily_activity` settings of config.json.
+
+    Parameters
+    -----------
+        - `database` (pymongo.database.Database): Employee database.
+        - `storage` (str, optional): "single_collection", "time_series" (one measurement per save, MongoDB 5.0 or later, otherwise "single_collection") or "employee_collections" (one collection per employee). Defaults to "single_collection".
+        - `options`: Keyword arguments of the store, e.g. `collection_name`.
+
+    Returns
+    --------
+        `EmployeeCollectionsActivity`, `DailyActivityCollection` or `DailyActivityTimeSeries`: The store.
+    """
+    if storage not in DAILY_ACTIVITY_STORES:
+        raise ValueError(f"Unknown daily activity storage: '{storage}'")
+    if storage == "time_series" and tuple(database.client.server_info(
+    )["versionArray"][:2]) < TIME_SERIES_SERVER_VERSION:
+        print("MongoDB has no time-series collections before 5.0, "
+              "the daily activity is stored in a single collection")
+        storage = "single_collection"
+    return DAILY_ACTIVITY_STORES[storage](database, **options)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fold the per-employee collections into one collection")
+    parser.add_argument("--config", default="config.json")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config_file = json.load(f)
+    client = get_mongo_client(config_file["mongo_db_connection_url"],
+                          **config_file["mongo_client"])
+    database = client[config_file["employee_database_name"]]
+    store = make_daily_activity_store(database, **config_file["daily_activity"])
+    if isinstance(store, EmployeeCollectionsActivity):
+        parser.error("the daily activity storage is 'employee_collections' in the config")
+    copied = store.migrate(database)
+    print(f"Copied {copied} daily activity records")
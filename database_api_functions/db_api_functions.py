@@ -3,74 +3,118 @@ import cv2
 import typing
 import pymongo
 import numpy as np
-import face_recognition
+import concurrent.futures
 from datetime import datetime
+from video_pipeline.camera_capture import CameraCapture
+from video_pipeline.recognition_results import RecognitionResults
+from video_pipeline.recognition_executor import RecognitionExecutor
+from video_pipeline.pipeline_metrics import PipelineMetrics
+from recognition.face_matcher import FaceMatcher
+from recognition.face_index import FaceIndex
+from recognition.face_detectors import FaceDetector
+from recognition.face_encoder import FaceEncoder
+from recognition.face_recognizer import FaceRecognizer
+from database_api_functions.attendance_store import make_attendance_store
+from database_api_functions.daily_activity import make_daily_activity_store
+from database_api_functions.mongo_client import get_mongo_client, mongo_health
 
 
 class DatabaseAPI:
     "Class to interact with database and generate frames"
 
-    def __init__(self, camera: cv2.VideoCapture,
+    def __init__(self, camera: CameraCapture,
                  known_face_names: typing.List[np.ndarray],
                  known_face_encodings: typing.List[np.ndarray],
                  mongo_db_url: str, database_name: str,
                  employee_database_name: str,
-                 img_folder_path: typing.Union[str, bytes, os.PathLike]):
+                 img_folder_path: typing.Union[str, bytes, os.PathLike],
+                 *,
+                 results: RecognitionResults = None,
+                 face_index: FaceIndex = None,
+                 face_tracking: bool = False,
+                 max_detection_interval: int = 15,
+                 motion_gate: bool = False,
+                 face_detector: FaceDetector = None,
+                 face_encoder: FaceEncoder = None,
+                 scale: float = 0.25,
+                 recognition_timeout: float = 2.0,
+                 metrics: PipelineMetrics = None,
+                 attendance_storage: str = "single_collection",
+                 daily_activity: dict = None,
+                 mongo_client_options: dict = None,
+                 attendance_catalogue_ttl: float = 300.0):
         """Instantiate the DatabaseAPI object
 
         Parameters
         -----------
-           - `camera` (cv2.VideoCapture): cv2 camera object.
+           - `camera` (CameraCapture): shared capture service of the camera, or a `CameraWorker` when the camera runs in a worker process.
            - `known_face_names` (List[numpy.ndarray]): list of known face names.
            - `known_face_encodings` (List[numpy.ndarray]): list of known face encodings.
            - `mongo_db_url` (str): mongodb connection url
            - `database_name` (str): Attendance database name of MongoDB
            - `img_folder_path` (str, bytes, os.PathLike): Image folder path for recognition.
+           - `results` (RecognitionResults, optional): Cache of the latest recognition result shared with the video feed. Defaults to a new cache.
+           - `face_index` (FaceIndex, optional): Empty nearest neighbour index used for matching. Defaults to exact brute force matching.
+           - `face_tracking` (bool, optional): Whether the video feed recognizes faces every few frames only and tracks them in between. Defaults to False.
+           - `max_detection_interval` (int, optional): Largest number of frames between two recognitions when tracking. Defaults to 15.
+           - `motion_gate` (bool, optional): Whether frames that did not change since the last recognition reuse its result. Defaults to False.
+           - `face_detector` (FaceDetector, optional): Detector finding the faces to recognize. Defaults to the HOG detector of face_recognition.
+           - `face_encoder` (FaceEncoder, optional): Encoder of the detected faces. Defaults to the 5 point landmarks with 1 jitter.
+           - `scale` (float, optional): Scale of the frame faces are detected in, smaller is faster but misses faces far from the camera. Defaults to 0.25.
+           - `recognition_timeout` (float, optional): Seconds `gen_name` waits for a recognition before answering "Unknown". Defaults to 2.0.
+           - `metrics` (PipelineMetrics, optional): Records the stage durations of the recognitions of this process. Defaults to None.
+           - `attendance_storage` (str, optional): "single_collection" for one attendance collection, or "daily_collections" for one collection per day. Defaults to "single_collection".
+           - `daily_activity` (dict, optional): Arguments of `make_daily_activity_store` for the storage of the total and idle times. Defaults to one regular collection.
+           - `mongo_client_options` (dict, optional): MongoClient options of the client shared with the rest of the app, used if this creates it. Defaults to the pymongo defaults.
+           - `attendance_catalogue_ttl` (float, optional): Seconds the days with attendance are cached for, check-ins of other processes show up after it. Defaults to 300.0.
 
         Raises
         -------
             `Exception`: Connection issue with Database from MongoDB.
         """
         self.camera = camera
-        self.known_face_names = known_face_names
-        self.known_face_encodings = known_face_encodings
         self.img_folder_path = img_folder_path
+        self.recognizer = FaceRecognizer(FaceMatcher(known_face_names,
+                                                     known_face_encodings,
+                                                     index=face_index),
+                                         face_detector,
+                                         face_encoder,
+                                         scale,
+                                         motion_gate,
+                                         face_tracking,
+                                         max_detection_interval,
+                                         lambda: self.camera.fps,
+                                         metrics.observe if metrics else None)
+        self.metrics = metrics
+        self.matcher = self.recognizer.matcher
+        self.motion_gate = self.recognizer.motion_gate
+        self.results = results if results is not None else RecognitionResults(
+        )
+        # recognitions asked by request handlers run here, not in the request threads
+        self.executor = RecognitionExecutor(self.recognize_faces)
+        self.recognition_timeout = recognition_timeout
         try:
-            # database name check and initialization
-            client = pymongo.MongoClient(mongo_db_url)
-            DBlist = client.list_database_names()
-            if database_name in DBlist:
-                print(f"DB: '{database_name}' exists")
-            else:
-                print(
-                    f"DB: '{database_name}' not yet present OR no collection is present in the DB"
-                )
+            # the client shared with the app and the dashboard, checked with a ping
+            client = get_mongo_client(mongo_db_url,
+                                      **(mongo_client_options or {}))
+            health = mongo_health(client)
+            if not health["ok"]:
+                raise pymongo.errors.ConnectionFailure(health["error"])
+            print(f"MongoDB: ping {health['ping_ms']} ms")
             self.database = client[database_name]
+            self.attendance = make_attendance_store(self.database,
+                                                    attendance_storage,
+                                                    attendance_catalogue_ttl)
             self.emp_database = client[employee_database_name]
+            self.daily_activity = make_daily_activity_store(
+                self.emp_database, **(daily_activity or {}))
         except pymongo.errors.ConnectionFailure as e:
             print("Exception occurred while making connection")
             raise Exception(e)  #raise an error if connection fails
 
-    def make_database_collection(self, collection_name: str = None):
-        """Creates a collection in the MongoDB database. If the 
-           name of the collection is not specified, 'Attendance_<current_date>' is used as the collection name.
-
-        Parameters
-        -----------
-            - `collection_name` (str, optional): Name of the collection to create in the MongoDB database. Defaults to None.
-        """
-        if not collection_name:
-            date = datetime.now().date()
-            collection_name = "Attendance_" + str(date)
-        collection_list = self.database.list_collection_names()
-        if collection_name in collection_list:
-            print(f"Collection:'{collection_name}' exists in Database")
-
-        else:
-            print(
-                f"Collection:'{collection_name}' does not exist in Database OR no documents are present in the collection"
-            )
-        self.collection = self.database[collection_name]
+    def make_database_collection(self) -> None:
+        "Function to prepare the storage of the attendance of today, the indexes of the single collection are created once."
+        self.attendance.prepare(datetime.now().date())
 
     def check_in(self, name: str, email: str, save_image: bool = True):
         """Function to check-in an employee into the organization.
@@ -78,6 +122,7 @@ class DatabaseAPI:
         Parameters
         -----------
             - `name` (str): Name of the employee.
+            - `email` (str): Email of the employee.
             - `save_image` (bool, optional): Whether to take a Snapshot of an employee during check-in or not. Defaults to True.
 
         Returns
@@ -85,30 +130,11 @@ class DatabaseAPI:
             - `True` or `False` (bool): It tells whether the employee checked out or not
             - `checkin_status` (str): Status of employee.
         """
-
-        if not self.collection.find_one({"Name": name}):
-            time_now = datetime.now()
-            tStr = time_now.strftime("%H:%M:%S")
-            dStr = time_now.strftime("%d/%m/%Y")
-            cin = 1
-            record = {
-                "Name": name,
-                "Email": email,
-                "Time": tStr,
-                "Date": dStr,
-                "Check In": cin,
-                "Check Out": None,
-                "Check Out Time": None
-            }
-            emp_record = {
-                'Name': name,
-                'Email': email,
-                'Date': dStr,
-                'Total_Time': "00:00:00",
-                'Idle_Time': "00:00:00"
-            }
-            self.collection.insert_one(record)
-            self.emp_database[email].insert_one(emp_record)
+        time_now = datetime.now()
+        # a single upsert, a double click cannot check in twice
+        record, checked_in = self.attendance.check_in(name, email, time_now)
+        if checked_in:
+            self.daily_activity.start_day(name, email, time_now.date())
             self.capture_frame(email,
                                check_status="check_in",
                                save_image=save_image)
@@ -120,16 +146,15 @@ class DatabaseAPI:
 
         else:
 
-            if self.collection.find_one({"Name": name, "Check Out": 1}):
-                checkin_status = ("You Already Checked Out at " + str(
-                    self.collection.find_one({"Name": name})["Check Out Time"])
-                                  + " ! See You Tomorrow :)")
+            if record["Check Out"]:
+                checkin_status = ("You Already Checked Out at " +
+                                  str(record["Check Out Time"]) +
+                                  " ! See You Tomorrow :)")
                 return False, checkin_status
-            elif self.collection.find_one({"Name": name, "Check In": 1}):
-                checkin_status = (
-                    "You Already Checked in at " +
-                    str(self.collection.find_one({"Name": name})["Time"]) +
-                    " ! You can now Check Out Only :)")
+            else:
+                checkin_status = ("You Already Checked in at " +
+                                  str(record["Time"]) +
+                                  " ! You can now Check Out Only :)")
                 return True, checkin_status
 
     def check_out(self, email: str, save_image: bool = True):
@@ -144,33 +169,73 @@ class DatabaseAPI:
         --------
             `checkout_status` (str): Status of employee.
         """
-        if not self.collection.find_one({"Email": email}):
+        time_now = datetime.now()
+        # a single find_one_and_update, the record is the one before the check-out
+        record = self.attendance.check_out(email, time_now)
+        if not record:
             checkout_status = "You Have not Checked In Yet"
 
         else:
-            if self.collection.find_one({"Email": email, "Check Out": 1}):
+            if record["Check Out"]:
                 checkout_status = "You Already Checked Out at " + str(
-                    self.collection.find_one({"Email": email
-                                              })["Check Out Time"])
+                    record["Check Out Time"])
             else:
-                time_now = datetime.now()
-                self.collection.update_one(
-                    self.collection.find_one({"Email": email}), {
-                        "$set": {
-                            "Check Out": 1,
-                            "Check Out Time": time_now.strftime("%H:%M:%S")
-                        }
-                    })
-
                 self.capture_frame(email,
                                    check_status="check_out",
                                    save_image=save_image)
                 checkout_status = "Successfully Checked Out at " + str(
-                    self.collection.find_one({"Email": email
-                                              })["Check Out Time"])
+                    time_now.strftime("%H:%M:%S"))
 
         return checkout_status
 
+    def attendance_session(
+        self, email: str
+    ) -> typing.Optional[typing.Tuple[datetime, typing.Optional[datetime],
+                                      float]]:
+        """Function to get the check-in, check-out and idle time of today of an employee.
+
+        Parameters
+        -----------
+            - `email` (str): Email of the employee.
+
+        Returns
+        --------
+            `Tuple[datetime, datetime, float]`: Check-in time, check-out time (None before the check-out) and idle seconds, None if the employee did not check in today.
+        """
+        record = self.attendance.find(datetime.now().date(), email)
+        if not record:
+            return None
+        date = datetime.strptime(record["Date"], "%d/%m/%Y").date()
+        check_in = datetime.combine(
+            date,
+            datetime.strptime(record["Time"], "%H:%M:%S").time())
+        check_out = None
+        if record.get("Check Out Time"):
+            check_out_date = date
+            if record.get("Check Out Date"):  #a check-out after midnight
+                check_out_date = datetime.strptime(record["Check Out Date"],
+                                                   "%d/%m/%Y").date()
+            check_out = datetime.combine(
+                check_out_date,
+                datetime.strptime(record["Check Out Time"],
+                                  "%H:%M:%S").time())
+        idle_seconds = float(self.daily_activity.idle_seconds(email, date))
+        return check_in, check_out, idle_seconds
+
+    def save_session_times(self, email: str, check_in: datetime,
+                           total_seconds: float, idle_seconds: float) -> None:
+        """Function to save the total and idle time of an employee for the day of a check-in.
+
+        Parameters
+        -----------
+            - `email` (str): Email of the employee.
+            - `check_in` (datetime): Check-in time, its date selects the record.
+            - `total_seconds` (float): Seconds since the check-in.
+            - `idle_seconds` (float): Idle seconds.
+        """
+        self.daily_activity.save_times(email, check_in.date(), total_seconds,
+                                       idle_seconds)
+
     def capture_frame(self,
                       email: str,
                       check_status: str,
@@ -200,104 +265,46 @@ class DatabaseAPI:
             if check:
                 print("Image Saved Successfully")
 
-    def gen_frames(self):
-        "Function to Generate Frames and Recognize Faces."
-        while True:
-            success, frame = self.camera.read()  # read the camera frame
-            name = "Unknown"
-
-            # Resize frame of video to 1/4 size for faster face recognition processing
-            small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-            # Convert the image from BGR color (which OpenCV uses) to RGB color (which face_recognition uses)
-            rgb_small_frame = small_frame[:, :, ::-1]
-
-            # Only process every other frame of video to save time
-
-            # Find all the faces and face encodings in the current frame of video
-            face_locations = face_recognition.face_locations(rgb_small_frame)
-            face_encodings = face_recognition.face_encodings(
-                rgb_small_frame, face_locations)
-            face_names = []
-            for face_encoding in face_encodings:
-                # See if the face is a match for the known face(s)
-                matches = face_recognition.compare_faces(
-                    self.known_face_encodings, face_encoding)
-
-                # Or instead, use the known face with the smallest distance to the new face
-                face_distances = face_recognition.face_distance(
-                    self.known_face_encodings, face_encoding)
-                best_match_index = np.argmin(face_distances)
-                if matches[best_match_index]:
-                    name = self.known_face_names[best_match_index]
-
-                face_names.append(name)
-
-            # Display the results
-            for (top, right, bottom,
-                 left), name in zip(face_locations, face_names):
-                # Scale back up face locations since the frame we detected in was scaled to 1/4 size
-                top *= 4
-                right *= 4
-                bottom *= 4
-                left *= 4
-
-                # Draw a box around the face
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255),
-                              2)
+    def recognize_faces(
+        self,
+        frame: np.ndarray,
+        frame_seq: typing.Optional[int] = None
+    ) -> typing.Tuple[typing.List[typing.Tuple[int, int, int, int]],
+                      typing.List[str]]:
+        """Function to find and recognize all the faces in a frame.
 
-                # Draw a label with a name below the face
-                cv2.rectangle(
-                    frame,
-                    (left, bottom - 35),
-                    (right, bottom),
-                    (0, 0, 255),
-                    cv2.FILLED,
-                )
-                font = cv2.FONT_HERSHEY_DUPLEX
-                cv2.putText(
-                    frame,
-                    name,
-                    (left + 6, bottom - 6),
-                    font,
-                    1.0,
-                    (255, 255, 255),
-                    1,
-                )
+        Parameters
+        -----------
+            - `frame` (numpy.ndarray): BGR frame from the camera.
+            - `frame_seq` (int, optional): Sequence number of the frame, the result is published to `self.results` when given. Defaults to None.
 
-            ret, buffer = cv2.imencode(".jpg", frame)
-            frame = buffer.tobytes()
-            yield (b"--frame\r\n"
-                   b"Content-Type: image/jpeg\r\n\r\n" + frame + b"\r\n")
+        Returns
+        --------
+            `Tuple[List[Tuple[int, int, int, int]], List[str]]`: Face locations in the frame scaled by `self.recognizer.scale` and the names of the faces.
+        """
+        face_locations, face_names = self.recognizer.recognize_faces(frame)
+        if frame_seq is not None:
+            self.results.publish(frame_seq, face_names, face_locations)
+        return face_locations, face_names
+
+    def gen_names(self) -> typing.List[str]:
+        "Function to generate the names of all the faces in front of the camera after Recognition."
+        # reuse the result of the video feed when it is fresh enough
+        result = self.results.latest()
+        if result is not None:
+            return list(result.names)
+        seq, frame = self.camera.latest()  # read the camera frame
+        if frame is None:
+            return []
+        try:
+            face_locations, face_names = self.executor.submit(
+                frame, seq).result(self.recognition_timeout)
+        except concurrent.futures.TimeoutError:
+            print("Recognition timed out")
+            return []
+        return face_names
 
     def gen_name(self) -> str:
         "Function to generate name after Recognition."
-        while True:
-            success, frame = self.camera.read()  # read the camera frame
-            name = "Unknown"  # changed
-            if not success:
-                break
-            else:
-                # Resize frame of video to 1/4 size for faster face recognition processing
-                small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-                # Convert the image from BGR color (which OpenCV uses) to RGB color (which face_recognition uses)
-                rgb_small_frame = small_frame[:, :, ::-1]
-
-                # Only process every other frame of video to save time
-
-                # Find all the faces and face encodings in the current frame of video
-                face_locations = face_recognition.face_locations(
-                    rgb_small_frame)
-                face_encodings = face_recognition.face_encodings(
-                    rgb_small_frame, face_locations)
-                for face_encoding in face_encodings:
-                    # See if the face is a match for the known face(s)
-                    matches = face_recognition.compare_faces(
-                        self.known_face_encodings, face_encoding)
-                    # Or instead, use the known face with the smallest distance to the new face
-                    face_distances = face_recognition.face_distance(
-                        self.known_face_encodings, face_encoding)
-                    best_match_index = np.argmin(face_distances)
-                    if matches[best_match_index]:
-                        name = self.known_face_names[best_match_index]
-
-                return name
\ No newline at end of file
+        known_names = [name for name in self.gen_names() if name != "Unknown"]
+        return known_names[-1] if known_names else "Unknown"
@@ -0,0 +1,122 @@
+"""One pooled MongoClient per MongoDB deployment, shared by the app, the dashboard and DatabaseAPI.
+
+A MongoClient holds a connection pool and monitoring threads, so every
+module of a process gets the same client from `get_mongo_client` instead of
+building its own. The pool size, timeouts and read preference are the
+MongoClient options of "mongo_client" in config.json.
+"""
+import time
+import threading
+import pymongo
+from pymongo import monitoring
+
+_clients = {}  #url -> (client, options, connection counter)
+_lock = threading.Lock()
+
+
+class _ConnectionCounter(monitoring.ConnectionPoolListener):
+    "Counts the open connections of the pools of a client."
+
+    def __init__(self):
+        self.open = 0
+        self.created = 0
+        self._lock = threading.Lock()
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+            self.created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+def get_mongo_client(url: str, **options) -> pymongo.MongoClient:
+    """Function to get the shared client of a MongoDB deployment, created on the first call.
+
+    Parameters
+    -----------
+        - `url` (str): MongoDB connection url, a trailing "/" is ignored.
+        - `options`: MongoClient options, e.g. `maxPoolSize`, `serverSelectionTimeoutMS` or `readPreference`. Only the options of the first call are used.
+
+    Returns
+    --------
+        `pymongo.MongoClient`: The shared client.
+    """
+    key = url.rstrip("/")
+    with _lock:
+        if key in _clients:
+            client, client_options, _ = _clients[key]
+            if options and options != client_options:
+                print(f"MongoDB client of '{key}' exists with other options, "
+                      "they are ignored")
+            return client
+        counter = _ConnectionCounter()
+        client = pymongo.MongoClient(url,
+                                     event_listeners=[counter],
+                                     **options)
+        _clients[key] = client, options, counter
+        return client
+
+
+def mongo_health(client: pymongo.MongoClient) -> dict:
+    """Function to check a client can reach its deployment, for the `/health` route.
+
+    Parameters
+    -----------
+        - `client` (pymongo.MongoClient): Client from `get_mongo_client`.
+
+    Returns
+    --------
+        `dict`: "ok", "ping_ms" and "error" of a ping, the "max_pool_size" of the client and its "open_connections" and "connections_created" so far.
+    """
+    counter = next((counter for shared, _, counter in _clients.values()
+                    if shared is client), None)
+    health = {"ok": True, "ping_ms": None, "error": None}
+    start = time.perf_counter()
+    try:
+        client.admin.command("ping")
+        health["ping_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    except pymongo.errors.PyMongoError as e:
+        health["ok"], health["error"] = False, str(e)
+    health["max_pool_size"] = client.options.pool_options.max_pool_size
+    if counter is not None:
+        health["open_connections"] = counter.open
+        health["connections_created"] = counter.created
+    return health
+
+
+def close_mongo_clients() -> None:
+    "Function to close the shared clients, when the app stops."
+    with _lock:
+        for client, _, _ in _clients.values():
+            client.close()
+        _clients.clear()
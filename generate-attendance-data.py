@@ -1,14 +1,21 @@
-import pymongo
+import json
 import random
 import datetime
 import calendar
 
+from database_api_functions.attendance_store import make_attendance_store
+from database_api_functions.daily_activity import make_daily_activity_store
+from database_api_functions.mongo_client import get_mongo_client
+
 random.seed(15)
 
-DEFAULT_CONNECTION_URL = "mongodb://localhost:27017/"
-ATTENDACE_DB_NAME = "Attendance"
-EMPLOYEE_DB_NAME = "Employee"
-client = pymongo.MongoClient(DEFAULT_CONNECTION_URL)
+#the data is written through the stores of config.json, so the app reads it
+with open("config.json") as f:
+    config_file = json.load(f)
+ATTENDACE_DB_NAME = config_file["attendance_database_name"]
+EMPLOYEE_DB_NAME = config_file["employee_database_name"]
+client = get_mongo_client(config_file["mongo_db_connection_url"],
+                          **config_file["mongo_client"])
 db_names = client.list_database_names()
 if ATTENDACE_DB_NAME in db_names:
     print("Deleting:", ATTENDACE_DB_NAME)
@@ -18,8 +25,10 @@ if EMPLOYEE_DB_NAME in db_names:
     print("Deleting:", EMPLOYEE_DB_NAME)
     client.drop_database(EMPLOYEE_DB_NAME)
 
-attendance_database = client[ATTENDACE_DB_NAME]
-employee_database = client[EMPLOYEE_DB_NAME]
+attendance = make_attendance_store(client[ATTENDACE_DB_NAME],
+                                   config_file["attendance_storage"])
+daily_activity = make_daily_activity_store(client[EMPLOYEE_DB_NAME],
+                                           **config_file["daily_activity"])
 
 month_number = [2, 3, 4, 5]
 year = 2022
@@ -39,125 +48,47 @@ employee_present_range = (len(all_employees) - 6, len(all_employees))
 email = [f"{name.lower()}@attendance.com" for name in all_employees]
 emp_with_email = dict(zip(all_employees, email))
 
-#* creating collection of each employee
-for i in range(len(email)):
-    emp_collection = employee_database[email[i]]
 
-for x in month_number:
-    month = x
+def generate_day(date: datetime.date, check_out: bool = True) -> None:
+    "Checks in a random set of employees on a day, and out unless `check_out` is False."
+    attendance.prepare(date)
+    rand_num = random.randint(employee_present_range[0],
+                              employee_present_range[1])
+    name_and_email = random.sample(list(emp_with_email.items()), rand_num)
+
+    for name, emp_email in name_and_email:
+        check_in_time = datetime.datetime(
+            date.year, date.month, date.day, 9,
+            0) + datetime.timedelta(minutes=random.randrange(60))
+        total_seconds = random.randrange(6 * 3600, 8 * 3600)
+        idle_seconds = random.randrange(1 * 3600, 2 * 3600)
+        check_out_time = datetime.datetime(
+            date.year, date.month, date.day, 17,
+            0) + datetime.timedelta(minutes=random.randrange(60))
+
+        record, _ = attendance.check_in(name, emp_email, check_in_time)
+        daily_activity.start_day(name, emp_email, date)
+        if check_out:
+            attendance.check_out(emp_email, check_out_time)
+            daily_activity.save_times(emp_email, date, total_seconds,
+                                      idle_seconds)
+        print("Attendance Record:", record)
+        print("Employee Record:", emp_email, total_seconds, idle_seconds)
+
+    print(end="\n\n")
+
+
+for month in month_number:
     days = calendar.monthrange(year, month)[1]  #no of days in a month
-
     for i in range(1, days + 1):
-        date = datetime.date(year, month, i)
-        coll_date = date.strftime("%Y-%m-%d")
-        rand_num = random.randint(employee_present_range[0],
-                                  employee_present_range[1])
-        collection = attendance_database[f"Attendance_{coll_date}"]
-        name_and_email = random.sample(list(emp_with_email.items()), rand_num)
-
-        for j in range(rand_num):
-
-            check_in_time = datetime.datetime(
-                year, month, i, 9,
-                0) + datetime.timedelta(minutes=random.randrange(60))
-
-            total_time = datetime.datetime(100,
-                                           1,
-                                           1,
-                                           hour=random.randrange(6, 8),
-                                           minute=random.randrange(60),
-                                           second=random.randrange(60))
-
-            idle_time = datetime.datetime(100,
-                                          1,
-                                          1,
-                                          hour=random.randrange(1, 2),
-                                          minute=random.randrange(60),
-                                          second=random.randrange(60))
-
-            check_out_time = datetime.datetime(
-                year, month, i, 7,
-                0) + datetime.timedelta(minutes=random.randrange(60))
-            record = {
-                'Name': name_and_email[j][0],
-                'Email': name_and_email[j][1],
-                'Time': check_in_time.strftime("%H:%M:%S"),
-                'Date': date.strftime("%d/%m/%Y"),
-                "Check_In": 1,
-                "Check Out": 1,
-                "Check Out Time": check_out_time.strftime("%H:%M:%S")
-            }
-            emp_record = {
-                'Name': name_and_email[j][0],
-                'Email': name_and_email[j][1],
-                'Date': date.strftime("%d/%m/%Y"),
-                'Total_Time': total_time.strftime("%H:%M:%S"),
-                'Idle_Time': idle_time.strftime("%H:%M:%S")
-            }
-            print("Attendance Record:", record)
-            print("Employee Record:", emp_record)
-            collection.insert_one(record)
-            employee_database[name_and_email[j][1]].insert_one(emp_record)
-
-        print(end="\n\n")
-
-#! CUSTOM DATA (comment the previous code to use)
+        generate_day(datetime.date(year, month, i))
+
+#! CUSTOM DATA (comment the previous loop to use)
 # start_day = 1
 # no_of_days = 10
 # month = 10
 # year = 2022
 
-# for i in range(start_day,no_of_days+1):
-#     date = datetime.date(year,month,i)
-#     coll_date = date.strftime("%Y-%m-%d")
-#     rand_num = random.randint(employee_present_range[0],employee_present_range[1])
-#     collection = attendance_database[f"Attendance_{coll_date}"]
-#     name_and_email = random.sample(list(emp_with_email.items()),rand_num)
-
-#     for j in range(rand_num):
-#         check_in_time = datetime.datetime(year,month,i,9,0)+datetime.timedelta(minutes=random.randrange(60))
-#         total_time = datetime.datetime(100, 1, 1, hour=random.randrange(6,8), minute=random.randrange(60), second=random.randrange(60))
-#         idle_time = datetime.datetime(100, 1, 1, hour=random.randrange(1,2), minute=random.randrange(60), second=random.randrange(60))
-
-#         #* to avoid check-out on last date
-#         # if i != no_of_days:
-#         check_out_time = datetime.datetime(year,month,i,7,0)+datetime.timedelta(minutes=random.randrange(60))
-#         record = {
-#             'Name': name_and_email[j][0],
-#             'Email':name_and_email[j][1],
-#             'Time': check_in_time.strftime("%H:%M:%S"),
-#             'Date': date.strftime("%d/%m/%Y"),
-#             "Check_In":1,
-#             "Check Out":1,
-#             "Check Out Time":check_out_time.strftime("%H:%M:%S")
-#                 }
-#         emp_record = {
-#             'Name': name_and_email[j][0],
-#             'Email':name_and_email[j][1],
-#             'Date': date.strftime("%d/%m/%Y"),
-#             'Total_Time': total_time.strftime("%H:%M:%S"),
-#             'Idle_Time': idle_time.strftime("%H:%M:%S")
-#         }
-#         # else:
-#         #     record = {
-#         #         'Name': name_and_email[j][0],
-#         #         'Email': name_and_email[j][1],
-#         #         'Time': check_in_time.strftime("%H:%M:%S"),
-#         #         'Date': date.strftime("%d/%m/%Y"),
-#         #         "Check_In":1,
-#         #         "Check Out":0,
-#         #         "Check Out Time":None
-#         #             }
-#         #     emp_record = {
-#         #         'Name': name_and_email[j][0],
-#         #         'Email':name_and_email[j][1],
-#         #         'Date': date.strftime("%d/%m/%Y"),
-#         #         'Total_Time': None,
-#         #         'Idle_Time': None
-#         #     }
-#         print("Attendance Record:",record)
-#         print("Employee Record:",emp_record)
-#         collection.insert_one(record)
-#         employee_database[name_and_email[j][1]].insert_one(emp_record)
-
-#     print(end = "\n\n")
\ No newline at end of file
+# for i in range(start_day, no_of_days + 1):
+#     #* to avoid check-out on last date
+#     generate_day(datetime.date(year, month, i), check_out=i != no_of_days)
@@ -0,0 +1,194 @@
+import time
+import typing
+import threading
+from datetime import datetime
+import pymongo
+
+ACTIVE, AWAY, IDLE = "active", "away", "idle"
+
+
+class LocalActivityStore:
+    "In-process stand-in of the shared activity store, enough for a single worker process"
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def load(self, email: str) -> typing.Optional[dict]:
+        with self._lock:
+            record = self._records.get(email)
+            return dict(record) if record is not None else None
+
+    def compare_and_set(self, email: str, expected: typing.Optional[dict],
+                        record: dict) -> bool:
+        "Stores `record` if the stored record is still `expected`, like `MongoActivityStore`."
+        with self._lock:
+            if self._records.get(email) != expected:
+                return False
+            self._records[email] = dict(record)
+            return True
+
+
+class MongoActivityStore:
+    "Activity store shared by all the worker processes of the app, one document per employee"
+
+    def __init__(self, collection: pymongo.collection.Collection):
+        """Instantiate the MongoActivityStore object
+
+        Parameters
+        -----------
+           - `collection` (pymongo.collection.Collection): Collection of the activity records, keyed by email.
+        """
+        self.collection = collection
+
+    def load(self, email: str) -> typing.Optional[dict]:
+        record = self.collection.find_one({"_id": email}, {"_id": 0})
+        return record
+
+    def compare_and_set(self, email: str, expected: typing.Optional[dict],
+                        record: dict) -> bool:
+        "Stores `record` if the stored record is still `expected`, in one atomic round trip."
+        if expected is None:
+            try:
+                self.collection.insert_one({"_id": email, **record})
+                return True
+            except pymongo.errors.DuplicateKeyError:
+                return False
+        result = self.collection.update_one(
+            {
+                "_id": email,
+                "date": expected["date"],
+                "state": expected["state"],
+                "changed_at": expected["changed_at"]
+            }, {"$set": record})
+        return result.matched_count == 1
+
+
+class ActivityTracker:
+    """Class to follow whether every employee is at their desk, with an active/away/idle state machine.
+
+    - `active`: the face of the employee is seen.
+    - `away`: the face is not seen, for less than `idle_after` seconds.
+    - `idle`: the face was not seen for `idle_after` seconds, the idle time
+      counts from then until the face is seen again.
+
+    Records hold the state and the timestamp of the last transition, so the
+    idle time is computed when read and a tick only writes on a transition.
+    Every process keeps the records it uses in memory and writes transitions
+    with a compare and set, reloading the record when another process was
+    faster.
+    """
+
+    def __init__(self,
+                 store: typing.Union[LocalActivityStore,
+                                     MongoActivityStore] = None,
+                 idle_after: float = 10.0,
+                 load_idle: typing.Callable[[str], float] = lambda email: 0.0):
+        """Instantiate the ActivityTracker object
+
+        Parameters
+        -----------
+           - `store` (LocalActivityStore or MongoActivityStore, optional): Store of the records, shared by the worker processes. Defaults to a local store.
+           - `idle_after` (float, optional): Seconds without the face after which an employee is idle. Defaults to 10.0.
+           - `load_idle` (Callable[[str], float], optional): Idle seconds of today of an employee without a record yet, e.g. saved before a restart. Defaults to 0.
+        """
+        self.store = store if store is not None else LocalActivityStore()
+        self.idle_after = idle_after
+        self.load_idle = load_idle
+        self._records = {}  #email -> record as last read or written by this process
+        self._day = None  #day of the records in memory
+        self._lock = threading.Lock()
+
+    def _record(self, email: str, now: float) -> typing.Optional[dict]:
+        "Record of today of an employee, from the memory of this process or from the store."
+        today = datetime.fromtimestamp(now).strftime("%Y-%m-%d")
+        if self._day != today:  #the records of the day before are never read again
+            self._records.clear()
+            self._day = today
+        record = self._records.get(email)
+        if record is None or record["date"] != today:
+            record = self.store.load(email)
+            if record is None or record["date"] != today:
+                fresh = {
+                    "date": today,
+                    "state": AWAY,
+                    "changed_at": now,
+                    "idle_seconds": float(self.load_idle(email))
+                }
+                if not self.store.compare_and_set(email, record, fresh):
+                    fresh = self.store.load(email)
+                record = fresh
+            self._records[email] = record
+        return record
+
+    @staticmethod
+    def _next(record: dict, present: bool, now: float,
+              idle_after: float) -> typing.Optional[dict]:
+        "Transition of a record for a tick, None if the state does not change."
+        state, changed_at = record["state"], record["changed_at"]
+        if present:
+            if state == ACTIVE:
+                return None
+            idle_seconds = record["idle_seconds"]
+            if state == IDLE:
+                idle_seconds += max(now - changed_at, 0.0)
+            return {**record, "state": ACTIVE, "changed_at": now,
+                    "idle_seconds": idle_seconds}
+        if state == ACTIVE:
+            return {**record, "state": AWAY, "changed_at": now}
+        if state == AWAY and now - changed_at >= idle_after:
+            # idle from the moment the threshold was reached
+            return {**record, "state": IDLE,
+                    "changed_at": changed_at + idle_after}
+        return None
+
+    def observe(self, email: str, present: bool, now: float = None) -> str:
+        """Function to update an employee with whether their face is seen, once per tick.
+
+        Parameters
+        -----------
+            - `email` (str): Email of the employee.
+            - `present` (bool): Whether the face of the employee is seen.
+            - `now` (float, optional): Timestamp of the tick. Defaults to `time.time()`.
+
+        Returns
+        --------
+            `str`: The state after the tick, "active", "away" or "idle".
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            for _ in range(3):  #another process may transition the record first
+                record = self._record(email, now)
+                new_record = self._next(record, present, now, self.idle_after)
+                if new_record is None:
+                    return record["state"]
+                if self.store.compare_and_set(email, record, new_record):
+                    self._records[email] = new_record
+                    return new_record["state"]
+                self._records.pop(email, None)
+            return record["state"]
+
+    def idle_seconds(self, email: str, now: float = None) -> float:
+        """Function to get the idle seconds of today of an employee.
+
+        Parameters
+        -----------
+            - `email` (str): Email of the employee.
+            - `now` (float, optional): Timestamp the idle time is computed at. Defaults to `time.time()`.
+
+        Returns
+        --------
+            `float`: Idle seconds, including the current idle period.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            record = self._record(email, now)
+        idle_seconds = record["idle_seconds"]
+        if record["state"] == IDLE:
+            idle_seconds += max(now - record["changed_at"], 0.0)
+        return idle_seconds
+
+    def forget(self, email: str) -> None:
+        "Function to drop the record of an employee from the memory of this process, e.g. at the check-out, it is read from the store again when needed."
+        with self._lock:
+            self._records.pop(email, None)
@@ -0,0 +1,126 @@
+import json
+import time
+import typing
+import threading
+from monitoring.session_tracker import SessionTracker, format_seconds
+
+
+class LiveTimes:
+    """Class that updates the times of all the watched employees on one ticker thread and pushes them as Server-Sent Events.
+
+    Every client holds one `subscribe` stream and only receives an event when
+    the total or idle time of its employee changed.
+    """
+
+    def __init__(self,
+                 tracker: SessionTracker,
+                 tick: typing.Callable[[typing.List[str]], None] = None,
+                 interval: float = 1.0,
+                 heartbeat: float = 15.0):
+        """Instantiate the LiveTimes object
+
+        Parameters
+        -----------
+           - `tracker` (SessionTracker): Source of the total and idle times.
+           - `tick` (Callable[[List[str]], None], optional): Called once per tick with the emails of the watched employees, e.g. to update their idle time. Defaults to None.
+           - `interval` (float, optional): Seconds between two ticks. Defaults to 1.0.
+           - `heartbeat` (float, optional): Seconds after which an idle stream sends a comment, so closed connections are noticed. Defaults to 15.0.
+        """
+        self.tracker = tracker
+        self.tick = tick
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self._watchers = {}  #email -> number of open streams
+        self._events = {}  #email -> (version, event data)
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self) -> "LiveTimes":
+        "Function to start the ticker thread."
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._tick_loop,
+                                            name="live-times",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        "Function to stop the ticker thread and end the streams."
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _tick_loop(self) -> None:
+        next_tick = time.monotonic()
+        while not self._stopping:
+            with self._condition:
+                emails = list(self._watchers)
+            if emails:
+                try:
+                    if self.tick is not None:
+                        self.tick(emails)
+                    self._publish(emails)
+                except Exception as e:
+                    print(f"Monitoring tick failed: {e}")
+            # ticks stay on the interval however long the tick took
+            next_tick += self.interval
+            time.sleep(max(next_tick - time.monotonic(), 0.0))
+
+    def _publish(self, emails: typing.List[str]) -> None:
+        "Wakes the streams of the employees whose times changed."
+        events = {}
+        for email in emails:
+            events[email] = json.dumps({
+                "total_time":
+                format_seconds(self.tracker.total_seconds(email)),
+                "idle_time": format_seconds(self.tracker.idle_seconds(email))
+            })
+        with self._condition:
+            changed = False
+            for email, data in events.items():
+                version, last_data = self._events.get(email, (0, None))
+                if data != last_data:
+                    self._events[email] = version + 1, data
+                    changed = True
+            if changed:
+                self._condition.notify_all()
+
+    def subscribe(self, email: str) -> typing.Iterator[str]:
+        """Generator of the Server-Sent Events of an employee, for a Flask `Response`.
+
+        Parameters
+        -----------
+            - `email` (str): Email of the employee.
+
+        Yields
+        -------
+            `str`: Event with the JSON of the total and idle time, or a heartbeat comment.
+        """
+        with self._condition:
+            self._watchers[email] = self._watchers.get(email, 0) + 1
+        try:
+            self._publish([email])  #the first event is sent right away
+            seen = 0
+            while not self._stopping:
+                with self._condition:
+                    self._condition.wait_for(
+                        lambda: self._stopping or self._events.get(
+                            email, (0, None))[0] > seen, self.heartbeat)
+                    version, data = self._events.get(email, (0, None))
+                if self._stopping:
+                    break
+                if version > seen:
+                    seen = version
+                    yield f"data: {data}\n\n"
+                else:
+                    yield ": heartbeat\n\n"
+        finally:
+            with self._condition:
+                self._watchers[email] -= 1
+                if not self._watchers[email]:
+                    del self._watchers[email]
+                    self._events.pop(email, None)
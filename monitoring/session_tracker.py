@@ -0,0 +1,157 @@
+import time
+import typing
+import threading
+from datetime import datetime
+
+
+def format_seconds(seconds: float) -> str:
+    "Function to format a duration like the 'Total_Time' and 'Idle_Time' fields, e.g. '01:02:03'."
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class EmployeeSession:
+    "Working day of one employee, from the check-in to the check-out"
+
+    def __init__(self,
+                 check_in: datetime,
+                 check_out: typing.Optional[datetime] = None,
+                 idle_seconds: float = 0.0):
+        self.check_in = check_in
+        self.check_out = check_out
+        self.idle_seconds = idle_seconds
+        self.saved = None  #(total, idle) seconds of the last save
+
+    def total_seconds(self, now: datetime = None) -> float:
+        "Seconds since the check-in, up to the check-out."
+        end = self.check_out or now or datetime.now()
+        return max((end - self.check_in).total_seconds(), 0.0)
+
+
+class SessionTracker:
+    """Class to keep the working time of the checked in employees in memory, keyed by email.
+
+    The total time is computed from the check-in timestamp, so reading it is a
+    dictionary lookup. The times are saved to the database by a background
+    thread every `save_interval` seconds, only for the sessions that changed.
+    An employee found not checked in is looked up again after
+    `not_checked_in_ttl` seconds, for the check-ins of other processes.
+    """
+
+    def __init__(self,
+                 load: typing.Callable[[str], typing.Optional[typing.Tuple[
+                     datetime, typing.Optional[datetime], float]]],
+                 save: typing.Callable[[str, datetime, float, float], None],
+                 save_interval: float = 5.0,
+                 not_checked_in_ttl: float = 30.0):
+        """Instantiate the SessionTracker object
+
+        Parameters
+        -----------
+           - `load` (Callable[[str], Tuple[datetime, datetime, float]]): Returns the check-in, the check-out (or None) and the idle seconds of today for an email, None if the employee did not check in, e.g. `DatabaseAPI.attendance_session`.
+           - `save` (Callable[[str, datetime, float, float], None]): Saves the total and idle seconds of the day of a check-in for an email, e.g. `DatabaseAPI.save_session_times`.
+           - `save_interval` (float, optional): Seconds between two saves. Defaults to 5.0.
+           - `not_checked_in_ttl` (float, optional): Seconds an employee found not checked in is cached for. Defaults to 30.0.
+        """
+        self.load = load
+        self.save = save
+        self.save_interval = save_interval
+        self.not_checked_in_ttl = not_checked_in_ttl
+        self._sessions = {}  #email -> (date, EmployeeSession or None if not checked in, time.monotonic() of the load)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def session(self, email: str) -> typing.Optional[EmployeeSession]:
+        """Function to get the session of today of an employee, loaded from the database the first time.
+
+        Parameters
+        -----------
+            - `email` (str): Email of the employee.
+
+        Returns
+        --------
+            `EmployeeSession`: The session, None if the employee did not check in today.
+        """
+        today = datetime.now().date()
+        with self._lock:
+            entry = self._sessions.get(email)
+        if entry is not None:
+            date, session, loaded_at = entry
+            if date == today and (session is not None or time.monotonic() -
+                                  loaded_at < self.not_checked_in_ttl):
+                return session
+            if date != today and session is not None:
+                # the day rolled over, save the last seconds of the old session
+                self._save_quietly(email, session)
+        loaded = self.load(email)
+        session = EmployeeSession(*loaded) if loaded else None
+        with self._lock:
+            self._sessions[email] = today, session, time.monotonic()
+        return session
+
+    def refresh(self, email: str) -> None:
+        "Function to save the session of an employee and load it again, e.g. after a check-in or check-out."
+        with self._lock:
+            date, session, _ = self._sessions.pop(email, (None, None, None))
+        if session is not None:
+            self._save(email, session)
+
+    def total_seconds(self, email: str) -> float:
+        "Function to get the seconds since the check-in of an employee, 0 if not checked in."
+        session = self.session(email)
+        return session.total_seconds() if session is not None else 0.0
+
+    def idle_seconds(self, email: str) -> float:
+        "Function to get the idle seconds of an employee today."
+        session = self.session(email)
+        return session.idle_seconds if session is not None else 0.0
+
+    def set_idle_seconds(self, email: str, seconds: float) -> None:
+        "Function to update the idle seconds of an employee, saved with the next batch."
+        session = self.session(email)
+        if session is not None:
+            session.idle_seconds = seconds
+
+    def _save(self, email: str, session: EmployeeSession) -> None:
+        times = (int(session.total_seconds()), int(session.idle_seconds))
+        if times != session.saved:
+            self.save(email, session.check_in, *times)
+            session.saved = times
+
+    def _save_quietly(self, email: str, session: EmployeeSession) -> None:
+        "Saves a session, printing a database error instead of raising it."
+        try:
+            self._save(email, session)
+        except Exception as e:
+            print(f"Could not save the times of {email}: {e}")
+
+    def flush(self) -> None:
+        "Function to save the times of every session that changed since its last save."
+        with self._lock:
+            sessions = [(email, session)
+                        for email, (date, session, _) in self._sessions.items()
+                        if session is not None]
+        for email, session in sessions:
+            self._save_quietly(email, session)
+
+    def start(self) -> "SessionTracker":
+        "Function to start the background thread saving the sessions."
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._save_loop,
+                                            name="session-tracker",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        "Function to stop the background thread after a last save."
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _save_loop(self) -> None:
+        while not self._stopping.wait(self.save_interval):
+            self.flush()
+        self.flush()
@@ -0,0 +1,187 @@
+import os
+import typing
+import cv2
+import numpy as np
+import face_recognition
+
+Box = typing.Tuple[int, int, int, int]  #(top, right, bottom, left) like face_recognition
+
+
+def _to_boxes(rectangles, height: int, width: int) -> typing.List[Box]:
+    "(x, y, w, h) rectangles of OpenCV to boxes clipped to the image."
+    boxes = []
+    for x, y, w, h in rectangles:
+        top, left = max(int(y), 0), max(int(x), 0)
+        bottom, right = min(int(y + h), height), min(int(x + w), width)
+        if bottom > top and right > left:
+            boxes.append((top, right, bottom, left))
+    return boxes
+
+
+class FaceDetector:
+    """Base class of the face detectors used by `DatabaseAPI`.
+
+    `detect` takes an RGB image, like `face_recognition.face_locations`, and
+    returns the face boxes as `(top, right, bottom, left)`.
+    """
+
+    def detect(self, rgb_image: np.ndarray) -> typing.List[Box]:
+        "Function to find the faces of an RGB image."
+        raise NotImplementedError
+
+
+class HOGDetector(FaceDetector):
+    "dlib HOG detector of face_recognition, the most accurate CPU backend but also the slowest"
+
+    def __init__(self, upsample: int = 1):
+        """Instantiate the HOGDetector object
+
+        Parameters
+        -----------
+           - `upsample` (int, optional): How many times the image is upsampled to find smaller faces, 0 is about 4 times faster. Defaults to 1.
+        """
+        self.upsample = upsample
+
+    def detect(self, rgb_image: np.ndarray) -> typing.List[Box]:
+        return face_recognition.face_locations(
+            rgb_image, number_of_times_to_upsample=self.upsample)
+
+
+class HaarDetector(FaceDetector):
+    "OpenCV Haar cascade, very fast but with more false positives on profile faces"
+
+    def __init__(self,
+                 cascade_path: str = None,
+                 scale_factor: float = 1.1,
+                 min_neighbors: int = 5,
+                 min_size: int = 20):
+        """Instantiate the HaarDetector object
+
+        Parameters
+        -----------
+           - `cascade_path` (str, optional): Path of the cascade XML file. Defaults to the frontal face cascade shipped with opencv-python.
+           - `scale_factor` (float, optional): Scale step between two detection scales. Defaults to 1.1.
+           - `min_neighbors` (int, optional): Overlapping detections needed to keep a face. Defaults to 5.
+           - `min_size` (int, optional): Smallest face side in pixels. Defaults to 20.
+
+        Raises
+        -------
+            `ImportError`: The installed OpenCV has no cascade classifier (moved out of OpenCV 5).
+        """
+        if not hasattr(cv2, "CascadeClassifier"):
+            raise ImportError(
+                "The 'haar' face detector needs the cascade classifier of opencv-python 4.x")
+        if cascade_path is None:
+            cascade_path = os.path.join(cv2.data.haarcascades,
+                                        "haarcascade_frontalface_default.xml")
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise ValueError(f"Could not load the Haar cascade {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def detect(self, rgb_image: np.ndarray) -> typing.List[Box]:
+        gray = cv2.cvtColor(np.ascontiguousarray(rgb_image),
+                            cv2.COLOR_RGB2GRAY)
+        rectangles = self.cascade.detectMultiScale(
+            gray,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=(self.min_size, self.min_size))
+        return _to_boxes(rectangles, *gray.shape[:2])
+
+
+class SSDDetector(FaceDetector):
+    "OpenCV DNN with the ResNet-10 SSD face model (res10_300x300_ssd_iter_140000)"
+
+    def __init__(self,
+                 model_path: str,
+                 config_path: str,
+                 confidence: float = 0.5,
+                 input_size: int = 300):
+        """Instantiate the SSDDetector object
+
+        Parameters
+        -----------
+           - `model_path` (str): Path of the `.caffemodel` file.
+           - `config_path` (str): Path of the `deploy.prototxt` file.
+           - `confidence` (float, optional): Smallest score of a face. Defaults to 0.5.
+           - `input_size` (int, optional): Side of the square network input. Defaults to 300.
+        """
+        self.net = cv2.dnn.readNetFromCaffe(config_path, model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.confidence = confidence
+        self.input_size = input_size
+
+    def detect(self, rgb_image: np.ndarray) -> typing.List[Box]:
+        height, width = rgb_image.shape[:2]
+        # the model was trained on BGR images with these B, G, R means
+        bgr_image = cv2.cvtColor(np.ascontiguousarray(rgb_image),
+                                 cv2.COLOR_RGB2BGR)
+        blob = cv2.dnn.blobFromImage(bgr_image, 1.0,
+                                     (self.input_size, self.input_size),
+                                     (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        detections = detections[detections[:, 2] >= self.confidence]
+        rectangles = [(x1 * width, y1 * height, (x2 - x1) * width,
+                       (y2 - y1) * height)
+                      for x1, y1, x2, y2 in detections[:, 3:7]]
+        return _to_boxes(rectangles, height, width)
+
+
+class YuNetDetector(FaceDetector):
+    "OpenCV DNN with the YuNet face model (face_detection_yunet_*.onnx)"
+
+    def __init__(self,
+                 model_path: str,
+                 confidence: float = 0.6,
+                 nms_threshold: float = 0.3):
+        """Instantiate the YuNetDetector object
+
+        Parameters
+        -----------
+           - `model_path` (str): Path of the `.onnx` file.
+           - `confidence` (float, optional): Smallest score of a face. Defaults to 0.6.
+           - `nms_threshold` (float, optional): Overlap above which two faces are merged. Defaults to 0.3.
+        """
+        self.net = cv2.FaceDetectorYN.create(model_path, "", (320, 320),
+                                             confidence, nms_threshold)
+
+    def detect(self, rgb_image: np.ndarray) -> typing.List[Box]:
+        height, width = rgb_image.shape[:2]
+        bgr_image = cv2.cvtColor(np.ascontiguousarray(rgb_image),
+                                 cv2.COLOR_RGB2BGR)
+        self.net.setInputSize((width, height))
+        _, faces = self.net.detect(bgr_image)
+        if faces is None:
+            return []
+        return _to_boxes(faces[:, :4], height, width)
+
+
+FACE_DETECTOR_BACKENDS = {
+    "hog": HOGDetector,
+    "hog_fast": lambda **options: HOGDetector(upsample=0, **options),
+    "haar": HaarDetector,
+    "ssd": SSDDetector,
+    "yunet": YuNetDetector,
+}
+
+
+def make_face_detector(backend: str = "hog", **options) -> FaceDetector:
+    """Function to create a face detector from its name, as used in config.json.
+
+    Parameters
+    -----------
+        - `backend` (str, optional): One of "hog", "hog_fast" (HOG without upsampling), "haar", "ssd" or "yunet". Defaults to "hog".
+        - `**options`: Keyword arguments of the backend class, e.g. `model_path` for the DNN backends.
+
+    Returns
+    --------
+        `FaceDetector`: The detector.
+    """
+    if backend not in FACE_DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown face detector backend: '{backend}'")
+    return FACE_DETECTOR_BACKENDS[backend](**options)
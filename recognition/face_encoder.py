@@ -0,0 +1,70 @@
+import typing
+import dlib
+import numpy as np
+import face_recognition
+
+Box = typing.Tuple[int, int, int, int]  #(top, right, bottom, left) like face_recognition
+
+LANDMARK_MODELS = {
+    "small": face_recognition.api.pose_predictor_5_point,
+    "large": face_recognition.api.pose_predictor_68_point,
+}
+
+
+class FaceEncoder:
+    "Class to compute the encodings of all the faces of a frame in one batch of the dlib network"
+
+    def __init__(self,
+                 landmark_model: str = "small",
+                 num_jitters: int = 1,
+                 max_faces: typing.Optional[int] = 8):
+        """Instantiate the FaceEncoder object
+
+        Parameters
+        -----------
+           - `landmark_model` (str, optional): "small" (5 points, faster) or "large" (68 points) landmarks used to align the faces. Defaults to "small", the model of `face_recognition.face_encodings`.
+           - `num_jitters` (int, optional): How many randomly distorted copies of every face are encoded and averaged, the time grows linearly with it. Defaults to 1.
+           - `max_faces` (int, optional): Largest number of faces encoded per frame, the largest (closest) faces are kept so the latency stays bounded in a crowd. None encodes every face. Defaults to 8.
+        """
+        if landmark_model not in LANDMARK_MODELS:
+            raise ValueError(f"Unknown landmark model: '{landmark_model}'")
+        self.landmark_model = landmark_model
+        self.num_jitters = num_jitters
+        self.max_faces = max_faces
+        self._pose_predictor = LANDMARK_MODELS[landmark_model]
+        self._face_encoder = face_recognition.api.face_encoder
+
+    def encode(
+        self, rgb_image: np.ndarray, face_locations: typing.List[Box]
+    ) -> typing.Tuple[typing.List[Box], typing.List[np.ndarray]]:
+        """Function to encode the faces found in an RGB image.
+
+        Parameters
+        -----------
+            - `rgb_image` (numpy.ndarray): RGB image the faces were found in.
+            - `face_locations` (List[Box]): Face boxes as `(top, right, bottom, left)`.
+
+        Returns
+        --------
+            `Tuple[List[Box], List[numpy.ndarray]]`: The encoded face locations (at most `max_faces`) and their 128-d encodings.
+        """
+        if self.max_faces is not None and len(face_locations) > self.max_faces:
+            face_locations = sorted(
+                face_locations,
+                key=lambda box: (box[2] - box[0]) * (box[1] - box[3]),
+                reverse=True)[:self.max_faces]
+        if not face_locations:
+            return [], []
+        # dlib only takes contiguous arrays, not the flipped view of a BGR frame
+        rgb_image = np.ascontiguousarray(rgb_image)
+        landmarks = dlib.full_object_detections()
+        for top, right, bottom, left in face_locations:
+            landmarks.append(
+                self._pose_predictor(rgb_image,
+                                     dlib.rectangle(left, top, right, bottom)))
+        # one call runs the network on all the aligned crops as a batch
+        descriptors = self._face_encoder.compute_face_descriptor(
+            rgb_image, landmarks, self.num_jitters)
+        return list(face_locations), [
+            np.array(descriptor) for descriptor in descriptors
+        ]
@@ -0,0 +1,339 @@
+import typing
+import numpy as np
+
+try:
+    import hnswlib  # optional, only needed for the "hnsw" backend
+except ImportError:
+    hnswlib = None
+
+ENCODING_SIZE = 128  #size of a dlib face encoding
+
+
+def _as_matrix(encodings) -> np.ndarray:
+    "Contiguous float32 (N, 128) matrix of encodings."
+    return np.ascontiguousarray(
+        np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE))
+
+
+def _top_k(squared: np.ndarray, labels: np.ndarray,
+           k: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+    "Labels and distances of the `k` smallest squared distances of every row, nearest first."
+    if k < squared.shape[1]:
+        columns = np.argpartition(squared, k - 1, axis=1)[:, :k]
+    else:
+        columns = np.broadcast_to(np.arange(squared.shape[1]),
+                                  squared.shape).copy()
+    nearest = np.take_along_axis(squared, columns, axis=1)
+    order = np.argsort(nearest, axis=1)
+    columns = np.take_along_axis(columns, order, axis=1)
+    distances = np.sqrt(np.take_along_axis(nearest, order, axis=1))
+    return labels[columns], distances
+
+
+class FaceIndex:
+    """Base class of the nearest neighbour indexes behind `FaceMatcher`.
+
+    Every encoding is stored under an integer label, `query` returns labels of
+    shape `(faces, k)` padded with -1 (and an infinite distance) when less than
+    `k` candidates were found.
+    """
+
+    def build(self, labels: typing.Sequence[int], encodings) -> None:
+        "Function to replace the content of the index."
+        raise NotImplementedError
+
+    def add(self, labels: typing.Sequence[int], encodings) -> None:
+        "Function to add encodings under new labels."
+        raise NotImplementedError
+
+    def remove(self, labels: typing.Sequence[int]) -> None:
+        "Function to remove the encodings stored under `labels`."
+        raise NotImplementedError
+
+    def replace(self, labels: typing.Sequence[int], encodings) -> None:
+        "Function to store new encodings under existing labels."
+        self.remove(labels)
+        self.add(labels, encodings)
+
+    def query(self, encodings,
+              k: int = 1) -> typing.Tuple[np.ndarray, np.ndarray]:
+        "Function to find the labels and euclidean distances of the `k` nearest encodings."
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def _empty_result(self, queries: int,
+                      k: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+        return (np.full((queries, k), -1, dtype=np.int64),
+                np.full((queries, k), np.inf, dtype=np.float32))
+
+
+class BruteForceIndex(FaceIndex):
+    "Exact index, one matrix product over all the encodings"
+
+    def __init__(self):
+        self.labels = np.empty(0, dtype=np.int64)
+        self.encodings = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        self.squared_norms = np.empty(0, dtype=np.float32)
+
+    def build(self, labels, encodings) -> None:
+        self.labels = np.asarray(labels, dtype=np.int64).copy()
+        self.encodings = _as_matrix(encodings).copy()
+        self.squared_norms = np.einsum("ij,ij->i", self.encodings,
+                                       self.encodings)
+
+    def add(self, labels, encodings) -> None:
+        encodings = _as_matrix(encodings)
+        self.labels = np.concatenate(
+            [self.labels, np.asarray(labels, dtype=np.int64)])
+        self.encodings = np.concatenate([self.encodings, encodings])
+        self.squared_norms = np.concatenate([
+            self.squared_norms,
+            np.einsum("ij,ij->i", encodings, encodings)
+        ])
+
+    def remove(self, labels) -> None:
+        keep = ~np.isin(self.labels, np.asarray(labels, dtype=np.int64))
+        self.labels = self.labels[keep]
+        self.encodings = np.ascontiguousarray(self.encodings[keep])
+        self.squared_norms = self.squared_norms[keep]
+
+    def replace(self, labels, encodings) -> None:
+        labels = np.asarray(labels, dtype=np.int64)
+        rows = np.flatnonzero(np.isin(self.labels, labels))
+        if len(rows) != len(labels):
+            return super().replace(labels, encodings)
+        # overwrite the rows in place instead of copying the matrix, rows and
+        # new encodings are both put in the order of their labels
+        encodings = _as_matrix(encodings)[np.argsort(labels)]
+        rows = rows[np.argsort(self.labels[rows])]
+        self.encodings[rows] = encodings
+        self.squared_norms[rows] = np.einsum("ij,ij->i", encodings, encodings)
+
+    def query(self, encodings, k: int = 1):
+        queries = _as_matrix(encodings)
+        if not len(queries) or not len(self) or k < 1:
+            return self._empty_result(len(queries), max(k, 0))
+        # |q - x|^2 = |q|^2 + |x|^2 - 2 q.x for all the pairs at once
+        squared = (np.einsum("ij,ij->i", queries, queries)[:, None] +
+                   self.squared_norms[None, :] -
+                   2.0 * (queries @ self.encodings.T))
+        np.maximum(squared, 0.0, out=squared)
+        labels, distances = _top_k(squared, self.labels, k)
+        if labels.shape[1] < k:
+            pad_labels, pad_distances = self._empty_result(
+                len(queries), k - labels.shape[1])
+            labels = np.hstack([labels, pad_labels])
+            distances = np.hstack([distances, pad_distances])
+        return labels, distances
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+class IVFIndex(FaceIndex):
+    "Approximate inverted file index, k-means lists of which only the `nprobe` nearest are scanned"
+
+    def __init__(self,
+                 nlist: typing.Optional[int] = None,
+                 nprobe: int = 8,
+                 iterations: int = 10,
+                 seed: int = 15):
+        """Instantiate the IVFIndex object
+
+        Parameters
+        -----------
+           - `nlist` (int, optional): Number of k-means lists. Defaults to about sqrt(N) at build time.
+           - `nprobe` (int, optional): Number of lists scanned per query, higher is slower but more accurate. Defaults to 8.
+           - `iterations` (int, optional): k-means iterations at build time. Defaults to 10.
+           - `seed` (int, optional): Seed of the k-means initialisation. Defaults to 15.
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        self._lists = []  #BruteForceIndex per centroid
+        self._list_of_label = {}
+
+    def _train(self, encodings: np.ndarray) -> None:
+        "k-means on (a sample of) the encodings."
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or int(np.sqrt(len(encodings)))
+        nlist = max(1, min(nlist, len(encodings)))
+        sample = encodings
+        if len(sample) > 256 * nlist:
+            sample = sample[rng.choice(len(sample), 256 * nlist, False)]
+        centroids = sample[rng.choice(len(sample), nlist, False)].copy()
+        for _ in range(self.iterations):
+            assignment = self._nearest_centroids(sample, centroids, 1)[:, 0]
+            for i in range(nlist):
+                members = sample[assignment == i]
+                if len(members):
+                    centroids[i] = members.mean(axis=0)
+        self.centroids = centroids
+
+    @staticmethod
+    def _nearest_centroids(encodings: np.ndarray, centroids: np.ndarray,
+                           count: int) -> np.ndarray:
+        squared = (np.einsum("ij,ij->i", centroids, centroids)[None, :] -
+                   2.0 * (encodings @ centroids.T))
+        count = min(count, len(centroids))
+        if count < len(centroids):
+            return np.argpartition(squared, count - 1, axis=1)[:, :count]
+        return np.broadcast_to(np.arange(count), squared.shape)
+
+    def build(self, labels, encodings) -> None:
+        labels = np.asarray(labels, dtype=np.int64)
+        encodings = _as_matrix(encodings)
+        self._lists, self._list_of_label = [], {}
+        if not len(encodings):
+            self.centroids = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+            return
+        self._train(encodings)
+        self._lists = [BruteForceIndex() for _ in self.centroids]
+        self.add(labels, encodings)
+
+    def add(self, labels, encodings) -> None:
+        labels = np.asarray(labels, dtype=np.int64)
+        encodings = _as_matrix(encodings)
+        if not len(self.centroids):
+            # nothing to train on yet, the first encodings become the lists
+            self.build(labels, encodings)
+            return
+        assignment = self._nearest_centroids(encodings, self.centroids,
+                                             1)[:, 0]
+        for i in np.unique(assignment):
+            members = assignment == i
+            self._lists[i].add(labels[members], encodings[members])
+            for label in labels[members]:
+                self._list_of_label[int(label)] = int(i)
+
+    def remove(self, labels) -> None:
+        by_list = {}
+        for label in labels:
+            i = self._list_of_label.pop(int(label), None)
+            if i is not None:
+                by_list.setdefault(i, []).append(int(label))
+        for i, list_labels in by_list.items():
+            self._lists[i].remove(list_labels)
+
+    def query(self, encodings, k: int = 1):
+        queries = _as_matrix(encodings)
+        labels, distances = self._empty_result(len(queries), max(k, 0))
+        if not len(queries) or not len(self) or k < 1:
+            return labels, distances
+        probes = self._nearest_centroids(queries, self.centroids, self.nprobe)
+        for row, (query, probe) in enumerate(zip(queries, probes)):
+            candidates = BruteForceIndex()
+            lists = [self._lists[i] for i in probe if len(self._lists[i])]
+            if not lists:
+                continue
+            candidates.labels = np.concatenate([l.labels for l in lists])
+            candidates.encodings = np.concatenate(
+                [l.encodings for l in lists])
+            candidates.squared_norms = np.concatenate(
+                [l.squared_norms for l in lists])
+            row_labels, row_distances = candidates.query(query, k)
+            labels[row], distances[row] = row_labels[0], row_distances[0]
+        return labels, distances
+
+    def __len__(self) -> int:
+        return len(self._list_of_label)
+
+
+class HNSWIndex(FaceIndex):
+    "Approximate graph index backed by the optional `hnswlib` package"
+
+    def __init__(self, M: int = 16, ef_construction: int = 200, ef: int = 64):
+        """Instantiate the HNSWIndex object
+
+        Parameters
+        -----------
+           - `M` (int, optional): Number of links per node. Defaults to 16.
+           - `ef_construction` (int, optional): Candidate list size while building. Defaults to 200.
+           - `ef` (int, optional): Candidate list size while querying, higher is slower but more accurate. Defaults to 64.
+
+        Raises
+        -------
+            `ImportError`: hnswlib is not installed.
+        """
+        if hnswlib is None:
+            raise ImportError(
+                "The 'hnsw' face index needs hnswlib (pip install hnswlib)")
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self._labels = set()
+        self._index = None
+
+    def build(self, labels, encodings) -> None:
+        self._index = hnswlib.Index(space="l2", dim=ENCODING_SIZE)
+        self._index.init_index(max_elements=max(16, len(labels)),
+                               ef_construction=self.ef_construction,
+                               M=self.M,
+                               allow_replace_deleted=True)
+        self._index.set_ef(self.ef)
+        self._labels = set()
+        self.add(labels, encodings)
+
+    def add(self, labels, encodings) -> None:
+        if self._index is None:
+            self.build([], [])
+        labels = np.asarray(labels, dtype=np.int64)
+        if not len(labels):
+            return
+        needed = self._index.get_current_count() + len(labels)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 *
+                                         self._index.get_max_elements()))
+        self._index.add_items(_as_matrix(encodings),
+                              labels,
+                              replace_deleted=True)
+        self._labels.update(int(label) for label in labels)
+
+    def remove(self, labels) -> None:
+        for label in labels:
+            if int(label) in self._labels:
+                self._index.mark_deleted(int(label))
+                self._labels.discard(int(label))
+
+    def query(self, encodings, k: int = 1):
+        queries = _as_matrix(encodings)
+        labels, distances = self._empty_result(len(queries), max(k, 0))
+        found = min(k, len(self))
+        if not len(queries) or found < 1:
+            return labels, distances
+        # hnswlib returns squared euclidean distances for the "l2" space
+        found_labels, squared = self._index.knn_query(queries, k=found)
+        labels[:, :found] = found_labels
+        distances[:, :found] = np.sqrt(np.maximum(squared, 0.0))
+        return labels, distances
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+
+FACE_INDEX_BACKENDS = {
+    "brute_force": BruteForceIndex,
+    "ivf": IVFIndex,
+    "hnsw": HNSWIndex,
+}
+
+
+def make_face_index(backend: str = "brute_force", **options) -> FaceIndex:
+    """Function to create a face index from its name, as used in config.json.
+
+    Parameters
+    -----------
+        - `backend` (str, optional): One of "brute_force", "ivf" or "hnsw". Defaults to "brute_force".
+        - `**options`: Keyword arguments of the backend class.
+
+    Returns
+    --------
+        `FaceIndex`: An empty index.
+    """
+    if backend not in FACE_INDEX_BACKENDS:
+        raise ValueError(f"Unknown face index backend: '{backend}'")
+    return FACE_INDEX_BACKENDS[backend](**options)
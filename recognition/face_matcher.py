@@ -0,0 +1,138 @@
+import typing
+import threading
+import numpy as np
+
+from recognition.face_index import FaceIndex, BruteForceIndex
+
+
+class FaceMatcher:
+    "Class to match face encodings against all the known face encodings in one batched computation"
+
+    def __init__(self,
+                 known_face_names: typing.List[str],
+                 known_face_encodings: typing.List[np.ndarray],
+                 tolerance: float = 0.6,
+                 index: typing.Optional[FaceIndex] = None):
+        """Instantiate the FaceMatcher object
+
+        Parameters
+        -----------
+           - `known_face_names` (List[str]): list of known face names.
+           - `known_face_encodings` (List[numpy.ndarray]): list of known 128-d face encodings.
+           - `tolerance` (float, optional): Largest distance that still counts as a match, same as `face_recognition.compare_faces`. Defaults to 0.6.
+           - `index` (FaceIndex, optional): Empty nearest neighbour index to search in, see `recognition.face_index.make_face_index`. Defaults to an exact `BruteForceIndex`.
+        """
+        if len(known_face_names) != len(known_face_encodings):
+            raise ValueError(
+                "known_face_names and known_face_encodings differ in length")
+        # the label of an encoding in the index is its position in known_face_names,
+        # removed employees leave a None behind so the other labels stay valid
+        self.known_face_names = list(known_face_names)
+        self.tolerance = tolerance
+        self.index = index if index is not None else BruteForceIndex()
+        self.index.build(np.arange(len(self.known_face_names)),
+                         known_face_encodings)
+        # queries and enrolment changes never interleave
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _labels_of(self, name: str) -> typing.List[int]:
+        return [
+            label for label, known_name in enumerate(self.known_face_names)
+            if known_name == name
+        ]
+
+    def add_employee(self, name: str, encoding: np.ndarray) -> None:
+        """Function to enrol one more face of an employee.
+
+        Parameters
+        -----------
+            - `name` (str): Name of the employee.
+            - `encoding` (numpy.ndarray): 128-d face encoding.
+        """
+        with self._lock:
+            self.index.add([len(self.known_face_names)], [encoding])
+            self.known_face_names.append(name)
+
+    def replace_employee(self, name: str, encoding: np.ndarray) -> None:
+        """Function to replace the face of an employee, or enrol it if the employee is not known yet.
+
+        Parameters
+        -----------
+            - `name` (str): Name of the employee.
+            - `encoding` (numpy.ndarray): New 128-d face encoding.
+        """
+        with self._lock:
+            labels = self._labels_of(name)
+            if not labels:
+                self.index.add([len(self.known_face_names)], [encoding])
+                self.known_face_names.append(name)
+                return
+            # keep a single face of the employee, updated in place
+            self.index.replace(labels[:1], [encoding])
+            if labels[1:]:
+                self.index.remove(labels[1:])
+                for label in labels[1:]:
+                    self.known_face_names[label] = None
+
+    def remove_employee(self, name: str) -> bool:
+        """Function to remove all the faces of an employee.
+
+        Parameters
+        -----------
+            - `name` (str): Name of the employee.
+
+        Returns
+        --------
+            `bool`: Whether the employee was known.
+        """
+        with self._lock:
+            labels = self._labels_of(name)
+            self.index.remove(labels)
+            for label in labels:
+                self.known_face_names[label] = None
+            return bool(labels)
+
+    def query(
+        self,
+        face_encodings: typing.Union[typing.List[np.ndarray], np.ndarray],
+        k: int = 1
+    ) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Function to find the `k` nearest known faces of every face encoding.
+
+        Parameters
+        -----------
+            - `face_encodings` (List[numpy.ndarray], numpy.ndarray): 128-d encodings of the faces in a frame.
+            - `k` (int, optional): Number of nearest known faces to return. Defaults to 1.
+
+        Returns
+        --------
+            `Tuple[numpy.ndarray, numpy.ndarray]`: Positions in `known_face_names` and euclidean distances of shape `(faces, k)`, nearest first. Missing neighbours are -1 with an infinite distance.
+        """
+        with self._lock:
+            return self.index.query(face_encodings, k)
+
+    def match(
+        self, face_encodings: typing.Union[typing.List[np.ndarray],
+                                           np.ndarray]
+    ) -> typing.Tuple[typing.List[str], typing.List[float]]:
+        """Function to get the name of every face encoding.
+
+        Parameters
+        -----------
+            - `face_encodings` (List[numpy.ndarray], numpy.ndarray): 128-d encodings of the faces in a frame.
+
+        Returns
+        --------
+            `Tuple[List[str], List[float]]`: Name of the nearest known face ("Unknown" when it is farther than the tolerance) and its distance.
+        """
+        with self._lock:
+            indices, distances = self.index.query(face_encodings, k=1)
+            names = [
+                self.known_face_names[index]
+                if index >= 0 and distance <= self.tolerance else "Unknown"
+                for index, distance in zip(indices[:, 0], distances[:, 0])
+            ]
+        return names, distances[:, 0].tolist()
@@ -0,0 +1,185 @@
+import time
+import typing
+import cv2
+import numpy as np
+from video_pipeline.face_tracker import FaceTracker
+from video_pipeline.motion_gate import MotionGate
+from recognition.face_matcher import FaceMatcher
+from recognition.face_detectors import FaceDetector, HOGDetector
+from recognition.face_encoder import FaceEncoder
+
+Box = typing.Tuple[int, int, int, int]  #(top, right, bottom, left) like face_recognition
+
+
+class FaceRecognizer:
+    "Class to find, encode and match the faces of camera frames, without any database"
+
+    def __init__(self,
+                 matcher: FaceMatcher,
+                 face_detector: FaceDetector = None,
+                 face_encoder: FaceEncoder = None,
+                 scale: float = 0.25,
+                 motion_gate: bool = False,
+                 face_tracking: bool = False,
+                 max_detection_interval: int = 15,
+                 fps: typing.Callable[[], typing.Optional[float]] = lambda:
+                 None,
+                 observe: typing.Callable[[str, float], None] = None):
+        """Instantiate the FaceRecognizer object
+
+        Parameters
+        -----------
+           - `matcher` (FaceMatcher): Known faces the encodings are matched with.
+           - `face_detector` (FaceDetector, optional): Detector finding the faces to recognize. Defaults to the HOG detector of face_recognition.
+           - `face_encoder` (FaceEncoder, optional): Encoder of the detected faces. Defaults to the 5 point landmarks with 1 jitter.
+           - `scale` (float, optional): Scale of the frame faces are detected in, smaller is faster but misses faces far from the camera. Defaults to 0.25.
+           - `motion_gate` (bool, optional): Whether frames that did not change since the last recognition reuse its result. Defaults to False.
+           - `face_tracking` (bool, optional): Whether `process` recognizes faces every few frames only and tracks them in between. Defaults to False.
+           - `max_detection_interval` (int, optional): Largest number of frames between two recognitions when tracking. Defaults to 15.
+           - `fps` (Callable[[], float], optional): Frame rate of the camera, used by the tracker to pick the detection interval. Defaults to unknown.
+           - `observe` (Callable[[str, float], None], optional): Called with the name and the seconds of every stage ("resize", "detect", "encode", "match", "draw", "jpeg"), e.g. by benchmarks. Defaults to None.
+        """
+        self.matcher = matcher
+        self.detector = face_detector if face_detector is not None else HOGDetector(
+        )
+        self.encoder = face_encoder if face_encoder is not None else FaceEncoder(
+        )
+        self.scale = scale
+        self.observe = observe
+        self.motion_gate = MotionGate() if motion_gate else None
+        self._last_faces = None  #(face_locations, face_names) of the last recognition
+        self.tracker = None
+        if face_tracking:
+            self.tracker = FaceTracker(self.recognize_faces,
+                                       fps,
+                                       scale=scale,
+                                       max_interval=max_detection_interval)
+
+    def _stage(self, name: str, start: float) -> float:
+        "Reports the stage that began at `start` and returns the start of the next one."
+        now = time.perf_counter()
+        if self.observe is not None:
+            self.observe(name, now - start)
+        return now
+
+    def recognize_faces(
+            self,
+            frame: np.ndarray) -> typing.Tuple[typing.List[Box], typing.List[str]]:
+        """Function to find and recognize all the faces in a frame.
+
+        Parameters
+        -----------
+            - `frame` (numpy.ndarray): BGR frame from the camera.
+
+        Returns
+        --------
+            `Tuple[List[Box], List[str]]`: Face locations in the frame scaled by `self.scale` and the names of the faces.
+        """
+        last_faces = self._last_faces
+        if self.motion_gate is not None and last_faces is not None and \
+                not self.motion_gate.changed(frame):
+            # nothing moved since the last recognition, e.g. an empty hallway
+            return last_faces
+
+        start = time.perf_counter()
+        # Resize frame of video for faster face recognition processing
+        small_frame = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale)
+        # Convert the image from BGR color (which OpenCV uses) to RGB color (which face_recognition uses)
+        rgb_small_frame = small_frame[:, :, ::-1]
+        start = self._stage("resize", start)
+
+        # Find all the faces and face encodings in the current frame of video
+        face_locations = self.detector.detect(rgb_small_frame)
+        start = self._stage("detect", start)
+        # all the faces are encoded in one batch, at most encoder.max_faces of them
+        face_locations, face_encodings = self.encoder.encode(
+            rgb_small_frame, face_locations)
+        start = self._stage("encode", start)
+        # Match all the faces with the known face with the smallest distance at once
+        face_names, face_distances = self.matcher.match(face_encodings)
+        self._stage("match", start)
+        self._last_faces = face_locations, face_names
+        return face_locations, face_names
+
+    def process(
+            self,
+            frame: np.ndarray) -> typing.Tuple[typing.List[Box], typing.List[str]]:
+        """Function to get the faces of the next frame of a stream, tracked in between recognitions when tracking is on.
+
+        Parameters
+        -----------
+            - `frame` (numpy.ndarray): BGR frame from the camera.
+
+        Returns
+        --------
+            `Tuple[List[Box], List[str]]`: Face locations in the frame scaled by `self.scale` and the names of the faces.
+        """
+        if self.tracker is not None:
+            return self.tracker.process(frame)
+        return self.recognize_faces(frame)
+
+    def draw_faces(self, frame: np.ndarray, face_locations: typing.List[Box],
+                   face_names: typing.List[str]) -> np.ndarray:
+        """Function to draw boxes and names of the recognized faces on a frame.
+
+        Parameters
+        -----------
+            - `frame` (numpy.ndarray): BGR frame to draw on, it is modified in place.
+            - `face_locations` (List[Box]): Face locations in the frame scaled by `self.scale`.
+            - `face_names` (List[str]): Names of the faces.
+
+        Returns
+        --------
+            `numpy.ndarray`: The annotated frame.
+        """
+        for (top, right, bottom, left), name in zip(face_locations,
+                                                    face_names):
+            # Scale back up face locations since the frame we detected in was scaled down
+            top = int(top / self.scale)
+            right = int(right / self.scale)
+            bottom = int(bottom / self.scale)
+            left = int(left / self.scale)
+
+            # Draw a box around the face
+            cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
+
+            # Draw a label with a name below the face
+            cv2.rectangle(
+                frame,
+                (left, bottom - 35),
+                (right, bottom),
+                (0, 0, 255),
+                cv2.FILLED,
+            )
+            font = cv2.FONT_HERSHEY_DUPLEX
+            cv2.putText(
+                frame,
+                name,
+                (left + 6, bottom - 6),
+                font,
+                1.0,
+                (255, 255, 255),
+                1,
+            )
+        return frame
+
+    def render(self, frame: np.ndarray, face_locations: typing.List[Box],
+               face_names: typing.List[str]) -> bytes:
+        """Function to annotate a copy of a frame and encode it as JPEG.
+
+        Parameters
+        -----------
+            - `frame` (numpy.ndarray): BGR frame from the camera, it is not modified.
+            - `face_locations` (List[Box]): Face locations in the frame scaled by `self.scale`.
+            - `face_names` (List[str]): Names of the faces.
+
+        Returns
+        --------
+            `bytes`: The JPEG image.
+        """
+        start = time.perf_counter()
+        frame = self.draw_faces(frame.copy(), face_locations, face_names)
+        start = self._stage("draw", start)
+        ret, buffer = cv2.imencode(".jpg", frame)
+        self._stage("jpeg", start)
+        return buffer.tobytes()
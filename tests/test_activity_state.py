@@ -0,0 +1,83 @@
+from datetime import datetime
+from monitoring.activity_state import (ActivityTracker, LocalActivityStore,
+                                       ACTIVE, AWAY, IDLE)
+
+EMAIL = "alice@attendance.com"
+START = datetime(2022, 3, 1, 10).timestamp()
+
+
+def test_active_away_idle_transitions():
+    tracker = ActivityTracker(idle_after=10.0)
+
+    assert tracker.observe(EMAIL, True, START) == ACTIVE
+    assert tracker.observe(EMAIL, False, START + 5) == AWAY
+    assert tracker.observe(EMAIL, False, START + 14) == AWAY
+    assert tracker.idle_seconds(EMAIL, START + 14) == 0.0
+    # idle from the moment the threshold was reached
+    assert tracker.observe(EMAIL, False, START + 20) == IDLE
+    assert tracker.idle_seconds(EMAIL, START + 25) == 10.0
+    assert tracker.observe(EMAIL, True, START + 30) == ACTIVE
+    assert tracker.idle_seconds(EMAIL, START + 100) == 15.0
+
+
+def test_ticks_only_write_transitions():
+    store = LocalActivityStore()
+    writes = []
+    compare_and_set = store.compare_and_set
+    store.compare_and_set = lambda email, expected, record: writes.append(
+        record["state"]) or compare_and_set(email, expected, record)
+    tracker = ActivityTracker(store, idle_after=10.0)
+
+    for tick in range(5):
+        tracker.observe(EMAIL, True, START + tick)
+
+    assert writes == [AWAY, ACTIVE]
+
+
+def test_fresh_record_starts_from_the_saved_idle_time():
+    tracker = ActivityTracker(load_idle=lambda email: 60.0)
+
+    assert tracker.idle_seconds(EMAIL, START) == 60.0
+    assert tracker.observe(EMAIL, False, START + 1) == AWAY
+
+
+def test_compare_and_set_with_another_process():
+    store = LocalActivityStore()
+    first = ActivityTracker(store, idle_after=10.0)
+    second = ActivityTracker(store, idle_after=10.0)
+    first.observe(EMAIL, False, START)
+    second.observe(EMAIL, False, START)  #both processes hold the away record
+
+    assert first.observe(EMAIL, False, START + 10) == IDLE
+    assert first.observe(EMAIL, True, START + 20) == ACTIVE
+
+    # the stale away record of the second process is not written over the
+    # first one, it is read again and the 10 idle seconds are kept
+    assert second.observe(EMAIL, True, START + 21) == ACTIVE
+    assert store.load(EMAIL)["changed_at"] == START + 20
+    assert second.idle_seconds(EMAIL, START + 30) == 10.0
+
+
+def test_records_start_again_every_day():
+    tracker = ActivityTracker(idle_after=10.0)
+    tracker.observe(EMAIL, False, START)
+    tracker.observe(EMAIL, False, START + 20)
+
+    tomorrow = datetime(2022, 3, 2, 10).timestamp()
+
+    assert tracker.idle_seconds(EMAIL, tomorrow) == 0.0
+    assert tracker.observe(EMAIL, False, tomorrow) == AWAY
+    assert list(tracker._records) == [EMAIL]
+    assert tracker._records[EMAIL]["date"] == "2022-03-02"
+
+
+def test_forget_reads_the_record_again():
+    store = LocalActivityStore()
+    tracker = ActivityTracker(store)
+    tracker.observe(EMAIL, True, START)
+    record = store.load(EMAIL)
+    store.compare_and_set(EMAIL, record, {**record, "idle_seconds": 42.0})
+
+    assert tracker.idle_seconds(EMAIL, START + 1) == 0.0
+    tracker.forget(EMAIL)
+    assert tracker.idle_seconds(EMAIL, START + 1) == 42.0
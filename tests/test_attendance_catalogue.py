@@ -0,0 +1,89 @@
+from datetime import date
+import pytest
+from database_api_functions import attendance_store
+from database_api_functions.attendance_store import AttendanceCatalogue
+
+
+class Clock:
+    "Stand-in of time.monotonic."
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(attendance_store.time, "monotonic", clock)
+    return clock
+
+
+class Scan:
+    "Stand-in of the database scan, counting its calls."
+
+    def __init__(self, *days):
+        self.days = list(days)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return list(self.days)
+
+
+def test_days_are_scanned_once_per_ttl(clock):
+    scan = Scan(date(2022, 3, 1), date(2022, 3, 2))
+    catalogue = AttendanceCatalogue(scan, ttl=60.0)
+
+    assert catalogue.dates() == [date(2022, 3, 2), date(2022, 3, 1)]
+    scan.days.append(date(2022, 3, 3))
+    clock.now += 59.0
+    assert catalogue.dates() == [date(2022, 3, 2), date(2022, 3, 1)]
+    assert scan.calls == 1
+
+    clock.now += 1.0
+    assert catalogue.dates()[0] == date(2022, 3, 3)
+    assert scan.calls == 2
+
+
+def test_months_group_the_days_latest_first(clock):
+    catalogue = AttendanceCatalogue(
+        Scan(date(2022, 2, 28), date(2022, 3, 2), date(2022, 2, 1),
+             date(2021, 12, 31), date(2022, 3, 2)))
+
+    assert catalogue.months() == [
+        (2022, 3, [date(2022, 3, 2)]),
+        (2022, 2, [date(2022, 2, 28), date(2022, 2, 1)]),
+        (2021, 12, [date(2021, 12, 31)]),
+    ]
+
+
+def test_add_and_invalidate(clock):
+    scan = Scan(date(2022, 3, 1))
+    catalogue = AttendanceCatalogue(scan)
+
+    # nothing to add to before the first scan
+    catalogue.add(date(2022, 2, 1))
+    assert catalogue.dates() == [date(2022, 3, 1)]
+
+    catalogue.add(date(2022, 4, 1))
+    catalogue.add(date(2022, 4, 1))
+    assert catalogue.dates() == [date(2022, 4, 1), date(2022, 3, 1)]
+    assert catalogue.months()[0] == (2022, 4, [date(2022, 4, 1)])
+    assert scan.calls == 1
+
+    catalogue.invalidate()
+    assert catalogue.dates() == [date(2022, 3, 1)]
+    assert scan.calls == 2
+
+
+def test_returned_lists_are_copies(clock):
+    catalogue = AttendanceCatalogue(Scan(date(2022, 3, 1)))
+
+    catalogue.dates().clear()
+    catalogue.months()[0][2].clear()
+
+    assert catalogue.dates() == [date(2022, 3, 1)]
+    assert catalogue.months() == [(2022, 3, [date(2022, 3, 1)])]
@@ -0,0 +1,92 @@
+from datetime import date, datetime
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+from database_api_functions.attendance_store import (
+    AttendanceCollectionStore, DailyCollectionsStore)
+
+STORES = [DailyCollectionsStore, AttendanceCollectionStore]
+
+
+@pytest.fixture(params=STORES)
+def store(request):
+    store = request.param(mongomock.MongoClient()["Attendance"])
+    store.prepare(date(2022, 3, 1))
+    return store
+
+
+def test_check_in_is_idempotent(store):
+    record, created = store.check_in("Alice", "alice@attendance.com",
+                                     datetime(2022, 3, 1, 9, 5))
+    assert created
+    assert (record["Time"], record["Date"]) == ("09:05:00", "01/03/2022")
+
+    record, created = store.check_in("Alice", "alice@attendance.com",
+                                     datetime(2022, 3, 1, 9, 30))
+    assert not created
+    assert record["Time"] == "09:05:00"
+    assert len(store.records_of_day(date(2022, 3, 1))) == 1
+    assert store.dates() == [date(2022, 3, 1)]
+
+
+def test_check_out_is_idempotent(store):
+    store.check_in("Alice", "alice@attendance.com", datetime(2022, 3, 1, 9))
+
+    before = store.check_out("alice@attendance.com",
+                             datetime(2022, 3, 1, 17, 30))
+    assert before["Check Out"] is None
+
+    before = store.check_out("alice@attendance.com",
+                             datetime(2022, 3, 1, 18))
+    assert before["Check Out"] == 1
+    assert before["Check Out Time"] == "17:30:00"
+
+    record = store.find(date(2022, 3, 1), "alice@attendance.com")
+    assert record["Check Out Time"] == "17:30:00"
+    assert record["Check Out Date"] == "01/03/2022"
+
+
+def test_check_out_without_check_in(store):
+    assert store.check_out("alice@attendance.com",
+                           datetime(2022, 3, 2, 17)) is None
+    assert store.find(date(2022, 3, 2), "alice@attendance.com") is None
+    if isinstance(store, DailyCollectionsStore):
+        assert store.database.list_collection_names() == []
+
+
+def test_check_out_after_midnight_closes_a_recent_check_in(store):
+    store.check_in("Alice", "alice@attendance.com",
+                   datetime(2022, 3, 1, 22))
+
+    before = store.check_out("alice@attendance.com",
+                             datetime(2022, 3, 2, 6))
+
+    assert before["Date"] == "01/03/2022"
+    record = store.find(date(2022, 3, 1), "alice@attendance.com")
+    assert record["Check Out Time"] == "06:00:00"
+    assert record["Check Out Date"] == "02/03/2022"
+
+
+def test_check_out_after_midnight_leaves_a_stale_check_in_open(store):
+    store.check_in("Alice", "alice@attendance.com", datetime(2022, 3, 1, 8))
+
+    assert store.check_out("alice@attendance.com",
+                           datetime(2022, 3, 2, 6)) is None
+    assert store.find(date(2022, 3, 1),
+                      "alice@attendance.com")["Check Out"] is None
+
+
+def test_document_keeps_the_date_of_an_overnight_check_out():
+    record = {
+        "Name": "Alice",
+        "Email": "alice@attendance.com",
+        "Time": "22:00:00",
+        "Check Out Time": "06:00:00",
+        "Check Out Date": "02/03/2022"
+    }
+
+    document = AttendanceCollectionStore.to_document(record, date(2022, 3, 1))
+
+    assert document["Check_Out"] == datetime(2022, 3, 2, 6)
+    assert AttendanceCollectionStore.to_record(
+        document)["Check Out Date"] == "02/03/2022"
@@ -0,0 +1,127 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")
+from data_ingestion.data_import_and_preprocessing import (Preprocessing,
+                                                          ENCODING_OK,
+                                                          NO_FACE)
+from data_ingestion.encoding_store import EncodingStore
+
+
+@pytest.fixture
+def encoded(monkeypatch):
+    "Paths given to the encoder, every image is encoded from its first byte and has no face if it is 0."
+    paths = []
+
+    def faceEncodingsBatch(self, image_paths, workers=None, chunk_size=4):
+        for path in image_paths:
+            paths.append(os.path.basename(path))
+            with open(path, "rb") as f:
+                value = f.read(1)[0]
+            if value:
+                yield path, ENCODING_OK, np.full(128, value, np.float32)
+            else:
+                yield path, NO_FACE, None
+
+    monkeypatch.setattr(Preprocessing, "faceEncodingsBatch",
+                        faceEncodingsBatch)
+    return paths
+
+
+def write(path, value: int, mtime: float = None) -> None:
+    with open(path, "wb") as f:
+        f.write(bytes([value]) * 16)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_only_new_images_are_encoded(tmp_path, encoded):
+    images = tmp_path / "images"
+    images.mkdir()
+    write(images / "alice_1.jpg", 1)
+    write(images / "bob.png", 2)
+    (images / "notes.txt").write_text("not an image")
+    store = EncodingStore(tmp_path / "store")
+
+    names, encodings = store.sync(images)
+    assert names == ["alice", "bob"]
+    assert encodings[:, 0].tolist() == [1.0, 2.0]
+    assert encoded == ["alice_1.jpg", "bob.png"]
+
+    write(images / "carol.jpg", 3)
+    names, _ = store.sync(images)
+    assert names == ["alice", "bob", "carol"]
+    assert encoded[2:] == ["carol.jpg"]
+
+
+def test_unchanged_images_are_not_read(tmp_path, encoded, monkeypatch):
+    images = tmp_path / "images"
+    images.mkdir()
+    write(images / "alice.jpg", 1)
+    EncodingStore(tmp_path / "store").sync(images)
+    hashed = []
+    monkeypatch.setattr(EncodingStore, "file_hash",
+                        staticmethod(lambda path: hashed.append(path)))
+
+    # a new store reads the encodings of the last sync from disk
+    store = EncodingStore(tmp_path / "store")
+    names, _ = store.sync(images)
+
+    assert names == ["alice"]
+    assert hashed == []
+    assert encoded == ["alice.jpg"]
+
+
+def test_changed_size_or_mtime_is_hashed_again(tmp_path, encoded):
+    images = tmp_path / "images"
+    images.mkdir()
+    write(images / "alice.jpg", 1, mtime=1000.0)
+    store = EncodingStore(tmp_path / "store")
+    store.sync(images)
+
+    # same content, new mtime: the hash is known, nothing is encoded
+    write(images / "alice.jpg", 1, mtime=2000.0)
+    store.sync(images)
+    assert encoded == ["alice.jpg"]
+    assert store.entries[0]["mtime"] == 2000.0
+
+    # same size, new content and mtime: encoded again
+    write(images / "alice.jpg", 5, mtime=3000.0)
+    _, encodings = store.sync(images)
+    assert encoded == ["alice.jpg", "alice.jpg"]
+    assert encodings[0, 0] == 5.0
+
+
+def test_renamed_and_removed_images(tmp_path, encoded):
+    images = tmp_path / "images"
+    images.mkdir()
+    write(images / "alice.jpg", 1)
+    write(images / "bob.jpg", 2)
+    store = EncodingStore(tmp_path / "store")
+    store.sync(images)
+
+    os.rename(images / "alice.jpg", images / "alice_2.jpg")
+    os.remove(images / "bob.jpg")
+    names, encodings = store.sync(images)
+
+    assert names == ["alice"]
+    assert encodings[:, 0].tolist() == [1.0]
+    assert encoded == ["alice.jpg", "bob.jpg"]
+    assert store.encoding_of("bob.jpg") is None
+
+
+def test_images_without_a_face_are_left_out_and_not_encoded_again(
+        tmp_path, encoded):
+    images = tmp_path / "images"
+    images.mkdir()
+    write(images / "alice.jpg", 1)
+    write(images / "empty.jpg", 0)
+    store = EncodingStore(tmp_path / "store")
+
+    assert store.sync(images)[0] == ["alice"]
+    assert store.sync(images)[0] == ["alice"]
+    assert encoded == ["alice.jpg", "empty.jpg"]
+    assert store.entries[1]["status"] == NO_FACE
+    assert store.encoding_of("empty.jpg") is None
+    assert store.known_faces()[0] == ["alice"]
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")
+from recognition.face_detectors import SSDDetector
+
+
+class RecordingNet:
+    "Stand-in of the SSD network keeping the blob it was given."
+
+    def setInput(self, blob):
+        self.blob = blob
+
+    def forward(self):
+        return np.zeros((1, 1, 0, 7), np.float32)
+
+
+def test_ssd_blob_is_bgr_minus_the_model_means():
+    detector = SSDDetector.__new__(SSDDetector)
+    detector.net = RecordingNet()
+    detector.confidence = 0.5
+    detector.input_size = 300
+    rgb_image = np.empty((120, 160, 3), np.uint8)
+    rgb_image[:] = (200, 100, 50)  #R, G, B
+
+    assert detector.detect(rgb_image) == []
+
+    blob = detector.net.blob
+    assert blob.shape == (1, 3, 300, 300)
+    # channels in B, G, R order, minus the B, G, R means of the model
+    np.testing.assert_allclose(blob[0, :, 150, 150],
+                               [50 - 104.0, 100 - 177.0, 200 - 123.0])
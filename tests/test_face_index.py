@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from recognition.face_index import make_face_index
+
+BACKENDS = ["brute_force", "ivf", "hnsw"]
+
+
+def encodings(count: int, seed: int = 15) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, 128))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(
+        np.float32)
+
+
+def make_index(backend: str):
+    if backend == "hnsw":
+        pytest.importorskip("hnswlib")
+    # the lists of a small IVF index are all probed, so every backend is exact here
+    return make_face_index(backend)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_query_finds_the_nearest_labels(backend):
+    known = encodings(50)
+    index = make_index(backend)
+    index.build(np.arange(100, 150), known)
+
+    labels, distances = index.query(known[[7, 42]] + 0.001, k=1)
+
+    assert labels[:, 0].tolist() == [107, 142]
+    assert distances.shape == (2, 1)
+    assert (distances < 0.05).all()
+    assert len(index) == 50
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_query_pads_missing_neighbours(backend):
+    index = make_index(backend)
+    index.build([1, 2], encodings(2))
+
+    labels, distances = index.query(encodings(1, seed=16), k=3)
+
+    assert labels[0, 2] == -1
+    assert np.isinf(distances[0, 2])
+    assert set(labels[0, :2].tolist()) == {1, 2}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_remove_and_add(backend):
+    known = encodings(20)
+    index = make_index(backend)
+    index.build(np.arange(20), known)
+
+    index.remove([3])
+    index.add([20], known[3:4])
+
+    assert len(index) == 20
+    assert index.query(known[3:4])[0][0, 0] == 20
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_replace_moves_a_label_to_a_new_encoding(backend):
+    known = encodings(21)
+    index = make_index(backend)
+    index.build(np.arange(20), known[:20])
+
+    index.replace([5], known[20:])
+
+    assert len(index) == 20
+    assert index.query(known[20:])[0][0, 0] == 5
+    assert index.query(known[5:6])[0][0, 0] != 5
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_empty_index(backend):
+    index = make_index(backend)
+    index.build([], [])
+
+    labels, distances = index.query(encodings(2), k=1)
+
+    assert labels.tolist() == [[-1], [-1]]
+    assert np.isinf(distances).all()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        make_face_index("annoy")
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from recognition.face_index import make_face_index
+from recognition.face_matcher import FaceMatcher
+
+
+def encodings(count: int, seed: int = 15) -> np.ndarray:
+    "Random unit length 128-d encodings, far apart from each other."
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, 128))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_match_names_every_face_of_a_frame():
+    known = encodings(3)
+    matcher = FaceMatcher(["alice", "bob", "carol"], list(known))
+
+    names, distances = matcher.match([known[2] + 0.01, known[0]])
+
+    assert names == ["carol", "alice"]
+    assert distances[1] == pytest.approx(0.0, abs=1e-3)
+
+
+def test_match_is_unknown_beyond_the_tolerance():
+    known = encodings(2)
+    matcher = FaceMatcher(["alice", "bob"], list(known), tolerance=0.6)
+
+    names, distances = matcher.match([-known[0]])
+
+    assert names == ["Unknown"]
+    assert distances[0] > 0.6
+
+
+def test_match_without_known_faces():
+    matcher = FaceMatcher([], [])
+
+    assert matcher.match(encodings(1)) == (["Unknown"], [np.inf])
+    assert len(matcher) == 0
+
+
+def test_names_and_encodings_must_have_the_same_length():
+    with pytest.raises(ValueError):
+        FaceMatcher(["alice"], [])
+
+
+@pytest.mark.parametrize("backend", ["brute_force", "ivf", "hnsw"])
+def test_replace_and_remove_employee(backend):
+    if backend == "hnsw":
+        pytest.importorskip("hnswlib")
+    known = encodings(5)
+    matcher = FaceMatcher(["alice", "bob", "alice", "carol"],
+                          list(known[:4]),
+                          index=make_face_index(backend))
+
+    matcher.replace_employee("alice", known[4])
+
+    # a single face of alice is kept, the new one
+    assert len(matcher) == 3
+    assert matcher.match([known[4], known[0]])[0] == ["alice", "Unknown"]
+
+    assert matcher.remove_employee("bob")
+    assert not matcher.remove_employee("bob")
+    assert matcher.match([known[1], known[3]])[0] == ["Unknown", "carol"]
+
+
+def test_replace_enrols_a_new_employee():
+    known = encodings(2)
+    matcher = FaceMatcher(["alice"], list(known[:1]))
+
+    matcher.replace_employee("bob", known[1])
+
+    assert matcher.match([known[1]])[0] == ["bob"]
+    assert len(matcher) == 2
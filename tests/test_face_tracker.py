@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from video_pipeline.face_tracker import FaceTracker
+
+BOX = (100, 180, 180, 100)  #(top, right, bottom, left)
+
+
+class Recognizer:
+    "Stand-in of the full recognition, counting its calls."
+
+    def __init__(self, boxes=(), names=()):
+        self.boxes, self.names = list(boxes), list(names)
+        self.calls = 0
+
+    def __call__(self, frame):
+        self.calls += 1
+        return list(self.boxes), list(self.names)
+
+
+def textured(seed: int = 15) -> np.ndarray:
+    "Gray frame with a textured square where the face is."
+    frame = np.full((320, 320, 3), 128, np.uint8)
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, (10, 10), dtype=np.uint8)
+    frame[100:180, 100:180] = np.repeat(np.repeat(blocks, 8, 0), 8,
+                                        1)[:, :, None]
+    return frame
+
+
+@pytest.mark.parametrize("detect, track, fps, interval", [
+    (0.04, 0.005, 25.0, 1),  #detection fits in the frame budget
+    (0.1, 0.01, 20.0, 3),  #(0.1 + 2 * 0.01) / 3 <= 0.05
+    (0.1, 0.06, 20.0, 15),  #tracking alone is over budget
+    (10.0, 0.001, 30.0, 15),  #capped
+])
+def test_interval_fits_the_frame_budget(detect, track, fps, interval):
+    tracker = FaceTracker(Recognizer(), lambda: fps)
+    tracker._detect_time, tracker._track_time = detect, track
+
+    tracker._adapt_interval()
+
+    assert tracker.interval == interval
+
+
+def test_interval_is_kept_without_a_frame_rate():
+    tracker = FaceTracker(Recognizer(), lambda: None)
+    tracker._detect_time, tracker.interval = 1.0, 4
+
+    tracker._adapt_interval()
+
+    assert tracker.interval == 4
+
+
+def test_faces_are_detected_every_interval_and_tracked_in_between():
+    recognizer = Recognizer([BOX], ["alice"])
+    tracker = FaceTracker(recognizer, lambda: None, scale=1.0)
+    tracker.interval = 3
+    frame = textured()
+
+    results = [tracker.process(frame) for _ in range(7)]
+
+    assert recognizer.calls == 3  #frames 0, 3 and 6
+    assert all(result == ([BOX], ["alice"]) for result in results)
+
+
+def test_tracked_box_follows_the_face():
+    recognizer = Recognizer([BOX], ["alice"])
+    tracker = FaceTracker(recognizer,
+                          lambda: None,
+                          scale=1.0,
+                          motion_threshold=255.0)
+    tracker.interval = 5
+    frame = textured()
+
+    tracker.process(frame)
+    boxes, names = tracker.process(np.roll(frame, (4, -6), axis=(0, 1)))
+
+    assert recognizer.calls == 1
+    assert boxes == [(104, 174, 184, 94)]
+    assert names == ["alice"]
+
+
+def test_lost_face_or_motion_is_detected_again():
+    # no corners to track in a flat box
+    recognizer = Recognizer([(10, 60, 60, 10)], ["alice"])
+    tracker = FaceTracker(recognizer, lambda: None, scale=1.0)
+    tracker.interval = 5
+    frame = textured()
+    tracker.process(frame)
+    tracker.process(frame)
+    assert recognizer.calls == 2
+
+    # someone walking in outside the tracked faces
+    recognizer.boxes = [BOX]
+    tracker.process(frame)
+    walking_in = frame.copy()
+    walking_in[200:320, :] = 255
+    tracker.process(walking_in)
+    assert recognizer.calls == 4
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from video_pipeline import motion_gate
+from video_pipeline.motion_gate import MotionGate
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(motion_gate.time, "monotonic", lambda: now[0])
+    return now
+
+
+def scene(seed: int = 15) -> np.ndarray:
+    "Frame of large flat blocks, so a thumbnail pixel is one block."
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)
+    return np.repeat(np.repeat(blocks, 20, axis=0), 20, axis=1)
+
+
+def test_unchanged_and_noisy_frames_are_skipped(clock):
+    gate = MotionGate()
+    frame = scene()
+    noise = np.random.default_rng(16).integers(-8, 9, frame.shape)
+
+    assert gate.changed(frame)
+    assert not gate.changed(frame)
+    assert not gate.changed(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    assert (gate.frames_checked, gate.frames_skipped) == (3, 2)
+
+
+def test_a_change_becomes_the_new_reference(clock):
+    gate = MotionGate()
+    frame = scene()
+    moved = frame.copy()
+    moved[:120, :160] = 255 - moved[:120, :160]  #someone walks in a corner
+
+    gate.changed(frame)
+    assert gate.changed(moved)
+    assert not gate.changed(moved)
+    assert gate.changed(frame)
+
+
+def test_changes_below_the_area_threshold_are_skipped(clock):
+    gate = MotionGate(area_threshold=0.01)
+    frame = scene()
+    moved = frame.copy()
+    moved[:20, :140] = 255 - moved[:20, :140]  #7 of the 768 thumbnail pixels
+
+    gate.changed(frame)
+    assert not gate.changed(moved)
+
+
+def test_refresh_interval_and_reset(clock):
+    gate = MotionGate(refresh_interval=5.0)
+    frame = scene()
+    gate.changed(frame)
+
+    clock[0] += 4.9
+    assert not gate.changed(frame)
+    clock[0] += 0.1
+    assert gate.changed(frame)
+
+    gate.reset()
+    assert gate.changed(frame)
+
@@ -0,0 +1,54 @@
+import pytest
+from video_pipeline.pipeline_metrics import (PipelineMetrics, STAGES, BUCKETS,
+                                             render_metrics)
+
+
+def test_observe_fills_the_cumulative_buckets():
+    metrics = PipelineMetrics()
+
+    metrics.observe("detect", 0.003)
+    metrics.observe("detect", 0.04)
+    metrics.observe("detect", 10.0)
+
+    cumulative, total = metrics.histogram("detect")
+    assert len(cumulative) == len(BUCKETS) + 1
+    assert cumulative[BUCKETS.index(0.0025)] == 0
+    assert cumulative[BUCKETS.index(0.005)] == 1
+    assert cumulative[BUCKETS.index(0.05)] == 2
+    assert cumulative[-1] == 3
+    assert total == pytest.approx(10.043)
+    assert metrics.histogram("resize") == ([0.0] * (len(BUCKETS) + 1), 0.0)
+
+
+def test_frame_counters():
+    metrics = PipelineMetrics()
+
+    metrics.count_frames()
+    metrics.count_frames(2, dropped=3)
+
+    assert (metrics.frames_processed, metrics.frames_dropped) == (3, 3)
+
+
+def test_render_metrics_in_the_prometheus_text_format():
+    front, back = PipelineMetrics(), PipelineMetrics()
+    front.observe("jpeg", 0.002)
+    front.count_frames(5, dropped=1)
+
+    lines = render_metrics([({"camera": "front"}, front),
+                            ({"camera": "back"}, back)]).splitlines()
+
+    assert lines[:2] == [
+        "# HELP recognition_stage_seconds Duration of the stages of the recognition pipeline.",
+        "# TYPE recognition_stage_seconds histogram",
+    ]
+    assert 'recognition_stage_seconds_bucket{camera="front",stage="jpeg",le="0.001"} 0' in lines
+    assert 'recognition_stage_seconds_bucket{camera="front",stage="jpeg",le="0.0025"} 1' in lines
+    assert 'recognition_stage_seconds_bucket{camera="front",stage="jpeg",le="+Inf"} 1' in lines
+    assert 'recognition_stage_seconds_sum{camera="front",stage="jpeg"} 0.002' in lines
+    assert 'recognition_stage_seconds_count{camera="back",stage="jpeg"} 0' in lines
+    assert "# TYPE recognition_frames_processed_total counter" in lines
+    assert 'recognition_frames_processed_total{camera="front"} 5' in lines
+    assert 'recognition_frames_dropped_total{camera="front"} 1' in lines
+    assert 'recognition_frames_dropped_total{camera="back"} 0' in lines
+    # buckets, sum and count of every stage and camera, then 2 counters
+    assert len(lines) == 2 + 2 * len(STAGES) * (len(BUCKETS) + 3) + 2 * 4
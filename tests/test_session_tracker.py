@@ -0,0 +1,139 @@
+from datetime import datetime
+import pytest
+from monitoring import session_tracker
+from monitoring.session_tracker import SessionTracker, format_seconds
+
+EMAIL = "alice@attendance.com"
+CHECK_IN = datetime(2022, 3, 1, 9)
+
+
+class Clock:
+    "Stand-in of datetime.now and time.monotonic."
+
+    def __init__(self):
+        self.now = datetime(2022, 3, 1, 10)
+        self.monotonic = 1000.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+
+    class FakeDatetime(datetime):
+
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now
+
+    monkeypatch.setattr(session_tracker, "datetime", FakeDatetime)
+    monkeypatch.setattr(session_tracker.time, "monotonic",
+                        lambda: clock.monotonic)
+    return clock
+
+
+class Database:
+    "Stand-in of `DatabaseAPI.attendance_session` and `DatabaseAPI.save_session_times`."
+
+    def __init__(self, sessions: dict):
+        self.sessions = sessions
+        self.loads = []
+        self.saves = []
+
+    def load(self, email):
+        self.loads.append(email)
+        return self.sessions.get(email)
+
+    def save(self, email, check_in, total_seconds, idle_seconds):
+        self.saves.append((email, check_in, total_seconds, idle_seconds))
+
+
+def test_session_is_loaded_once(clock):
+    database = Database({EMAIL: (CHECK_IN, None, 5.0)})
+    tracker = SessionTracker(database.load, database.save)
+
+    assert tracker.total_seconds(EMAIL) == 3600.0
+    clock.now = datetime(2022, 3, 1, 10, 30)
+    assert tracker.total_seconds(EMAIL) == 5400.0
+    assert tracker.idle_seconds(EMAIL) == 5.0
+    assert database.loads == [EMAIL]
+    assert format_seconds(tracker.total_seconds(EMAIL)) == "01:30:00"
+
+
+def test_flush_only_saves_the_sessions_that_changed(clock):
+    database = Database({
+        EMAIL: (CHECK_IN, datetime(2022, 3, 1, 17), 0.0),
+        "bob@attendance.com": (CHECK_IN, None, 0.0)
+    })
+    tracker = SessionTracker(database.load, database.save)
+    tracker.session(EMAIL)
+    tracker.session("bob@attendance.com")
+
+    tracker.flush()
+    assert len(database.saves) == 2
+
+    # checked out, nothing changes for alice
+    clock.now = datetime(2022, 3, 1, 11)
+    tracker.flush()
+    assert database.saves[2:] == [("bob@attendance.com", CHECK_IN, 7200, 0)]
+
+    tracker.set_idle_seconds(EMAIL, 30.0)
+    tracker.flush()
+    assert database.saves[3:] == [(EMAIL, CHECK_IN, 8 * 3600, 30)]
+
+
+def test_not_checked_in_is_cached_for_the_ttl(clock):
+    database = Database({})
+    tracker = SessionTracker(database.load,
+                             database.save,
+                             not_checked_in_ttl=30.0)
+
+    assert tracker.session(EMAIL) is None
+    clock.monotonic += 29.0
+    assert tracker.total_seconds(EMAIL) == 0.0
+    assert len(database.loads) == 1
+
+    # checked in by another process
+    database.sessions[EMAIL] = (CHECK_IN, None, 0.0)
+    clock.monotonic += 1.0
+    assert tracker.total_seconds(EMAIL) == 3600.0
+    assert len(database.loads) == 2
+
+
+def test_refresh_saves_and_loads_again(clock):
+    database = Database({EMAIL: (CHECK_IN, None, 0.0)})
+    tracker = SessionTracker(database.load, database.save)
+    tracker.session(EMAIL)
+
+    database.sessions[EMAIL] = (CHECK_IN, datetime(2022, 3, 1, 10), 0.0)
+    tracker.refresh(EMAIL)
+
+    assert database.saves == [(EMAIL, CHECK_IN, 3600, 0)]
+    assert tracker.session(EMAIL).check_out == datetime(2022, 3, 1, 10)
+    assert len(database.loads) == 2
+
+
+def test_day_rollover_saves_the_old_session(clock):
+    database = Database({EMAIL: (CHECK_IN, None, 0.0)})
+    tracker = SessionTracker(database.load, database.save)
+    tracker.flush()  #nothing loaded yet
+    tracker.session(EMAIL)
+    tracker.flush()
+
+    clock.now = datetime(2022, 3, 2, 0, 0, 10)
+    del database.sessions[EMAIL]
+    assert tracker.session(EMAIL) is None
+
+    # the seconds until the first read of the next day are kept
+    assert database.saves == [(EMAIL, CHECK_IN, 3600, 0),
+                              (EMAIL, CHECK_IN, 15 * 3600 + 10, 0)]
+
+
+def test_stop_saves_a_last_time(clock):
+    database = Database({EMAIL: (CHECK_IN, None, 0.0)})
+    tracker = SessionTracker(database.load, database.save,
+                             save_interval=60.0).start()
+    tracker.session(EMAIL)
+
+    tracker.stop()
+
+    assert database.saves == [(EMAIL, CHECK_IN, 3600, 0)]
@@ -0,0 +1,84 @@
+import multiprocessing
+import threading
+import numpy as np
+import pytest
+from video_pipeline.shared_frame import SharedFrame
+
+
+@pytest.fixture
+def shared():
+    shared = SharedFrame(64, 48)
+    yield shared
+    shared.close()
+
+
+def frame(value: int, rows: int = 48, columns: int = 64) -> np.ndarray:
+    return np.full((rows, columns, 3), value, np.uint8)
+
+
+def test_nothing_before_the_first_frame(shared):
+    assert shared.latest() == (0, None)
+    assert shared.wait_for_frame(0, timeout=0.01) == (0, None)
+    assert shared.wait_for_jpeg(0, timeout=0.01) == (0, None)
+
+
+def test_readers_get_the_latest_frame_once(shared):
+    assert shared.write(frame(1)) == 1
+    assert shared.write(frame(2)) == 2
+
+    # a slow reader skips to the newest frame
+    seq, latest = shared.wait_for_frame(0)
+    assert seq == 2
+    assert (latest == 2).all()
+    assert shared.wait_for_frame(seq, timeout=0.01) == (2, None)
+
+    latest[:] = 0  #a copy
+    assert (shared.latest()[1] == 2).all()
+
+
+def test_wait_for_frame_wakes_up_on_write(shared):
+    shared.write(frame(1))
+    writer = threading.Timer(0.05, shared.write, (frame(3), ))
+    writer.start()
+
+    seq, latest = shared.wait_for_frame(1, timeout=5.0)
+
+    writer.join()
+    assert seq == 2
+    assert (latest == 3).all()
+
+
+def test_jpeg_has_the_sequence_number_of_its_frame(shared):
+    shared.write(frame(1), b"first")
+    shared.write(frame(2))
+
+    assert shared.wait_for_jpeg(0) == (1, b"first")
+    assert shared.wait_for_jpeg(1, timeout=0.01) == (1, None)
+    shared.write(frame(3), b"third")
+    assert shared.wait_for_jpeg(1) == (3, b"third")
+
+
+def test_large_frames_are_shrunk(shared):
+    shared.write(frame(7, rows=96, columns=256))
+
+    _, latest = shared.latest()
+
+    assert latest.shape == (24, 64, 3)
+    assert (latest == 7).all()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                    reason="needs the fork start method")
+def test_frames_of_another_process():
+    context = multiprocessing.get_context("fork")
+    shared = SharedFrame(64, 48, context)
+    try:
+        writer = context.Process(target=shared.write,
+                                 args=(frame(5), b"jpeg"))
+        writer.start()
+        seq, jpeg = shared.wait_for_jpeg(0, timeout=10.0)
+        writer.join()
+        assert (seq, jpeg) == (1, b"jpeg")
+        assert (shared.latest()[1] == 5).all()
+    finally:
+        shared.close()
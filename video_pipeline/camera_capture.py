@@ -0,0 +1,135 @@
+import time
+import typing
+import threading
+import cv2
+import numpy as np
+
+
+class CameraCapture:
+    """Class that owns the camera device and shares the latest frame with every consumer
+
+    Every frame is decoded into a new array, so the consumers of the process
+    get read-only views of it without a copy, and a frame never changes
+    however long it is held. The capture loop of a `CameraWorker` reads its
+    frames this way; the other processes get copies through `SharedFrame`.
+    """
+
+    def __init__(self, camera: cv2.VideoCapture):
+        """Instantiate the CameraCapture object
+
+        Parameters
+        -----------
+           - `camera` (cv2.VideoCapture): cv2 camera object, only read by the capture thread.
+        """
+        self.camera = camera
+        self._frame = None  #latest frame
+        self._seq = 0  #sequence number of the latest published frame
+        self._frame_interval = None  #moving average of the seconds between frames
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def start(self) -> "CameraCapture":
+        "Function to start the background capture thread."
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._capture_loop,
+                                        name="camera-capture",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        "Function to stop the background capture thread."
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def release(self) -> None:
+        "Function to stop capturing and release the camera device."
+        self.stop()
+        self.camera.release()
+
+    def _capture_loop(self) -> None:
+        "Reads frames at the native frame rate of the device and publishes them."
+        last_frame_time = None
+        while self._running:
+            # a new array per frame, consumers may still hold the old frames
+            success, frame = self.camera.read()
+            if not success or frame is None:
+                time.sleep(0.01)  #device not ready, avoid spinning
+                continue
+            now = time.perf_counter()
+            if last_frame_time is not None:
+                interval = now - last_frame_time
+                self._frame_interval = interval if self._frame_interval is None \
+                    else 0.9 * self._frame_interval + 0.1 * interval
+            last_frame_time = now
+            with self._condition:
+                self._frame = frame
+                self._seq += 1
+                self._condition.notify_all()
+
+    @property
+    def fps(self) -> typing.Optional[float]:
+        "Measured frame rate of the device, None before two frames were captured."
+        interval = self._frame_interval
+        return 1.0 / interval if interval else None
+
+    def _view(self) -> np.ndarray:
+        "Read-only view of the latest frame, without a copy."
+        view = self._frame.view()
+        view.flags.writeable = False
+        return view
+
+    def latest(self) -> typing.Tuple[int, typing.Optional[np.ndarray]]:
+        """Function to get the latest frame without waiting.
+
+        Returns
+        --------
+            `Tuple[int, numpy.ndarray]`: Sequence number and a read-only view of the frame, `(0, None)` before the first frame.
+        """
+        with self._condition:
+            if not self._seq:
+                return 0, None
+            return self._seq, self._view()
+
+    def wait_for_frame(
+        self,
+        after_seq: int = 0,
+        timeout: typing.Optional[float] = 1.0
+    ) -> typing.Tuple[int, typing.Optional[np.ndarray]]:
+        """Function to wait for a frame newer than `after_seq`.
+
+        Parameters
+        -----------
+            - `after_seq` (int, optional): Sequence number of the last frame the consumer has seen. Defaults to 0.
+            - `timeout` (float, optional): Seconds to wait for a new frame. Defaults to 1.0.
+
+        Returns
+        --------
+            `Tuple[int, numpy.ndarray]`: Sequence number and a read-only view of the frame, `(after_seq, None)` on timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._seq > after_seq or not self._running,
+                    timeout) or self._seq <= after_seq:
+                return after_seq, None
+            return self._seq, self._view()
+
+    def read(self) -> typing.Tuple[bool, typing.Optional[np.ndarray]]:
+        """Drop-in replacement of `cv2.VideoCapture.read` returning the latest frame.
+
+        Returns
+        --------
+            `Tuple[bool, numpy.ndarray]`: Whether a frame is available and a read-only view of it.
+        """
+        seq, frame = self.latest()
+        if frame is None and self._running:
+            seq, frame = self.wait_for_frame(seq)
+        return frame is not None, frame
@@ -0,0 +1,275 @@
+import os
+import time
+import queue
+import typing
+import threading
+import multiprocessing
+import numpy as np
+from video_pipeline.camera_capture import CameraCapture
+from video_pipeline.frame_source import open_frame_source
+from video_pipeline.recognition_results import RecognitionResults
+from video_pipeline.shared_frame import SharedFrame
+from video_pipeline.pipeline_metrics import PipelineMetrics
+from recognition.face_recognizer import FaceRecognizer
+
+
+class CameraWorker:
+    """Class that captures and recognizes one camera in its own worker process.
+
+    Frames and JPEG images come back through a `SharedFrame`, recognition
+    results through a queue. It has the reading interface of `CameraCapture`,
+    so `DatabaseAPI` can use it as its camera.
+
+    The worker process supervises the capture loop: it forks the loop and
+    forks it again when it crashes, so restarts never fork the app, whose
+    MongoDB client and threads are not fork-safe. Start the workers before
+    the app creates its MongoDB client. The app only forks a worker again
+    if the worker process itself dies, and the new worker never uses the
+    inherited client.
+    """
+
+    def __init__(self,
+                 camera_id: str,
+                 source: typing.Union[int, str],
+                 make_recognizer: typing.Callable[
+                     [typing.Callable[[], typing.Optional[float]]],
+                     FaceRecognizer],
+                 results: RecognitionResults = None,
+                 width: int = 640,
+                 height: int = 480,
+                 use_process: bool = True,
+                 metrics: bool = False,
+                 restart_delay: float = 2.0):
+        """Instantiate the CameraWorker object
+
+        Parameters
+        -----------
+           - `camera_id` (str): Name of the camera, e.g. used in `/video_feed/<camera_id>`.
+           - `source` (int, str): Device index or RTSP URL, or a video file or directory of images replayed in a loop, see `open_frame_source`.
+           - `make_recognizer` (Callable[[Callable[[], float]], FaceRecognizer]): Builds the recognizer inside the worker from the frame rate of the camera, again after every restart, so it should load the current known faces (e.g. from the `EncodingStore`) rather than those of the start.
+           - `results` (RecognitionResults, optional): Cache the results of the worker are published to. Defaults to a new cache.
+           - `width` (int, optional): Largest frame width shared with the app. Defaults to 640.
+           - `height` (int, optional): Largest frame height shared with the app. Defaults to 480.
+           - `use_process` (bool, optional): Whether the worker is a forked process, otherwise a thread of this process (e.g. where fork is not available). Defaults to True.
+           - `metrics` (bool, optional): Whether the worker records stage durations and frame counts in `self.metrics`. Defaults to False.
+           - `restart_delay` (float, optional): Seconds before a crashed capture loop or a dead worker is restarted. Defaults to 2.0.
+        """
+        self.camera_id = camera_id
+        self.source = source
+        self.results = results if results is not None else RecognitionResults(
+        )
+        self.use_process = use_process
+        self.restart_delay = restart_delay
+        self._make_recognizer = make_recognizer
+        context = multiprocessing.get_context("fork" if use_process else None)
+        self._context = context
+        self.frames = SharedFrame(width, height, context)
+        self.metrics = PipelineMetrics(context) if metrics else None
+        self._viewers = context.Value("i", 0)  #the worker only encodes JPEG images while someone watches
+        self._fps = context.Value("d", 0.0)
+        self._stopping = context.Event()
+        self._updates = context.Queue()  #known face changes for the worker's matcher
+        self._results_queue = context.Queue()
+        self._worker = None
+        self._listener = None
+        self._watchdog = None
+
+    def _start_worker(self) -> None:
+        worker_type = self._context.Process if self.use_process else threading.Thread
+        self._worker = worker_type(target=self._supervise,
+                                   name=f"camera-{self.camera_id}",
+                                   daemon=True)
+        self._worker.start()
+
+    def start(self) -> "CameraWorker":
+        "Function to start the worker, the thread publishing its results and the thread restarting it."
+        if self._worker is not None:
+            return self
+        self._start_worker()
+        self._listener = threading.Thread(target=self._listen,
+                                          name=f"camera-{self.camera_id}-results",
+                                          daemon=True)
+        self._listener.start()
+        self._watchdog = threading.Thread(target=self._watch,
+                                          name=f"camera-{self.camera_id}-watchdog",
+                                          daemon=True)
+        self._watchdog.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        "Function to stop the worker."
+        self._stopping.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout)
+            self._watchdog = None
+        if self._worker is not None:
+            self._worker.join(timeout)
+            if self.use_process and self._worker.is_alive():
+                self._worker.terminate()
+            self._worker = None
+        self._results_queue.put(None)  #ends the listener
+        if self._listener is not None:
+            self._listener.join(timeout)
+            self._listener = None
+
+    def release(self) -> None:
+        "Function to stop the worker and free the shared memory."
+        self.stop()
+        self.frames.close()
+
+    def _watch(self) -> None:
+        "Restarts the worker when it died, e.g. killed by the system."
+        while not self._stopping.wait(self.restart_delay):
+            if not self._worker.is_alive():
+                print(f"Camera '{self.camera_id}': worker died, restarting")
+                self._start_worker()
+
+    def _supervise(self) -> None:
+        "Runs the capture loop until stopped, again after every crash."
+        while not self._stopping.is_set():
+            if self.use_process:
+                # a crash of the native code (dlib, OpenCV) ends the forked
+                # loop only, the supervisor has no MongoDB client nor threads
+                pid = os.fork()
+                if pid == 0:
+                    code = 0
+                    try:
+                        self._run()
+                    except BaseException as e:
+                        print(f"Camera '{self.camera_id}': capture loop failed: {e!r}")
+                        code = 1
+                    finally:
+                        self._results_queue.close()
+                        self._results_queue.join_thread()
+                        os._exit(code)
+                _, status = os.waitpid(pid, 0)
+                if status:
+                    print(f"Camera '{self.camera_id}': capture loop exited with "
+                          f"status {os.waitstatus_to_exitcode(status)}")
+            else:
+                try:
+                    self._run()
+                except Exception as e:
+                    print(f"Camera '{self.camera_id}': capture loop failed: {e!r}")
+            self._stopping.wait(self.restart_delay)
+
+    def _run(self) -> None:
+        "Worker loop: capture, recognize, and share the frames and results."
+        capture = CameraCapture(open_frame_source(self.source)).start()
+        recognizer = self._make_recognizer(lambda: capture.fps)
+        if self.metrics is not None:
+            recognizer.observe = self.metrics.observe
+        seq = 0
+        failures = 0  #frames failed in a row
+        supervisor = os.getppid()  #the loop ends with its supervisor
+        try:
+            while not self._stopping.is_set() and os.getppid() == supervisor:
+                self._apply_updates(recognizer)
+                start = time.perf_counter()
+                new_seq, frame = capture.wait_for_frame(seq)
+                if frame is None:
+                    continue
+                if self.metrics is not None:
+                    self.metrics.observe("capture_wait",
+                                         time.perf_counter() - start)
+                    # frames captured while the last one was processed
+                    self.metrics.count_frames(
+                        dropped=new_seq - seq - 1 if seq else 0)
+                seq = new_seq
+                try:
+                    face_locations, face_names = recognizer.process(frame)
+                    jpeg = None
+                    if self._viewers.value:
+                        jpeg = recognizer.render(frame, face_locations,
+                                                 face_names)
+                    shared_seq = self.frames.write(frame, jpeg)
+                except Exception as e:
+                    # a bad frame is skipped, the camera keeps running
+                    failures += 1
+                    if failures == 1 or failures % 100 == 0:
+                        print(f"Camera '{self.camera_id}': frame {seq} failed "
+                              f"({failures} in a row): {e!r}")
+                    continue
+                failures = 0
+                self._fps.value = capture.fps or 0.0
+                self._results_queue.put(
+                    (shared_seq, face_names, face_locations))
+        finally:
+            capture.release()
+
+    def _apply_updates(self, recognizer: FaceRecognizer) -> None:
+        "Applies the known face changes sent by `replace_employee` and `remove_employee`."
+        updated = False
+        while True:
+            try:
+                action, name, encoding = self._updates.get_nowait()
+            except queue.Empty:
+                break
+            if action == "replace":
+                recognizer.matcher.replace_employee(name, encoding)
+            else:
+                recognizer.matcher.remove_employee(name)
+            updated = True
+        if updated and recognizer.motion_gate is not None:
+            recognizer.motion_gate.reset()  #match the faces again
+
+    def _listen(self) -> None:
+        "Publishes the results of the worker to `self.results`."
+        while True:
+            result = self._results_queue.get()
+            if result is None:
+                break
+            self.results.publish(*result)
+
+    def replace_employee(self, name: str, encoding: np.ndarray) -> None:
+        "Function to add or replace the face of an employee in the worker's matcher."
+        self._updates.put(("replace", name, encoding))
+
+    def remove_employee(self, name: str) -> None:
+        "Function to remove the face of an employee from the worker's matcher."
+        self._updates.put(("remove", name, None))
+
+    @property
+    def fps(self) -> typing.Optional[float]:
+        "Measured frame rate of the camera, None before two frames were captured."
+        return self._fps.value or None
+
+    def latest(self) -> typing.Tuple[int, typing.Optional[np.ndarray]]:
+        "Same as `CameraCapture.latest`, but the frame is a copy."
+        return self.frames.latest()
+
+    def wait_for_frame(
+        self,
+        after_seq: int = 0,
+        timeout: typing.Optional[float] = 1.0
+    ) -> typing.Tuple[int, typing.Optional[np.ndarray]]:
+        "Same as `CameraCapture.wait_for_frame`, but the frame is a copy."
+        return self.frames.wait_for_frame(after_seq, timeout)
+
+    def read(self) -> typing.Tuple[bool, typing.Optional[np.ndarray]]:
+        "Drop-in replacement of `cv2.VideoCapture.read` returning the latest frame."
+        seq, frame = self.latest()
+        if frame is None:
+            seq, frame = self.wait_for_frame(seq)
+        return frame is not None, frame
+
+    def subscribe(self) -> typing.Iterator[bytes]:
+        """Generator of the multipart MJPEG stream of the camera, for a Flask `Response`.
+
+        Yields
+        -------
+            `bytes`: multipart chunk containing the next JPEG image.
+        """
+        with self._viewers.get_lock():
+            self._viewers.value += 1
+        try:
+            seq = 0
+            while not self._stopping.is_set():
+                seq, jpeg = self.frames.wait_for_jpeg(seq)
+                if jpeg is None:
+                    continue
+                yield (b"--frame\r\n"
+                       b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n")
+        finally:
+            with self._viewers.get_lock():
+                self._viewers.value -= 1
@@ -0,0 +1,163 @@
+import math
+import time
+import typing
+import threading
+import cv2
+import numpy as np
+
+Box = typing.Tuple[int, int, int, int]  #(top, right, bottom, left) like face_recognition
+
+
+class FaceTracker:
+    "Class to run full face recognition every few frames and follow the faces with optical flow in between"
+
+    def __init__(self,
+                 recognize: typing.Callable[[np.ndarray], typing.Tuple[
+                     typing.List[Box], typing.List[str]]],
+                 fps: typing.Callable[[], typing.Optional[float]],
+                 scale: float = 0.25,
+                 max_interval: int = 15,
+                 min_points: int = 4,
+                 motion_threshold: float = 3.0):
+        """Instantiate the FaceTracker object
+
+        Parameters
+        -----------
+           - `recognize` (Callable[[numpy.ndarray], Tuple[List[Box], List[str]]]): Full detection and recognition of a BGR frame, like `DatabaseAPI.recognize_faces`.
+           - `fps` (Callable[[], float]): Frame rate of the camera, e.g. `CameraCapture.fps`. The detection interval is chosen so the average frame fits in `1 / fps`.
+           - `scale` (float, optional): Scale of the frame the boxes of `recognize` refer to. Defaults to 0.25.
+           - `max_interval` (int, optional): Largest number of frames between two detections. Defaults to 15.
+           - `min_points` (int, optional): Tracked points a face needs to keep its box, otherwise the faces are detected again. Defaults to 4.
+           - `motion_threshold` (float, optional): Mean absolute difference (0-255) of the scaled gray frames outside the tracked faces above which the faces are detected again, e.g. someone walking in. Defaults to 3.0.
+        """
+        self.recognize = recognize
+        self.fps = fps
+        self.scale = scale
+        self.max_interval = max(1, int(max_interval))
+        self.min_points = min_points
+        self.motion_threshold = motion_threshold
+        self.interval = 1  #frames between two detections, adapted to the budget
+        self._detect_time = None  #moving averages in seconds
+        self._track_time = 0.0
+        self._since_detection = 0
+        self._previous_gray = None
+        self._boxes = []
+        self._names = []
+        self._lock = threading.Lock()  #the tracking state belongs to one stream
+
+    @staticmethod
+    def _average(average: typing.Optional[float], value: float) -> float:
+        return value if average is None else 0.8 * average + 0.2 * value
+
+    def _adapt_interval(self) -> None:
+        """Picks the smallest interval K with (detect + (K - 1) * track) / K <= budget."""
+        fps = self.fps()
+        if not fps or self._detect_time is None:
+            return
+        budget = 1.0 / fps
+        if self._detect_time <= budget:
+            self.interval = 1
+        elif self._track_time >= budget:
+            self.interval = self.max_interval
+        else:
+            self.interval = min(
+                self.max_interval,
+                math.ceil((self._detect_time - self._track_time) /
+                          (budget - self._track_time)))
+
+    def _small_gray(self, frame: np.ndarray) -> np.ndarray:
+        small_frame = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale)
+        return cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
+
+    def _track(self, gray: np.ndarray) -> typing.Optional[typing.List[Box]]:
+        "Moves every box by the median optical flow of the corners inside it, None if a face was lost."
+        points, owners = [], []
+        for i, (top, right, bottom, left) in enumerate(self._boxes):
+            top, left = max(top, 0), max(left, 0)
+            region = self._previous_gray[top:bottom, left:right]
+            if not region.size:
+                return None
+            corners = cv2.goodFeaturesToTrack(
+                region,
+                maxCorners=20,
+                qualityLevel=0.01,
+                minDistance=2)
+            if corners is None or len(corners) < self.min_points:
+                return None
+            points.append(corners.reshape(-1, 2) + (left, top))
+            owners.extend([i] * len(corners))
+        if not points:
+            return []
+
+        points = np.concatenate(points).astype(np.float32)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self._previous_gray,
+                                                    gray,
+                                                    points,
+                                                    None,
+                                                    winSize=(15, 15),
+                                                    maxLevel=2)
+        owners = np.asarray(owners)
+        found = status.ravel() == 1
+        height, width = gray.shape
+        boxes = []
+        for i, (top, right, bottom, left) in enumerate(self._boxes):
+            tracked = found & (owners == i)
+            if tracked.sum() < self.min_points:
+                return None
+            dx, dy = np.median(moved[tracked] - points[tracked], axis=0)
+            dx, dy = int(round(dx)), int(round(dy))
+            if not (0 <= left + dx and right + dx <= width and
+                    0 <= top + dy and bottom + dy <= height):
+                return None  #leaving the frame
+            boxes.append((top + dy, right + dx, bottom + dy, left + dx))
+        return boxes
+
+    def _motion(self, gray: np.ndarray, boxes: typing.List[Box]) -> float:
+        "Mean absolute difference with the previous frame outside the tracked faces."
+        difference = cv2.absdiff(self._previous_gray, gray)
+        for top, right, bottom, left in self._boxes + boxes:
+            difference[max(top, 0):bottom, max(left, 0):right] = 0
+        return float(difference.mean())
+
+    def process(
+            self,
+            frame: np.ndarray) -> typing.Tuple[typing.List[Box], typing.List[str]]:
+        """Function to get the faces of the next frame, detected or tracked.
+
+        Parameters
+        -----------
+            - `frame` (numpy.ndarray): BGR frame from the camera.
+
+        Returns
+        --------
+            `Tuple[List[Box], List[str]]`: Face locations in the scaled frame and the names of the faces.
+        """
+        with self._lock:
+            return self._process(frame)
+
+    def _process(
+            self,
+            frame: np.ndarray) -> typing.Tuple[typing.List[Box], typing.List[str]]:
+        start = time.perf_counter()
+        gray = self._small_gray(frame)
+        boxes = None
+        if self._previous_gray is not None and \
+                self._since_detection < self.interval:
+            boxes = self._track(gray)
+            if boxes is not None and self._motion(
+                    gray, boxes) > self.motion_threshold:
+                boxes = None
+        if boxes is not None:
+            self._boxes = boxes
+            self._since_detection += 1
+            self._track_time = self._average(self._track_time,
+                                             time.perf_counter() - start)
+        else:
+            # identities are only decided by a full recognition
+            self._boxes, self._names = self.recognize(frame)
+            self._since_detection = 1
+            self._detect_time = self._average(self._detect_time,
+                                              time.perf_counter() - start)
+            self._adapt_interval()
+        self._previous_gray = gray
+        return list(self._boxes), list(self._names)
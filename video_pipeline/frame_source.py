@@ -0,0 +1,113 @@
+import os
+import time
+import typing
+import cv2
+import numpy as np
+from data_ingestion.data_import_and_preprocessing import is_image_file
+
+
+class ReplaySource:
+    "Stand-in for cv2.VideoCapture replaying a video file or a directory of images, e.g. to benchmark without a camera"
+
+    def __init__(self,
+                 path: typing.Union[str, os.PathLike],
+                 fps: typing.Optional[float] = None,
+                 realtime: bool = True,
+                 loop: bool = False):
+        """Instantiate the ReplaySource object
+
+        Parameters
+        -----------
+           - `path` (str, os.PathLike): Video file, or directory of images replayed in the order of their names.
+           - `fps` (float, optional): Frame rate of the replay. Defaults to the frame rate of the video, 30 for a directory.
+           - `realtime` (bool, optional): Whether frames are paced at `fps` like a camera, otherwise they are read as fast as possible. Defaults to True.
+           - `loop` (bool, optional): Whether the replay starts over at the end, otherwise `read` fails from then on. Defaults to False.
+        """
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self._video = None
+        self._files = None
+        if os.path.isdir(path):
+            self._files = sorted(
+                file for file in os.listdir(path)
+                if is_image_file(os.path.join(path, file)))
+            native_fps = 30.0
+        else:
+            self._video = cv2.VideoCapture(path)
+            if not self._video.isOpened():
+                raise ValueError(f"Could not open the video {path}")
+            native_fps = self._video.get(cv2.CAP_PROP_FPS) or 30.0
+        self.fps = fps or native_fps
+        self.frame_time = 1.0 / self.fps
+        self.index = -1  #index of the last frame read
+        self.name = None  #file name, or zero padded index in a video, of the last frame read
+        self._next = None
+
+    def _pace(self) -> None:
+        "Sleeps until the next frame is due."
+        now = time.perf_counter()
+        if self._next is None or self._next < now:
+            self._next = now  #first frame, or the consumer is late
+        else:
+            time.sleep(self._next - now)
+        self._next += self.frame_time
+
+    def _read_next(
+        self, image: typing.Optional[np.ndarray]
+    ) -> typing.Tuple[bool, typing.Optional[np.ndarray], str]:
+        if self._files is not None:
+            if self.index + 1 >= len(self._files):
+                return False, None, None
+            file = self._files[self.index + 1]
+            return True, cv2.imread(os.path.join(self.path, file)), file
+        success, frame = self._video.read(image)
+        return success, frame, f"{self.index + 1:06d}"
+
+    def read(
+        self,
+        image: typing.Optional[np.ndarray] = None
+    ) -> typing.Tuple[bool, typing.Optional[np.ndarray]]:
+        "Same interface as cv2.VideoCapture.read, paced at the frame rate when replaying in real time."
+        if self.realtime:
+            self._pace()
+        success, frame, name = self._read_next(image)
+        if not success and self.loop and self.index >= 0:
+            self.rewind()
+            success, frame, name = self._read_next(image)
+        if not success or frame is None:
+            return False, None
+        self.index += 1
+        self.name = name
+        return True, frame
+
+    def rewind(self) -> None:
+        "Function to start the replay over."
+        if self._video is not None:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.index = -1
+        self.name = None
+
+    def release(self) -> None:
+        if self._video is not None:
+            self._video.release()
+
+
+def open_frame_source(source: typing.Union[int, str],
+                      realtime: bool = True,
+                      loop: bool = True):
+    """Function to open the source of a camera entry of config.json.
+
+    Parameters
+    -----------
+        - `source` (int, str): Device index or stream URL (e.g. RTSP), opened with `cv2.VideoCapture`, or a video file or directory of images, replayed.
+        - `realtime` (bool, optional): Whether a replay is paced at its frame rate. Defaults to True.
+        - `loop` (bool, optional): Whether a replay starts over at the end. Defaults to True.
+
+    Returns
+    --------
+        `cv2.VideoCapture` or `ReplaySource`: Object with the `read` and `release` methods of `cv2.VideoCapture`.
+    """
+    if isinstance(source, str) and os.path.exists(source):
+        return ReplaySource(source, realtime=realtime, loop=loop)
+    return cv2.VideoCapture(source)
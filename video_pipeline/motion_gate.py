@@ -0,0 +1,70 @@
+import time
+import typing
+import threading
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    "Class to tell if a frame changed since the last recognition, using a tiny grayscale thumbnail"
+
+    def __init__(self,
+                 size: typing.Tuple[int, int] = (32, 24),
+                 pixel_threshold: int = 25,
+                 area_threshold: float = 0.01,
+                 refresh_interval: float = 5.0):
+        """Instantiate the MotionGate object
+
+        Parameters
+        -----------
+           - `size` (Tuple[int, int], optional): Width and height of the thumbnail, averaging over large areas hides the sensor noise. Defaults to (32, 24).
+           - `pixel_threshold` (int, optional): Gray level difference (0-255) above which a thumbnail pixel changed. Defaults to 25.
+           - `area_threshold` (float, optional): Fraction of changed thumbnail pixels above which the frame changed. Defaults to 0.01.
+           - `refresh_interval` (float, optional): Seconds after which a frame counts as changed anyway. Defaults to 5.0.
+        """
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.area_threshold = area_threshold
+        self.refresh_interval = refresh_interval
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self._reference = None  #thumbnail of the last changed frame
+        self._reference_time = 0.0
+        self._lock = threading.Lock()
+
+    def thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        "Tiny grayscale version of a BGR frame."
+        small_frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
+
+    def changed(self, frame: np.ndarray) -> bool:
+        """Function to check if a frame differs from the one of the last change, which becomes the new reference if it does.
+
+        Parameters
+        -----------
+            - `frame` (numpy.ndarray): BGR frame from the camera.
+
+        Returns
+        --------
+            `bool`: Whether the frame has to be recognized.
+        """
+        thumbnail = self.thumbnail(frame)
+        now = time.monotonic()
+        with self._lock:
+            self.frames_checked += 1
+            if self._reference is not None and \
+                    self._reference.shape == thumbnail.shape and \
+                    now - self._reference_time < self.refresh_interval:
+                moved = cv2.absdiff(self._reference,
+                                    thumbnail) > self.pixel_threshold
+                if moved.mean() <= self.area_threshold:
+                    self.frames_skipped += 1
+                    return False
+            self._reference = thumbnail
+            self._reference_time = now
+            return True
+
+    def reset(self) -> None:
+        "Function to make the next frame count as changed, e.g. after the known faces changed."
+        with self._lock:
+            self._reference = None
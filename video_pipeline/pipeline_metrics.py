@@ -0,0 +1,123 @@
+import bisect
+import typing
+import multiprocessing
+
+STAGES = ("capture_wait", "resize", "detect", "encode", "match", "draw",
+          "jpeg")
+#upper bounds in seconds of the histogram buckets, the last bucket is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5)
+FRAMES_PROCESSED, FRAMES_DROPPED = range(2)  #counters stored after the histograms
+
+
+class PipelineMetrics:
+    """Histograms of the recognition stages and frame counters of one pipeline.
+
+    The values live in shared memory, so a camera worker process records them
+    and the app reads them for `/metrics`. There is a single writer per
+    pipeline, so recording takes no lock: a bisect and two additions.
+    """
+
+    def __init__(self, context=None):
+        """Instantiate the PipelineMetrics object, before the worker process is forked.
+
+        Parameters
+        -----------
+           - `context` (optional): multiprocessing context the worker is started with. Defaults to the default context.
+        """
+        context = context or multiprocessing
+        self._row = len(BUCKETS) + 2  #bucket counts, +Inf count and sum of a stage
+        self._stages = {stage: i * self._row for i, stage in enumerate(STAGES)}
+        self._counters = len(STAGES) * self._row
+        self._values = context.RawArray("d", self._counters + 2)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Function to record the duration of a stage, e.g. the `observe` callback of `FaceRecognizer`.
+
+        Parameters
+        -----------
+            - `stage` (str): One of `STAGES`.
+            - `seconds` (float): Duration of the stage.
+        """
+        row = self._stages[stage]
+        self._values[row + bisect.bisect_left(BUCKETS, seconds)] += 1
+        self._values[row + self._row - 1] += seconds
+
+    def count_frames(self, processed: int = 1, dropped: int = 0) -> None:
+        """Function to count the frames processed, and the frames the pipeline was too slow for.
+
+        Parameters
+        -----------
+            - `processed` (int, optional): Frames processed. Defaults to 1.
+            - `dropped` (int, optional): Frames captured but never processed. Defaults to 0.
+        """
+        self._values[self._counters + FRAMES_PROCESSED] += processed
+        self._values[self._counters + FRAMES_DROPPED] += dropped
+
+    def histogram(self, stage: str) -> typing.Tuple[typing.List[float], float]:
+        "Cumulative bucket counts (the last one is +Inf) and sum of the seconds of a stage."
+        row = self._stages[stage]
+        counts = self._values[row:row + len(BUCKETS) + 1]
+        cumulative, total = [], 0.0
+        for count in counts:
+            total += count
+            cumulative.append(total)
+        return cumulative, self._values[row + self._row - 1]
+
+    @property
+    def frames_processed(self) -> int:
+        return int(self._values[self._counters + FRAMES_PROCESSED])
+
+    @property
+    def frames_dropped(self) -> int:
+        return int(self._values[self._counters + FRAMES_DROPPED])
+
+
+def _labels(labels: typing.Dict[str, str], **extra) -> str:
+    labels = {**labels, **extra}
+    return "{" + ",".join(f'{key}="{value}"'
+                          for key, value in labels.items()) + "}"
+
+
+def render_metrics(
+        pipelines: typing.List[typing.Tuple[typing.Dict[str, str],
+                                            PipelineMetrics]]) -> str:
+    """Function to render the metrics of several pipelines in the Prometheus text format.
+
+    Parameters
+    -----------
+        - `pipelines` (List[Tuple[Dict[str, str], PipelineMetrics]]): Labels of every pipeline (e.g. the camera) and its metrics.
+
+    Returns
+    --------
+        `str`: Body of the `/metrics` response.
+    """
+    lines = [
+        "# HELP recognition_stage_seconds Duration of the stages of the recognition pipeline.",
+        "# TYPE recognition_stage_seconds histogram",
+    ]
+    for labels, metrics in pipelines:
+        for stage in STAGES:
+            cumulative, total = metrics.histogram(stage)
+            for bound, count in zip(BUCKETS + ("+Inf", ), cumulative):
+                lines.append("recognition_stage_seconds_bucket" +
+                             _labels(labels, stage=stage, le=bound) +
+                             f" {count:.0f}")
+            lines.append("recognition_stage_seconds_sum" +
+                         _labels(labels, stage=stage) + f" {total}")
+            lines.append("recognition_stage_seconds_count" +
+                         _labels(labels, stage=stage) +
+                         f" {cumulative[-1]:.0f}")
+    for name, help_text, attribute in (
+        ("recognition_frames_processed_total", "Frames processed.",
+         "frames_processed"),
+        ("recognition_frames_dropped_total",
+         "Frames captured while the pipeline was busy and never processed.",
+         "frames_dropped"),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, metrics in pipelines:
+            lines.append(name + _labels(labels) +
+                         f" {getattr(metrics, attribute)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,58 @@
+import typing
+import threading
+import concurrent.futures
+import numpy as np
+
+Box = typing.Tuple[int, int, int, int]  #(top, right, bottom, left) like face_recognition
+
+
+class RecognitionExecutor:
+    """Class that recognizes single frames in a dedicated thread, off the request threads.
+
+    At most one job runs at a time and requests arriving meanwhile share it,
+    so a burst of requests costs one recognition. Callers wait on the returned
+    future with a timeout.
+    """
+
+    def __init__(self,
+                 recognize: typing.Callable[[np.ndarray, int], typing.Tuple[
+                     typing.List[Box], typing.List[str]]]):
+        """Instantiate the RecognitionExecutor object
+
+        Parameters
+        -----------
+           - `recognize` (Callable[[numpy.ndarray, int], Tuple[List[Box], List[str]]]): Recognition of a BGR frame and its sequence number, like `DatabaseAPI.recognize_faces`.
+        """
+        self.recognize = recognize
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="recognition")
+        self._job = None  #future of the running job
+        self._lock = threading.Lock()
+        self.jobs_submitted = 0
+        self.jobs_shared = 0
+
+    def submit(self, frame: np.ndarray, frame_seq: int) -> concurrent.futures.Future:
+        """Function to recognize a frame, or to join the job already running.
+
+        Parameters
+        -----------
+            - `frame` (numpy.ndarray): BGR frame from the camera, not modified while the job runs.
+            - `frame_seq` (int): Sequence number of the frame.
+
+        Returns
+        --------
+            `concurrent.futures.Future`: Future of the face locations and names.
+        """
+        with self._lock:
+            if self._job is not None and not self._job.done():
+                # the running job recognizes a frame at most one job old
+                self.jobs_shared += 1
+                return self._job
+            self.jobs_submitted += 1
+            self._job = self._executor.submit(self.recognize, frame,
+                                              frame_seq)
+            return self._job
+
+    def shutdown(self) -> None:
+        "Function to stop the executor after the running job."
+        self._executor.shutdown(wait=False)
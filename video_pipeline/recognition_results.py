@@ -0,0 +1,63 @@
+import time
+import typing
+import threading
+
+
+class RecognitionResult(typing.NamedTuple):
+    "Faces recognized in one captured frame"
+    frame_seq: int
+    names: typing.List[str]
+    boxes: typing.List[typing.Tuple[int, int, int, int]]
+    timestamp: float  #time.monotonic() when the frame was recognized
+
+
+class RecognitionResults:
+    "Class to share the latest recognition result between the video feed and the request handlers"
+
+    def __init__(self, max_age: float = 1.0):
+        """Instantiate the RecognitionResults object
+
+        Parameters
+        -----------
+           - `max_age` (float, optional): Seconds after which a result is too stale to be reused. Defaults to 1.0.
+        """
+        self.max_age = float(max_age)
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def publish(self, frame_seq: int, names: typing.List[str],
+                boxes: typing.List[typing.Tuple[int, int, int, int]]) -> None:
+        """Function to store the result of a recognized frame, older frames never replace newer ones.
+
+        Parameters
+        -----------
+            - `frame_seq` (int): Sequence number of the recognized frame.
+            - `names` (List[str]): Names of the faces.
+            - `boxes` (List[Tuple[int, int, int, int]]): Face locations as returned by `DatabaseAPI.recognize_faces`.
+        """
+        result = RecognitionResult(frame_seq, list(names), list(boxes),
+                                   time.monotonic())
+        with self._lock:
+            if self._latest is None or frame_seq >= self._latest.frame_seq:
+                self._latest = result
+
+    def latest(
+        self,
+        max_age: typing.Optional[float] = None
+    ) -> typing.Optional[RecognitionResult]:
+        """Function to get the latest result if it is fresh enough.
+
+        Parameters
+        -----------
+            - `max_age` (float, optional): Staleness window in seconds. Defaults to the `max_age` of the object.
+
+        Returns
+        --------
+            `RecognitionResult`: The latest result, `None` if there is none within the staleness window.
+        """
+        if max_age is None:
+            max_age = self.max_age
+        result = self._latest
+        if result is None or time.monotonic() - result.timestamp > max_age:
+            return None
+        return result
@@ -0,0 +1,131 @@
+import typing
+import multiprocessing
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+
+SEQ, ROWS, COLUMNS, JPEG_SEQ, JPEG_LENGTH = range(5)  #fields of the header
+
+
+class SharedFrame:
+    "Latest frame and JPEG image of a camera in shared memory, written by one process and read by the others"
+
+    def __init__(self, width: int = 640, height: int = 480, context=None):
+        """Instantiate the SharedFrame object, before the worker process is forked.
+
+        Parameters
+        -----------
+           - `width` (int, optional): Largest frame width, larger frames are shrunk keeping their aspect ratio. Defaults to 640.
+           - `height` (int, optional): Largest frame height. Defaults to 480.
+           - `context` (optional): multiprocessing context the worker is started with. Defaults to the default context.
+        """
+        context = context or multiprocessing
+        self.width = width
+        self.height = height
+        self.capacity = width * height * 3  #bytes of the frame and of the JPEG areas
+        self._memory = shared_memory.SharedMemory(create=True,
+                                                  size=2 * self.capacity)
+        self._header = context.Array("q", 5, lock=False)
+        self._condition = context.Condition()
+
+    def write(self, frame: np.ndarray, jpeg: typing.Optional[bytes] = None) -> int:
+        """Function to publish the next frame, and optionally its annotated JPEG image.
+
+        Parameters
+        -----------
+            - `frame` (numpy.ndarray): BGR frame from the camera.
+            - `jpeg` (bytes, optional): JPEG image shown by the video feed. Defaults to None.
+
+        Returns
+        --------
+            `int`: Sequence number of the frame.
+        """
+        if frame.nbytes > self.capacity:
+            # shrink into width x height keeping the aspect ratio
+            rows, columns = frame.shape[:2]
+            scale = min(self.width / columns, self.height / rows)
+            frame = cv2.resize(frame, (max(1, int(columns * scale)),
+                                       max(1, int(rows * scale))),
+                               interpolation=cv2.INTER_AREA)
+        if jpeg is not None and len(jpeg) > self.capacity:
+            jpeg = None  #never happens for camera images, skip it if it does
+        with self._condition:
+            shared = np.ndarray(frame.shape, np.uint8, self._memory.buf)
+            np.copyto(shared, frame)
+            self._header[ROWS], self._header[COLUMNS] = frame.shape[:2]
+            self._header[SEQ] += 1
+            if jpeg is not None:
+                self._memory.buf[self.capacity:self.capacity +
+                                 len(jpeg)] = jpeg
+                self._header[JPEG_LENGTH] = len(jpeg)
+                self._header[JPEG_SEQ] = self._header[SEQ]
+            self._condition.notify_all()
+            return self._header[SEQ]
+
+    def _frame(self) -> np.ndarray:
+        "Copy of the latest frame, called with the lock held."
+        shape = (self._header[ROWS], self._header[COLUMNS], 3)
+        return np.ndarray(shape, np.uint8, self._memory.buf).copy()
+
+    def latest(self) -> typing.Tuple[int, typing.Optional[np.ndarray]]:
+        """Function to get the latest frame without waiting.
+
+        Returns
+        --------
+            `Tuple[int, numpy.ndarray]`: Sequence number and a copy of the frame, `(0, None)` before the first frame.
+        """
+        with self._condition:
+            if not self._header[SEQ]:
+                return 0, None
+            return self._header[SEQ], self._frame()
+
+    def wait_for_frame(
+        self,
+        after_seq: int = 0,
+        timeout: typing.Optional[float] = 1.0
+    ) -> typing.Tuple[int, typing.Optional[np.ndarray]]:
+        """Function to wait for a frame newer than `after_seq`.
+
+        Parameters
+        -----------
+            - `after_seq` (int, optional): Sequence number of the last frame the consumer has seen. Defaults to 0.
+            - `timeout` (float, optional): Seconds to wait for a new frame. Defaults to 1.0.
+
+        Returns
+        --------
+            `Tuple[int, numpy.ndarray]`: Sequence number and a copy of the frame, `(after_seq, None)` on timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._header[SEQ] > after_seq, timeout):
+                return after_seq, None
+            return self._header[SEQ], self._frame()
+
+    def wait_for_jpeg(
+        self,
+        after_seq: int = 0,
+        timeout: typing.Optional[float] = 1.0
+    ) -> typing.Tuple[int, typing.Optional[bytes]]:
+        """Function to wait for a JPEG image newer than `after_seq`.
+
+        Parameters
+        -----------
+            - `after_seq` (int, optional): Sequence number of the last image the consumer has seen. Defaults to 0.
+            - `timeout` (float, optional): Seconds to wait for a new image. Defaults to 1.0.
+
+        Returns
+        --------
+            `Tuple[int, bytes]`: Sequence number and the JPEG image, `(after_seq, None)` on timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._header[JPEG_SEQ] > after_seq, timeout):
+                return after_seq, None
+            return self._header[JPEG_SEQ], bytes(
+                self._memory.buf[self.capacity:self.capacity +
+                                 self._header[JPEG_LENGTH]])
+
+    def close(self) -> None:
+        "Function to free the shared memory, called once by the process that created it."
+        self._memory.close()
+        self._memory.unlink()